@@ -3,7 +3,10 @@ from flask import Flask
 from extensions import mail, jwt, cors, db
 import configparser
 from datetime import timedelta
-from database.race_operations import setup_all_race_results_tables
+from database.race_operations import create_results_table, migrate_race_results_tables
+from database.schema_upgrades import upgrade_schema
+from database.backup_operations import tag_archive
+from timing.live import live_results
 
 def create_app():
     """
@@ -49,6 +52,12 @@ def create_app():
     # Password reset configuration
     app.config['PASSWORD_RESET_SALT'] = config.get('security', 'PASSWORD_RESET_SALT', fallback='password-reset-salt')
 
+    # Raw read archive written in the background
+    tag_archive.init_app(app)
+
+    # Live results pushed to viewers after each commit
+    live_results.init_app(app)
+
     # Register blueprints
     from blueprints.registration import registration_bp
     from blueprints.startlist import startlist_bp
@@ -64,6 +73,10 @@ def create_app():
     app.register_blueprint(auth_bp, url_prefix='/api')
     app.register_blueprint(rfid_bp, url_prefix='/api')
     
+    # Maintenance commands (flask rebuild-standings, ...)
+    from commands import register_commands
+    register_commands(app)
+
     @app.route('/')
     def index():
         return "Welcome to the RFID Reader API!", 200
@@ -77,15 +90,19 @@ def create_app():
 def init_db(app):
     """
     Initializes the database for the application.
-    Creates all tables and sets up race results tables.
+    Creates all tables, upgrades existing ones and moves per-race results
+    tables of older releases into race_results. Results partitions of races
+    are created on first write, so startup does not walk the races.
     
     Args:
         app (Flask): Flask application instance
     """
 
     with app.app_context():
+        create_results_table()
         db.create_all()
-        setup_all_race_results_tables()
+        upgrade_schema()
+        migrate_race_results_tables()
 
 if __name__ == '__main__':
     app = create_app()
@@ -0,0 +1,287 @@
+# benchmarks/ranking.py
+"""
+Benchmark of the results views on a synthetic race.
+Compares the former per-view ranking SQL (PostgreSQL only), ranking the race
+for each view, and timing.ranking, which ranks once per results generation
+and slices the views. Run from the backend directory:
+
+    python -m benchmarks.ranking [--runners 5000] [--laps 10] [--database-url URL]
+
+Point --database-url only at a scratch database, the benchmark creates and
+drops its own tables there.
+"""
+import argparse
+import time
+from datetime import date, datetime, timedelta, time as dtime
+
+from flask import Flask
+from sqlalchemy import text
+
+from database import db
+from database.race import Race
+from database.track import Track
+from database.category import Category
+from database.user import Users
+from database.registration import Registration
+from database.race_operations import create_results_table, create_race_results_table
+from database.results_operations import insert_laps
+from database.lineup_operations import update_start_timestamps
+from database.results_queries import bump_results_generation
+from database.standings_operations import refresh_standings, rank_standings, format_result
+from timing.ranking import rankings
+from timing.times import MILLISECOND
+
+RACE_ID = 999001
+
+LEGACY_BY_TRACK_SQL = """
+WITH status_laps AS (
+    SELECT 
+        r.number,
+        r.timestamp,
+        r.lap_number,
+        r.status,
+        r.last_seen_time
+    FROM race_results r
+    WHERE r.race_id = :race_id AND r.status IN ('DNF', 'DNS', 'DSQ')
+),
+latest_laps AS (
+    SELECT 
+        r.number,
+        CASE 
+            WHEN sl.timestamp IS NOT NULL THEN sl.timestamp
+            ELSE MAX(r.timestamp)
+        END as last_lap_timestamp,
+        CASE 
+            WHEN sl.lap_number IS NOT NULL THEN sl.lap_number
+            ELSE MAX(r.lap_number)
+        END as lap_number,
+        sl.status,
+        MAX(r.last_seen_time) as last_seen_time
+    FROM race_results r
+    LEFT JOIN (
+        SELECT DISTINCT ON (number)
+            number, timestamp, lap_number, status, last_seen_time
+        FROM status_laps
+        ORDER BY number, timestamp ASC
+    ) sl ON r.number = sl.number
+    WHERE r.race_id = :race_id
+    GROUP BY r.number, sl.timestamp, sl.lap_number, sl.status
+),
+ranked_results AS (
+    SELECT 
+        r.number,
+        r.timestamp,
+        ll.lap_number,
+        ll.status,
+        ll.last_seen_time,
+        u.firstname,
+        u.surname,
+        u.club,
+        u.year,
+        u.gender,
+        t.name as track_name,
+        reg.track_id,
+        c.category_name,
+        t.actual_start_time,
+        t.number_of_laps,
+        reg.user_start_time,
+        CASE 
+            WHEN ll.lap_number = t.number_of_laps THEN
+                TO_CHAR(
+                    (EXTRACT(EPOCH FROM (
+                        ll.last_lap_timestamp - 
+                        (date_trunc('day', ll.last_lap_timestamp) + 
+                        t.actual_start_time::time + 
+                        reg.user_start_time::interval)
+                    )) || ' seconds')::interval,
+                    'HH24:MI:SS'
+                )
+            ELSE '--:--:--'
+        END as race_time,
+        CASE 
+            WHEN ll.status IS NULL AND ll.lap_number = t.number_of_laps THEN
+                EXTRACT(EPOCH FROM (
+                    ll.last_lap_timestamp - 
+                    (date_trunc('day', ll.last_lap_timestamp) + 
+                    t.actual_start_time::time + 
+                    reg.user_start_time::interval)
+                ))
+            ELSE NULL
+        END as race_time_seconds
+    FROM race_results r
+    JOIN latest_laps ll ON r.number = ll.number
+        AND r.timestamp = ll.last_lap_timestamp
+        AND r.race_id = :race_id
+    JOIN registration reg ON reg.number = r.number 
+        AND reg.race_id = :race_id
+    JOIN users u ON u.id = reg.user_id
+    JOIN track t ON t.id = reg.track_id
+    LEFT JOIN category c ON c.track_id = reg.track_id 
+        AND c.gender = u.gender 
+        AND EXTRACT(YEAR FROM CURRENT_DATE) - u.year 
+            BETWEEN c.min_age AND c.max_age
+),
+results_with_track_time AS (
+    SELECT *,
+        MIN(race_time_seconds) OVER (PARTITION BY track_name) as min_track_time,
+        RANK() OVER (
+            PARTITION BY track_name 
+            ORDER BY 
+                CASE 
+                    WHEN status IS NOT NULL THEN 2
+                    WHEN race_time_seconds IS NULL THEN 1 
+                    ELSE 0 
+                END,
+                race_time_seconds
+        ) as position_track
+    FROM ranked_results
+    WHERE status IS NULL OR status IN ('DNF', 'DNS', 'DSQ')
+)
+SELECT 
+    number,
+    firstname,
+    surname,
+    club,
+    category_name,
+    track_name,
+    status,
+    lap_number,
+    number_of_laps,
+    race_time,
+    last_seen_time,
+    track_id,
+    CASE 
+        WHEN status IS NOT NULL THEN status
+        ELSE position_track::text 
+    END as position_track,
+    CASE 
+        WHEN status IS NOT NULL THEN NULL
+        WHEN race_time_seconds IS NULL THEN NULL
+        ELSE TO_CHAR(
+            ((race_time_seconds - min_track_time) || ' seconds')::interval,
+            'HH24:MI:SS'
+        )
+    END as behind_time_track
+FROM results_with_track_time
+ORDER BY 
+    track_name,
+    CASE 
+        WHEN status IS NOT NULL THEN 2
+        WHEN race_time_seconds IS NULL THEN 1 
+        ELSE 0 
+    END,
+    race_time_seconds;
+"""
+
+def build_race(runners, laps):
+    start = datetime.combine(date.today(), dtime(10, 0))
+    db.session.add(Race(id=RACE_ID, name='Benchmark', date=date.today(), start='M'))
+    for track_index in range(2):
+        track_id = RACE_ID * 10 + track_index
+        db.session.add(Track(id=track_id, name=f'Track {track_index + 1}', distance=10.0, min_age=10, max_age=99,
+                             fastest_possible_time=dtime(0, 1), number_of_laps=laps, race_id=RACE_ID,
+                             expected_start_time=dtime(10, 0), actual_start_time=dtime(10, 0)))
+        for gender in ('M', 'F'):
+            for min_age, max_age in ((10, 17), (18, 39), (40, 59), (60, 99)):
+                db.session.add(Category(category_name=f'{gender}{min_age}-{max_age}', min_age=min_age, max_age=max_age,
+                                        min_number=1, max_number=runners, gender=gender, track_id=track_id))
+    db.session.flush()
+
+    users = [dict(firstname=f'Runner{number}', surname='Benchmark', year=1940 + number % 70, club='Benchmark Club',
+                  email=f'runner{number}@benchmark.test', gender='MF'[number % 2]) for number in range(1, runners + 1)]
+    db.session.execute(Users.__table__.insert(), users)
+    user_ids = db.session.execute(text("SELECT id FROM users WHERE club = 'Benchmark Club' ORDER BY id")).scalars().all()
+    db.session.execute(Registration.__table__.insert(), [
+        dict(track_id=RACE_ID * 10 + number % 2, user_id=user_id, race_id=RACE_ID,
+             registration_time=dtime(9, 0), user_start_time=dtime(0, 0), number=number)
+        for number, user_id in enumerate(user_ids, start=1)
+    ])
+    update_start_timestamps(RACE_ID)
+    db.session.commit()
+
+    create_race_results_table(RACE_ID)
+    results = []
+    for number in range(1, runners + 1):
+        pace = timedelta(minutes=4, seconds=number % 97)
+        for lap_number in range(1, laps + 1):
+            timestamp = start + pace * lap_number
+            results.append({
+                'number': number, 'tag_id': f'{number:04d}', 'track_id': RACE_ID * 10 + number % 2,
+                'timestamp': timestamp, 'last_seen_time': timestamp, 'lap_number': lap_number,
+                'lap_time_ms': pace // MILLISECOND, 'race_time_ms': pace * lap_number // MILLISECOND
+            })
+    insert_laps(RACE_ID, results)
+    refresh_standings(RACE_ID)
+    bump_results_generation(RACE_ID)
+    db.session.commit()
+
+def legacy_views():
+    # The four views each ran their own variant of this ranking query
+    for _ in range(4):
+        db.session.execute(text(LEGACY_BY_TRACK_SQL), {'race_id': RACE_ID}).fetchall()
+
+def rank_per_view():
+    for _ in range(4):
+        [format_result(entry) for entry in rank_standings(RACE_ID)]
+
+def engine_views():
+    ranking = rankings.ranking(RACE_ID)
+    [format_result(entry) for entry in ranking.by_track()]
+    [format_result(entry) for entry in ranking.by_track()]
+    [format_result(entry) for entry in ranking.by_category()]
+    ranking.for_email('runner1@benchmark.test')
+
+def cold_engine_views():
+    rankings.invalidate(RACE_ID)
+    engine_views()
+
+def my_result():
+    rankings.ranking(RACE_ID).for_email('runner1@benchmark.test')
+
+def measure(func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark results ranking')
+    parser.add_argument('--runners', type=int, default=5000)
+    parser.add_argument('--laps', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database-url', default='sqlite:///:memory:')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = args.database_url
+    db.init_app(app)
+
+    with app.app_context():
+        create_results_table()
+        db.create_all()
+        try:
+            build_race(args.runners, args.laps)
+            print(f'{args.runners} runners x {args.laps} laps on {db.engine.dialect.name}')
+
+            cases = [
+                ('rank per view (4 views)', rank_per_view),
+                ('engine, first request', cold_engine_views),
+                ('engine, ranked (4 views)', engine_views),
+                ('engine, my result', my_result)
+            ]
+            if db.engine.dialect.name == 'postgresql':
+                cases.insert(0, ('legacy SQL (4 views)', legacy_views))
+            else:
+                print('legacy SQL (4 views)     skipped, needs PostgreSQL')
+
+            for name, func in cases:
+                print(f'{name:<24} {measure(func, args.repeat) * 1000:10.2f} ms')
+        finally:
+            db.session.rollback()
+            db.drop_all()
+
+if __name__ == '__main__':
+    main()
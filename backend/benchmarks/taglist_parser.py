@@ -0,0 +1,64 @@
+# benchmarks/taglist_parser.py
+"""
+Micro-benchmark of the taglist parser.
+Compares the former per-line regex + strptime parsing with reader.taglist
+on a synthetic taglist. Run from the backend directory:
+
+    python -m benchmarks.taglist_parser [--lines 10000] [--repeat 5]
+"""
+import argparse
+import re
+import time
+from datetime import datetime, timedelta
+
+from reader.fake_reader import format_tag_line
+from reader.taglist import parse_taglist
+
+LEGACY_PATTERN = r"Tag:([\w\s]+), Disc:(\d{4}/\d{2}/\d{2}\s\d{2}:\d{2}:\d{2}\.\d{3}), Last:(\d{4}/\d{2}/\d{2}\s\d{2}:\d{2}:\d{2}\.\d{3}), Count:(\d+), Ant:(\d+), Proto:(\d+)"
+
+def synthetic_taglist(lines):
+    start = datetime(2024, 4, 1, 10, 0, 0)
+    return '\n'.join(
+        format_tag_line(i % 2000 + 1, start + timedelta(milliseconds=37 * i), count=i % 9 + 1, antenna=i % 4)
+        for i in range(lines)
+    )
+
+def legacy_parse(data):
+    records = []
+    for line in data.split('\n'):
+        if not line.strip():
+            continue
+        match = re.match(LEGACY_PATTERN, line.strip())
+        if match:
+            tag_id, discovered, last_seen, count, antenna, protocol = match.groups()
+            records.append((
+                tag_id.strip(),
+                int(tag_id.strip().split()[-1]),
+                datetime.strptime(discovered, "%Y/%m/%d %H:%M:%S.%f"),
+                datetime.strptime(last_seen, "%Y/%m/%d %H:%M:%S.%f"),
+                int(count), int(antenna), int(protocol)
+            ))
+    return records
+
+def measure(parse, data, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = len(list(parse(data)))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return count, best
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark taglist parsing')
+    parser.add_argument('--lines', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    data = synthetic_taglist(args.lines)
+    for name, parse in (('legacy regex + strptime', legacy_parse), ('reader.taglist', parse_taglist)):
+        count, elapsed = measure(parse, data, args.repeat)
+        print(f'{name:<24} {count} records  {elapsed * 1000:8.2f} ms  {count / elapsed:12,.0f} lines/s')
+
+if __name__ == '__main__':
+    main()
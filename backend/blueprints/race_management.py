@@ -1,13 +1,24 @@
 # blueprints/race_management.py
 from flask import Blueprint, jsonify, request
-from datetime import datetime, time, timedelta
-from sqlalchemy import text
+from datetime import datetime, timedelta
+from time import perf_counter
+from sqlalchemy import update
 from database import db
 from database.race import Race
 from database.track import Track
 from database.category import Category
 from database.registration import Registration
-from database.user import Users
+from database.race_standing import RaceStanding
+from database.category_operations import assign_categories, load_categories, resolve_category
+from database.lineup_operations import load_lineup, plan_lineup, start_timestamp, update_start_timestamps
+from database.race_operations import partition_name, drop_race_results, forget_race_results
+from database.lap_operations import update_lap_times
+from database.standings_operations import update_standing_times, mark_standings_changed
+from database.results_queries import delete_results_generation
+from timing.dedup import read_deduplicator
+from timing.race_state import race_state
+from timing.results_cache import results_cache
+from timing.ranking import rankings
 
 race_management_bp = Blueprint('race_management', __name__)
 
@@ -136,20 +147,8 @@ def add_race():
         db.session.add(new_race)
         db.session.flush()
 
-        new_race.results_table_name = f'race_results_{race_id}'
-        create_results_table = text(f"""
-            CREATE TABLE {new_race.results_table_name} (
-                id SERIAL PRIMARY KEY,
-                number INTEGER NOT NULL,
-                tag_id VARCHAR(255) NOT NULL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                lap_number INTEGER DEFAULT 1,
-                track_id INTEGER NOT NULL,
-                last_seen_time TIMESTAMP,
-                status VARCHAR(5)
-            )
-        """)
-        db.session.execute(create_results_table)
+        # The results partition is created on the first result, see ensure_race_results()
+        new_race.results_table_name = partition_name(race_id)
 
         if 'tracks' in data:
             for i, track_data in enumerate(data['tracks'], 1):
@@ -298,12 +297,18 @@ def update_race(race_id):
 
                 categories_to_delete = existing_category_ids - updated_category_ids
                 if categories_to_delete:
+                    Registration.query.filter(Registration.category_id.in_(categories_to_delete)).\
+                        update({Registration.category_id: None}, synchronize_session=False)
                     Category.query.filter(Category.id.in_(categories_to_delete)).delete(synchronize_session=False)
 
         tracks_to_delete = existing_track_ids - updated_track_ids
         if tracks_to_delete:
             Track.query.filter(Track.id.in_(tracks_to_delete)).delete(synchronize_session=False)
 
+        db.session.flush()
+        assign_categories(race_id)
+
+        race_state.touch(race_id)
         db.session.commit()
         return jsonify({
             "status": "success",
@@ -349,13 +354,23 @@ def delete_race(race_id):
 
         Track.query.filter_by(race_id=race_id).delete(synchronize_session=False)
 
-        if race.results_table_name:
-            drop_table_query = text(f"DROP TABLE IF EXISTS {race.results_table_name}")
-            db.session.execute(drop_table_query)
+        drop_race_results(race_id)
+
+        RaceStanding.query.filter_by(race_id=race_id).delete(synchronize_session=False)
+
+        delete_results_generation(race_id)
 
         db.session.delete(race)
 
+        # Live viewers get the whole race re-ranked once the deletion is committed
+        mark_standings_changed(race_id)
         db.session.commit()
+        race_state.invalidate(race_id)
+        results_cache.invalidate(race_id)
+        rankings.invalidate(race_id)
+        read_deduplicator.clear(race_id)
+        # A request may have found the race again before the commit
+        forget_race_results(race_id)
 
         return jsonify({
             "status": "success",
@@ -415,95 +430,17 @@ def get_race_detail(race_id):
         if not race:
             return jsonify({'error': 'Race not found'}), 404
 
-        tracks = Track.query.filter_by(race_id=race_id).all()
-        track_ids = [track.id for track in tracks]
-
-        registrations = Registration.query.filter(Registration.track_id.in_(track_ids)).all()
-
-        participant_details = []
-
-        category_number_counters = {}
-
-        plus_start_time = race.interval_time
-
-        for registration in registrations:
-            user = Users.query.get(registration.user_id)
-            track = Track.query.get(registration.track_id)
-
-            category = Category.query.filter_by(gender=user.gender, track_id=registration.track_id).\
-                                    filter(Category.min_age <= (datetime.now().year - user.year), 
-                                        Category.max_age >= (datetime.now().year - user.year)).\
-                                    first()
-
-            if not (user and category and track):
-                continue
-
-            category_gender_key = (category.id, user.gender)
-
-            if category_gender_key not in category_number_counters:
-                category_number_counters[category_gender_key] = 0
-
-            category_number_counters[category_gender_key] += 1
-
-            user_number = category.min_number + category_number_counters[category_gender_key] - 1
-
-            participant_details.append({
-                'registration_id': registration.id,
-                'category_id': category.id,
-                'gender': user.gender,
-                'number': user_number,
-                'user_id': user.id,
-                'track_id': track.id
-            })
-
-        sorted_participants = sorted(
-            participant_details, 
-            key=lambda x: (x['category_id'], x['number'])
-        )
-
-        final_participant_details = []
-        for idx, participant in enumerate(sorted_participants):
-            user = Users.query.get(participant['user_id'])
-            track = Track.query.get(participant['track_id'])
-
-            category = Category.query.filter_by(
-                gender=participant['gender'], 
-                track_id=participant['track_id']
-            ).filter(
-                Category.min_age <= (datetime.now().year - user.year), 
-                Category.max_age >= (datetime.now().year - user.year)
-            ).first()
-
-            if race.start == 'I':
-                plus_seconds = (
-                    plus_start_time.hour * 3600 +
-                    plus_start_time.minute * 60 +
-                    plus_start_time.second
-                )
-
-                total_seconds = (
-                    track.expected_start_time.hour * 3600 +
-                    track.expected_start_time.minute * 60 +
-                    track.expected_start_time.second +
-                    (plus_seconds * (idx+1))
-                )
-
-                hours = total_seconds // 3600
-                minutes = (total_seconds % 3600) // 60
-                seconds = total_seconds % 60
-
-                actual_start = time(hour=hours, minute=minutes, second=seconds)
-            else:
-                actual_start = track.expected_start_time
-
-            final_participant_details.append({
-                'number': participant['number'],
-                'firstname': user.firstname,
-                'surname': user.surname,
-                'club': user.club,
-                'category': category.category_name,
-                'track': track.name,
-                'start_time': actual_start.strftime('%H:%M:%S')
+        participants = []
+        for entry in plan_lineup(race, load_lineup(race_id)):
+            start = datetime.combine(race.date, entry.track.expected_start_time) + entry.start_offset
+            participants.append({
+                'number': entry.number,
+                'firstname': entry.user.firstname,
+                'surname': entry.user.surname,
+                'club': entry.user.club,
+                'category': entry.category.category_name,
+                'track': entry.track.name,
+                'start_time': start.strftime('%H:%M:%S')
             })
 
         race_detail = {
@@ -512,7 +449,7 @@ def get_race_detail(race_id):
             'date': race.date.strftime('%Y-%m-%d'),
             'start': race.start,
             'description': race.description,
-            'participants': final_participant_details
+            'participants': participants
         }
         return jsonify({'race': race_detail}), 200
 
@@ -577,6 +514,9 @@ def set_track_start_time():
             start_time = f"{start_time}:00"
 
         track.actual_start_time = datetime.strptime(start_time, '%H:%M:%S').time()
+        db.session.flush()
+        update_start_timestamps(track.race_id, track_id=track.id)
+        race_state.touch(track.race_id)
         db.session.commit()
 
         return jsonify({
@@ -596,13 +536,18 @@ def set_track_start_time():
 def confirm_lineup():
     """
     Confirm race lineup by assigning numbers and start times.
-    Organizes participants by category and gender.
+    Organizes participants by category and gender. Categories are resolved
+    again, participants' details may have changed since registration.
+    Registrations are read in one query and written back in one bulk update.
     
     Returns:
-        tuple: JSON response with confirmation, track list and HTTP status code
+        tuple: JSON response with confirmation, track list, timing in
+        milliseconds and HTTP status code
     """
 
     try:
+        started = perf_counter()
+
         data = request.json
         race_id = data.get('race_id')
 
@@ -611,84 +556,52 @@ def confirm_lineup():
             return jsonify({'error': 'Race not found'}), 404
 
         tracks = Track.query.filter_by(race_id=race_id).all()
-        track_ids = [track.id for track in tracks]
-
-        registrations = Registration.query.filter(Registration.track_id.in_(track_ids)).all()
-
-        participant_details = []
-
-        category_number_counters = {}
-
-        for registration in registrations:
-            user = Users.query.get(registration.user_id)
-            track = Track.query.get(registration.track_id)
-
-            category = Category.query.filter_by(gender=user.gender, track_id=registration.track_id).\
-                                    filter(Category.min_age <= (datetime.now().year - user.year), 
-                                        Category.max_age >= (datetime.now().year - user.year)).\
-                                    first()
-
-            if not (user and category and track):
-                continue
-
-            category_gender_key = (category.id, user.gender)
-
-            if category_gender_key not in category_number_counters:
-                category_number_counters[category_gender_key] = 0
-
-            category_number_counters[category_gender_key] += 1
-
-            user_number = category.min_number + category_number_counters[category_gender_key] - 1
-
-            participant_details.append({
-                'registration_id': registration.id,
-                'category_id': category.id,
-                'gender': user.gender,
-                'number': user_number,
-                'user_id': user.id,
-                'track_id': track.id,
-                'category': category,
-                'user': user,
-                'track': track
-            })
-
-        sorted_participants = sorted(
-            participant_details, 
-            key=lambda x: (x['category_id'], x['number'])
-        )
-
-        for idx, participant in enumerate(sorted_participants):
-            registration = Registration.query.get(participant['registration_id'])
-
-            if race.start == 'I':
-                plus_start_time = race.interval_time
-
-                plus_seconds = (
-                    plus_start_time.hour * 3600 +
-                    plus_start_time.minute * 60 +
-                    plus_start_time.second
-                )
-
-                total_seconds = (
-                    plus_seconds * (idx+1)
-                )
-
-                hours = total_seconds // 3600
-                minutes = (total_seconds % 3600) // 60
-                seconds = total_seconds % 60
-
-                actual_start = time(hour=hours, minute=minutes, second=seconds)
-            else:
-                actual_start = time(hour=0, minute=0, second=0)
-
-            registration.number = participant['number']
-            registration.user_start_time = actual_start
-
+        categories = load_categories(race.id)
+        rows = [
+            (registration, user, track, resolve_category(categories, race, track.id, user))
+            for registration, user, track, _ in load_lineup(race.id)
+        ]
+        loaded = perf_counter()
+
+        lineup = plan_lineup(race, rows)
+        updates = {
+            registration.id: {'id': registration.id, 'category_id': None}
+            for registration, user, track, category in rows
+        }
+        for entry in lineup:
+            user_start_time = (datetime.min + entry.start_offset).time()
+            updates[entry.registration.id].update(
+                category_id=entry.category.id,
+                number=entry.number,
+                user_start_time=user_start_time,
+                start_timestamp=start_timestamp(race.date, entry.track.actual_start_time, user_start_time)
+            )
+        planned = perf_counter()
+
+        # Registrations without a category keep their number, only the category is cleared
+        with_number = [values for values in updates.values() if 'number' in values]
+        without_number = [values for values in updates.values() if 'number' not in values]
+        for batch in (with_number, without_number):
+            if batch:
+                db.session.execute(update(Registration), batch)
+        # Numbers and start instants may have moved, laps already recorded follow
+        update_lap_times(race.id)
+        update_standing_times(race.id)
+
+        race_state.touch(race.id)
         db.session.commit()
+        written = perf_counter()
 
         return jsonify({
             'message': 'Lineup confirmed successfully', 
-            'tracks': [{'id': track.id, 'name': track.name} for track in tracks]
+            'tracks': [{'id': track.id, 'name': track.name} for track in tracks],
+            'participants': len(lineup),
+            'timing': {
+                'load_ms': round((loaded - started) * 1000, 1),
+                'plan_ms': round((planned - loaded) * 1000, 1),
+                'write_ms': round((written - planned) * 1000, 1),
+                'total_ms': round((written - started) * 1000, 1)
+            }
         }), 200
 
     except Exception as e:
@@ -4,8 +4,9 @@ from database import db
 from database.user import Users
 from database.race import Race
 from database.registration import Registration
-from database.category import Category
 from database.track import Track
+from database.category_operations import race_age, find_category
+from database.lineup_operations import start_timestamp
 from datetime import datetime, timedelta
 
 registration_bp = Blueprint('registration', __name__)
@@ -48,20 +49,14 @@ def registration():
         if not race or not track or track.race_id != race_id:
             return jsonify({'error': 'Invalid race or track selection'}), 404
 
-        current_year = datetime.now().year
-        user_age = current_year - year
+        user_age = race_age(race, year)
 
         if user_age < track.min_age or user_age > track.max_age:
             return jsonify({
                 'error': f'Age not eligible for this track. Must be between {track.min_age} and {track.max_age} years old.'
             }), 400
 
-        category = Category.query.filter(
-            Category.track_id == track_id,
-            Category.min_age <= user_age,
-            Category.max_age >= user_age,
-            Category.gender == gender
-        ).first()
+        category = find_category(track.categories, track_id, gender, user_age)
 
         if not category:
             return jsonify({
@@ -84,7 +79,10 @@ def registration():
             user_id=user.id,
             track_id=track_id,
             race_id=race_id,
-            registration_time=current_time.time()
+            registration_time=current_time.time(),
+            category_id=category.id,
+            # Set already if the track has started, the runner is timed from its start
+            start_timestamp=start_timestamp(race.date, track.actual_start_time, None)
         )
         db.session.add(registration)
         db.session.commit()
@@ -1,48 +1,37 @@
 # blueprints/results.py
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, Response, jsonify, request, current_app
 from database import db
-from sqlalchemy import text
-from datetime import datetime, time, timedelta
-import re
+from sqlalchemy import text, update, delete
+from datetime import datetime, timedelta
 
 from database.track import Track
 from database.category import Category
 from database.registration import Registration
+from database.race_result import RaceResult
 from database.user import Users
+from database.results_operations import store_tag_results, MissingStartTimeError
+from database.lap_operations import (
+    get_lap_splits, format_lap, lock_runner_laps, renumber_laps, update_lap_times, LAP_COLUMNS
+)
+from database.race_operations import race_results_exist, insert_race_results
+from database.standings_operations import refresh_standings, format_result
+from timing.dedup import read_deduplicator
+from timing.results_cache import results_cache
+from timing.live import live_results
+from timing.ranking import rankings
+from timing.race_state import race_state, NOT_REGISTERED, MAX_LAPS, TOO_SOON_AFTER_LAP, TOO_SOON_AFTER_START
+from timing.times import (
+    MILLISECOND, truncate_ms, as_duration, format_duration, format_clock, parse_clock, parse_timestamp
+)
 
 results_bp = Blueprint('results', __name__)
 
-def parse_time_with_ms(time_str):
-    """
-    Parse time string with optional milliseconds.
-    Converts string time format to Python time object.
-    
-    Args:
-        time_str (str): Time string in format HH:MM:SS or HH:MM:SS.ms
-        
-    Returns:
-        time: Python time object
-        
-    Raises:
-        ValueError: If time format is invalid
-    """
-
-    if '.' in time_str:
-        time_part, ms_part = time_str.split('.')
-        ms_part = ms_part.ljust(3, '0')[:3]
-        
-    try:
-        base_time = datetime.strptime(time_part, '%H:%M:%S').time()
-        return time(base_time.hour, base_time.minute, base_time.second, 
-                   int(ms_part) * 1000)
-    except ValueError as e:
-        raise ValueError(f"Invalid time format: {str(e)}")
-
 @results_bp.route('/store_results', methods=['POST'])
 def store_results():
     """
     Store RFID tag readings as race results.
-    Processes tag data, validates against registrations and lap times.
+    Drops reads already processed for the track, then validates the rest
+    against registrations and lap times.
     
     Returns:
         tuple: JSON response with stored results status and HTTP status code
@@ -57,6 +46,19 @@ def store_results():
         if not race_id or not track_id:
             return jsonify({"status": "error", "message": "Race ID and Track ID are required"}), 400
 
+        race_id = int(race_id)
+        track_id = int(track_id)
+
+        tags_raw, reads_dropped = read_deduplicator.filter(race_id, track_id, tags_raw)
+        if not tags_raw:
+            return jsonify({
+                "status": "success",
+                "message": f"Stored 0 results for race {race_id}, track {track_id}",
+                "tags_found": [],
+                "reads_processed": 0,
+                "reads_dropped": reads_dropped
+            })
+
         track = Track.query.get(track_id)
         if not track:
             return jsonify({"status": "error", "message": "Track not found"}), 404
@@ -65,144 +67,82 @@ def store_results():
         if not category:
             return jsonify({"status": "error", "message": "Category not found for this track"}), 404
 
-        table_name = f'race_results_{race_id}'
+        try:
+            stored_results, tags_found = store_tag_results(race_id, track, tags_raw)
+        except MissingStartTimeError as e:
+            db.session.rollback()
+            return jsonify({"status": "error", "message": str(e)}), 400
+        read_deduplicator.record(race_id, track_id, tags_raw)
 
-        pattern = r"Tag:([\w\s]+), Disc:(\d{4}/\d{2}/\d{2}\s\d{2}:\d{2}:\d{2}\.\d{3}), Last:(\d{4}/\d{2}/\d{2}\s\d{2}:\d{2}:\d{2}\.\d{3}), Count:(\d+), Ant:(\d+), Proto:(\d+)"
-
-        stored_results = 0
-        tags_found = []
-
-        for line in tags_raw:
-            line = line.strip()
-            if not line:
-                continue
-
-            match = re.match(pattern, line)
-            if not match:
-                continue
-
-            try:
-                tag_id, discovery_time, last_seen_time, count, ant, proto = match.groups()
-
-                number = tag_id.strip().split()[-1]
-                tag_id = tag_id.strip()
-
-                last_seen_datetime = datetime.strptime(last_seen_time, "%Y/%m/%d %H:%M:%S.%f")
-                current_time = (datetime.now() + timedelta(hours=1))
+        return jsonify({
+            "status": "success", 
+            "message": f"Stored {stored_results} results for race {race_id}, track {track_id}",
+            "tags_found": tags_found,
+            "reads_processed": len(tags_raw),
+            "reads_dropped": reads_dropped
+        })
 
-                offset = last_seen_datetime - current_time
-                last_seen_datetime = last_seen_datetime - offset
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error storing results: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
 
-                registration = Registration.query.filter_by(
-                    race_id=race_id, 
-                    track_id=track_id, 
-                    number=number
-                ).first()
+@results_bp.route('/race/<int:race_id>/ingestion_stats', methods=['GET'])
+def get_ingestion_stats(race_id):
+    """
+    Get numbers of processed and dropped RFID reads of a race.
+    Counters are kept per backend process since its start.
 
-                if not registration:
-                    continue
+    Args:
+        race_id (int): ID of the race
 
-                if not track.actual_start_time:
-                    return jsonify({"status": "error", "message": "Actual start time not set for category"}), 400
+    Returns:
+        tuple: JSON response with read counters and HTTP status code
+    """
 
-                user_start_delta = timedelta(
-                    hours=registration.user_start_time.hour, 
-                    minutes=registration.user_start_time.minute, 
-                    seconds=registration.user_start_time.second
-                )
-                category_start_delta = timedelta(
-                    hours=track.actual_start_time.hour, 
-                    minutes=track.actual_start_time.minute, 
-                    seconds=track.actual_start_time.second
-                )
+    stats = read_deduplicator.get_stats(race_id)
+    total = stats['processed'] + stats['dropped']
 
-                total_seconds = user_start_delta.seconds + category_start_delta.seconds
-                hours, remainder = divmod(total_seconds, 3600)
-                minutes, seconds = divmod(remainder, 60)
+    return jsonify({
+        "race_id": race_id,
+        "reads_processed": stats['processed'],
+        "reads_dropped": stats['dropped'],
+        "drop_ratio": round(stats['dropped'] / total, 3) if total else 0
+    }), 200
 
-                user_start_time = time(
-                    hour=hours % 24,
-                    minute=minutes,
-                    second=seconds
-                )
+@results_bp.route('/results_cache/stats', methods=['GET'])
+def get_results_cache_stats():
+    """
+    Get hit and miss counters of the results response cache.
+    Counters are kept per backend process since its start.
 
-                race_start_datetime = datetime.combine(
-                    last_seen_datetime.date(), 
-                    user_start_time
-                )
+    Returns:
+        tuple: JSON response with cache counters and HTTP status code
+    """
 
-                min_lap_duration = timedelta(
-                    hours=track.fastest_possible_time.hour, 
-                    minutes=track.fastest_possible_time.minute, 
-                    seconds=track.fastest_possible_time.second
-                )
+    return jsonify(results_cache.stats()), 200
 
-                last_entry = db.session.execute(
-                    text(f'SELECT lap_number, timestamp, last_seen_time FROM {table_name} WHERE number = :number ORDER BY timestamp DESC LIMIT 1'),
-                    {'number': number}
-                ).fetchone()
+@results_bp.route('/race/<int:race_id>/live', methods=['GET'])
+def stream_race_results(race_id):
+    """
+    Stream live changes of race results as Server-Sent Events.
+    After a 'ready' event, each committed change sends a 'standings' event
+    with deltas (number, track_id, lap, position_track, position_category,
+    race_time, status) of changed runners and runners whose position moved.
+    A 'resync' event asks a lagging client to reload the full results.
 
-                if last_entry:
-                    if last_entry.lap_number >= track.number_of_laps:
-                        continue
+    Args:
+        race_id (int): ID of the race
 
-                if not last_entry:
-                    if last_seen_datetime <= race_start_datetime + min_lap_duration:
-                        continue
-                    lap_number = 1
-                else:
-                    last_tag_time = datetime.strptime(str(last_entry.last_seen_time), "%Y-%m-%d %H:%M:%S.%f")
-
-                    if last_seen_datetime <= last_tag_time + min_lap_duration:
-                        continue
-
-                    lap_number = last_entry.lap_number + 1
-
-                insert_sql = text(f'''
-                    INSERT INTO {table_name} (
-                        number,
-                        tag_id, 
-                        track_id, 
-                        timestamp,
-                        last_seen_time,
-                        lap_number
-                    ) 
-                    VALUES (
-                        :number,
-                        :tag_id, 
-                        :track_id, 
-                        :timestamp,
-                        :last_seen_time,
-                        :lap_number
-                    )
-                ''')
-
-                db.session.execute(insert_sql, {
-                    'number': number,
-                    'tag_id': tag_id, 
-                    'track_id': track_id,
-                    'timestamp': current_time,
-                    'last_seen_time': last_seen_datetime,
-                    'lap_number': lap_number
-                })
-
-                stored_results += 1
-                tags_found.append(tag_id)
-
-            except Exception as e:
-                print(f"Error processing tag: {e}")
+    Returns:
+        Response: Event stream
+    """
 
-        db.session.commit()
-        return jsonify({
-            "status": "success", 
-            "message": f"Stored {stored_results} results for race {race_id}, track {track_id}",
-            "tags_found": tags_found
-        })
-
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error storing results: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    subscriber = live_results.subscribe(race_id)
+    return Response(live_results.stream(subscriber), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 @results_bp.route('/manual_result_store', methods=['POST'])
 def manual_result_store():
@@ -239,124 +179,109 @@ def manual_result_store():
         if not track:
             return jsonify({"status": "error", "message": "Track not found"}), 404
 
-        registration = Registration.query.filter_by(
-            race_id=race_id, 
-            track_id=track_id, 
-            number=number
-        ).first()
-
-        if not registration:
-            return jsonify({"status": "error", "message": "Registration not found"}), 404
-
         if timestamp_str:
             try:
-                timestamp = datetime.combine(
-                    datetime.now().date(), 
-                    (datetime.strptime(timestamp_str, "%H:%M:%S") + timedelta(milliseconds=1)).time()
-                )
+                timestamp = datetime.combine(datetime.now().date(), parse_clock(timestamp_str)) + MILLISECOND
             except ValueError:
                 return jsonify({
                     "status": "error",
                     "message": "Invalid timestamp format. Use HH:MM:SS."
                 }), 400
         else:
-            timestamp = datetime.now() + timedelta(hours=1)
-
-        table_name = f'race_results_{race_id}'
-
-        last_entry = db.session.execute(
-            text(f'SELECT lap_number, timestamp, last_seen_time FROM {table_name} WHERE number = :number ORDER BY timestamp DESC LIMIT 1'),
-            {'number': number}
-        ).fetchone()
-
-        min_lap_duration = timedelta(
-            hours=track.fastest_possible_time.hour,
-            minutes=track.fastest_possible_time.minute,
-            seconds=track.fastest_possible_time.second
-        )
-
-        user_start_delta = timedelta(
-            hours=registration.user_start_time.hour,
-            minutes=registration.user_start_time.minute,
-            seconds=registration.user_start_time.second
-        )
-        category_start_delta = timedelta(
-            hours=track.actual_start_time.hour,
-            minutes=track.actual_start_time.minute,
-            seconds=track.actual_start_time.second
-        )
-
-        total_seconds = user_start_delta.seconds + category_start_delta.seconds
-        hours, remainder = divmod(total_seconds, 3600)
-        minutes, seconds = divmod(remainder, 60)
-
-        user_start_time = time(
-            hour=hours % 24,
-            minute=minutes,
-            second=seconds
-        )
-
-        race_start_datetime = datetime.combine(timestamp.date(), user_start_time)
-
-        if last_entry:
-            if last_entry.lap_number >= track.number_of_laps:
+            timestamp = truncate_ms(datetime.now() + timedelta(hours=1))
+
+        race_id = int(race_id)
+        number = int(number)
+        with race_state.race_lock(race_id):
+            state = race_state.current(race_id)
+            race_state.load_runners(state, [number])
+
+            lap_number, reason = state.decide(
+                number, timestamp, track,
+                check_min_lap=status not in ['DNS', 'DSQ', 'DNF']
+            )
+
+            if reason == NOT_REGISTERED:
+                return jsonify({"status": "error", "message": "Registration not found"}), 404
+            if reason == MAX_LAPS:
                 return jsonify({
                     "status": "error",
                     "message": "Maximum number of laps already recorded"
                 }), 400
-
-            last_tag_time = datetime.strptime(str(last_entry.last_seen_time), "%Y-%m-%d %H:%M:%S.%f")
-
-            if status not in ['DNS', 'DSQ', 'DNF']:
-                if timestamp <= last_tag_time + min_lap_duration:
-                    return jsonify({
-                        "status": "error",
-                        "message": "Time between laps is less than minimum allowed"
-                    }), 400
-
-            lap_number = last_entry.lap_number + 1
-        else:
-            if timestamp <= race_start_datetime + min_lap_duration:
+            if reason == TOO_SOON_AFTER_LAP:
+                return jsonify({
+                    "status": "error",
+                    "message": "Time between laps is less than minimum allowed"
+                }), 400
+            if reason == TOO_SOON_AFTER_START:
                 return jsonify({
                     "status": "error",
                     "message": "Time from race start is less than minimum allowed"
                 }), 400
-            lap_number = 1
-
-        insert_sql = text(f'''
-            INSERT INTO {table_name} (
-                number,
-                tag_id,
-                track_id,
-                timestamp,
-                last_seen_time,
-                lap_number,
-                status
-            ) 
-            VALUES (
-                :number,
-                :tag_id,
-                :track_id,
-                :timestamp,
-                :last_seen_time,
-                :lap_number,
-                :status
-            )
-        ''')
 
-        tag_id = f"manually added Tag: {number}"
+            insert_sql = text('''
+                INSERT INTO race_results (
+                    race_id,
+                    number,
+                    tag_id,
+                    track_id,
+                    timestamp,
+                    last_seen_time,
+                    lap_number,
+                    status,
+                    lap_time_ms,
+                    race_time_ms
+                ) 
+                VALUES (
+                    :race_id,
+                    :number,
+                    :tag_id,
+                    :track_id,
+                    :timestamp,
+                    :last_seen_time,
+                    :lap_number,
+                    :status,
+                    :lap_time_ms,
+                    :race_time_ms
+                )
+                ON CONFLICT (race_id, number, lap_number) DO NOTHING
+            ''')
 
-        db.session.execute(insert_sql, {
-            'number': number,
-            'tag_id': tag_id,
-            'track_id': track_id,
-            'timestamp': timestamp,
-            'last_seen_time': timestamp,
-            'lap_number': lap_number,
-            'status': status if status != 'None' else None
-        })
+            tag_id = f"manually added Tag: {number}"
+            lap_time_ms, race_time_ms = state.lap_times(number, timestamp)
 
-        db.session.commit()
+            inserted = insert_race_results(race_id, insert_sql, {
+                'race_id': race_id,
+                'number': number,
+                'tag_id': tag_id,
+                'track_id': track_id,
+                'timestamp': timestamp,
+                'last_seen_time': timestamp,
+                'lap_number': lap_number,
+                'status': status if status != 'None' else None,
+                'lap_time_ms': lap_time_ms,
+                'race_time_ms': race_time_ms
+            }).rowcount
+
+            if not inserted:
+                # Another writer stored this lap first
+                db.session.rollback()
+                race_state.invalidate(race_id)
+                return jsonify({
+                    "status": "error",
+                    "message": "Results changed concurrently, try again"
+                }), 409
+
+            refresh_standings(race_id, [number])
+            if race_state.advance(state):
+                state.record(number, lap_number, timestamp, timestamp)
+            else:
+                return jsonify({
+                    "status": "error",
+                    "message": "Results changed concurrently, try again"
+                }), 409
+
+            db.session.commit()
 
         return jsonify({
             "status": "success", 
@@ -370,10 +295,12 @@ def manual_result_store():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @results_bp.route('/race/<int:race_id>/results', methods=['GET'])
+@results_cache.cached('results')
 def get_race_results(race_id):
     """
     Retrieve race results with rankings by track and category.
-    Calculates positions, race times, and time behind leaders.
+    Slices the race ranking, which is computed once per change of the
+    results, with positions, race times, and time behind leaders.
     
     Args:
         race_id (int): ID of the race
@@ -383,210 +310,15 @@ def get_race_results(race_id):
     """
 
     try:
-        table_name = f'race_results_{race_id}'
-
-        table_exists_query = text("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_name = :table_name
-            );
-        """)
-        table_exists = db.session.execute(table_exists_query, 
-            {'table_name': table_name}).scalar()
-
-        if not table_exists:
+        if not race_results_exist(race_id):
             return jsonify({'error': f'No results found for race {race_id}'}), 404
 
-        query = text(f"""
-            WITH status_laps AS (
-                SELECT 
-                    r.number,
-                    r.timestamp,
-                    r.lap_number,
-                    r.status,
-                    r.last_seen_time
-                FROM {table_name} r
-                WHERE r.status IN ('DNF', 'DNS', 'DSQ')
-            ),
-            latest_laps AS (
-                SELECT 
-                    r.number,
-                    CASE 
-                        WHEN sl.timestamp IS NOT NULL THEN sl.timestamp
-                        ELSE MAX(r.timestamp)
-                    END as last_lap_timestamp,
-                    CASE 
-                        WHEN sl.lap_number IS NOT NULL THEN sl.lap_number
-                        ELSE MAX(r.lap_number)
-                    END as lap_number,
-                    sl.status,
-                    MAX(r.last_seen_time) as last_seen_time
-                FROM {table_name} r
-                LEFT JOIN (
-                    SELECT DISTINCT ON (number)
-                        number, timestamp, lap_number, status, last_seen_time
-                    FROM status_laps
-                    ORDER BY number, timestamp ASC
-                ) sl ON r.number = sl.number
-                GROUP BY r.number, sl.timestamp, sl.lap_number, sl.status
-            ),
-            ranked_results AS (
-                SELECT 
-                    r.number,
-                    r.timestamp,
-                    ll.lap_number,
-                    ll.status,
-                    ll.last_seen_time,
-                    u.firstname,
-                    u.surname,
-                    u.club,
-                    u.year,
-                    u.gender,
-                    t.name as track_name,
-                    reg.track_id,
-                    c.category_name,
-                    t.actual_start_time,
-                    t.number_of_laps,
-                    reg.user_start_time,
-                    CASE 
-                        WHEN ll.lap_number = t.number_of_laps THEN
-                            TO_CHAR(
-                                (EXTRACT(EPOCH FROM (
-                                    ll.last_lap_timestamp - 
-                                    (date_trunc('day', ll.last_lap_timestamp) + 
-                                    t.actual_start_time::time + 
-                                    reg.user_start_time::interval)
-                                )) || ' seconds')::interval,
-                                'HH24:MI:SS.MS'
-                            )
-                        ELSE '--:--:--'
-                    END as race_time,
-                    CASE 
-                        WHEN ll.status IS NULL AND ll.lap_number = t.number_of_laps THEN
-                            EXTRACT(EPOCH FROM (
-                                ll.last_lap_timestamp - 
-                                (date_trunc('day', ll.last_lap_timestamp) + 
-                                t.actual_start_time::time + 
-                                reg.user_start_time::interval)
-                            ))
-                        ELSE NULL
-                    END as race_time_seconds
-                FROM {table_name} r
-                JOIN latest_laps ll ON r.number = ll.number
-                    AND r.timestamp = ll.last_lap_timestamp
-                JOIN registration reg ON reg.number = r.number 
-                    AND reg.race_id = :race_id
-                JOIN users u ON u.id = reg.user_id
-                JOIN track t ON t.id = reg.track_id
-                LEFT JOIN category c ON c.track_id = reg.track_id 
-                    AND c.gender = u.gender 
-                    AND EXTRACT(YEAR FROM CURRENT_DATE) - u.year 
-                        BETWEEN c.min_age AND c.max_age
-            ),
-            results_with_track_time AS (
-                SELECT *,
-                    MIN(race_time_seconds) OVER (PARTITION BY track_name) as min_track_time,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY track_name 
-                        ORDER BY 
-                            CASE 
-                                WHEN status IS NOT NULL THEN 2
-                                WHEN race_time_seconds IS NULL THEN 1 
-                                ELSE 0 
-                            END,
-                            race_time_seconds
-                    ) as position_track
-                FROM ranked_results
-                WHERE status IS NULL OR status IN ('DNF', 'DNS', 'DSQ')
-            ),
-            results_with_category_time AS (
-                SELECT *,
-                    MIN(race_time_seconds) OVER (PARTITION BY category_name, track_name) as min_category_time,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY category_name, track_name
-                        ORDER BY 
-                            CASE 
-                                WHEN status IS NOT NULL THEN 2
-                                WHEN race_time_seconds IS NULL THEN 1 
-                                ELSE 0 
-                            END,
-                            race_time_seconds
-                    ) as position_category
-                FROM results_with_track_time
-            )
-            SELECT 
-                number,
-                firstname,
-                surname,
-                club,
-                category_name,
-                track_name,
-                status,
-                lap_number,
-                number_of_laps,
-                race_time,
-                last_seen_time,
-                track_id,
-                CASE 
-                    WHEN status IS NOT NULL THEN status
-                    ELSE position_track::text 
-                END as position_track,
-                CASE 
-                    WHEN status IS NOT NULL THEN status
-                    ELSE position_category::text 
-                END as position_category,
-                CASE 
-                    WHEN status IS NOT NULL THEN NULL
-                    WHEN race_time_seconds IS NULL THEN NULL
-                    ELSE TO_CHAR(
-                        ((race_time_seconds - min_track_time) || ' seconds')::interval,
-                        'HH24:MI:SS.MS'
-                    )
-                END as behind_time_track,
-                CASE 
-                    WHEN status IS NOT NULL THEN NULL
-                    WHEN race_time_seconds IS NULL THEN NULL
-                    ELSE TO_CHAR(
-                        ((race_time_seconds - min_category_time) || ' seconds')::interval,
-                        'HH24:MI:SS.MS'
-                    )
-                END as behind_time_category
-            FROM results_with_category_time
-            ORDER BY 
-                track_name,
-                CASE 
-                    WHEN status IS NOT NULL THEN 2
-                    WHEN race_time_seconds IS NULL THEN 1 
-                    ELSE 0 
-                END,
-                race_time_seconds;
-        """)
-
-        results = db.session.execute(query, {'race_id': race_id}).fetchall()
-
-        if not results:
-            return jsonify({'results': []}), 204
-
-        formatted_results = []
-        for row in results:
-            formatted_results.append({
-                'number': row.number,
-                'name': f"{row.firstname} {row.surname}",
-                'club': row.club,
-                'category': row.category_name or 'N/A',
-                'track': row.track_name,
-                'track_id': row.track_id,
-                'race_time': row.race_time or '--:--:--',
-                'last_seen_time': row.last_seen_time.strftime('%H:%M:%S') if row.last_seen_time else '--:--:--',
-                'position_track': row.position_track if row.race_time is not None else '-',
-                'position_category': row.position_category if row.race_time is not None else '-',
-                'behind_time_track': row.behind_time_track or ' ',
-                'behind_time_category': row.behind_time_category or ' ',
-                'status': row.status
-            })
+        ranking = rankings.ranking(race_id)
+        if not ranking.entries and not race_results_exist(race_id, revalidate=True):
+            return jsonify({'error': f'No results found for race {race_id}'}), 404
 
         return jsonify({
-            'results': formatted_results
+            'results': [format_result(entry) for entry in ranking.by_track()]
         }), 200
 
     except Exception as e:
@@ -594,6 +326,7 @@ def get_race_results(race_id):
         return jsonify({'error': 'Failed to fetch race results'}), 500
 
 @results_bp.route('/race/<int:race_id>/results/by-category', methods=['GET'])
+@results_cache.cached('by-category')
 def get_race_results_by_category(race_id):
     """
     Retrieve race results grouped and ranked by category.
@@ -606,178 +339,21 @@ def get_race_results_by_category(race_id):
     """
 
     try:
-        table_name = f'race_results_{race_id}'
-
-        table_exists_query = text("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_name = :table_name
-            );
-        """)
-        table_exists = db.session.execute(table_exists_query, 
-            {'table_name': table_name}).scalar()
-
-        if not table_exists:
+        if not race_results_exist(race_id):
             return jsonify({'error': f'No results found for race {race_id}'}), 404
 
-        query = text(f"""
-            WITH status_laps AS (
-                SELECT 
-                    r.number,
-                    r.timestamp,
-                    r.lap_number,
-                    r.status,
-                    r.last_seen_time
-                FROM {table_name} r
-                WHERE r.status IN ('DNF', 'DNS', 'DSQ')
-            ),
-            latest_laps AS (
-                SELECT 
-                    r.number,
-                    CASE 
-                        WHEN sl.timestamp IS NOT NULL THEN sl.timestamp
-                        ELSE MAX(r.timestamp)
-                    END as last_lap_timestamp,
-                    CASE 
-                        WHEN sl.lap_number IS NOT NULL THEN sl.lap_number
-                        ELSE MAX(r.lap_number)
-                    END as lap_number,
-                    sl.status,
-                    MAX(r.last_seen_time) as last_seen_time
-                FROM {table_name} r
-                LEFT JOIN (
-                    SELECT DISTINCT ON (number)
-                        number, timestamp, lap_number, status, last_seen_time
-                    FROM status_laps
-                    ORDER BY number, timestamp ASC
-                ) sl ON r.number = sl.number
-                GROUP BY r.number, sl.timestamp, sl.lap_number, sl.status
-            ),
-            ranked_results AS (
-                SELECT 
-                    r.number,
-                    r.timestamp,
-                    ll.lap_number,
-                    ll.status,
-                    ll.last_seen_time,
-                    u.firstname,
-                    u.surname,
-                    u.club,
-                    u.year,
-                    u.gender,
-                    t.name as track_name,
-                    reg.track_id,
-                    c.category_name,
-                    t.actual_start_time,
-                    t.number_of_laps,
-                    reg.user_start_time,
-                    CASE 
-                        WHEN ll.lap_number = t.number_of_laps THEN
-                            TO_CHAR(
-                                (EXTRACT(EPOCH FROM (
-                                    ll.last_lap_timestamp - 
-                                    (date_trunc('day', ll.last_lap_timestamp) + 
-                                    t.actual_start_time::time + 
-                                    reg.user_start_time::interval)
-                                )) || ' seconds')::interval,
-                                'HH24:MI:SS'
-                            )
-                        ELSE '--:--:--'
-                    END as race_time,
-                    CASE 
-                        WHEN ll.status IS NULL AND ll.lap_number = t.number_of_laps THEN
-                            EXTRACT(EPOCH FROM (
-                                ll.last_lap_timestamp - 
-                                (date_trunc('day', ll.last_lap_timestamp) + 
-                                t.actual_start_time::time + 
-                                reg.user_start_time::interval)
-                            ))
-                        ELSE NULL
-                    END as race_time_seconds
-                FROM {table_name} r
-                JOIN latest_laps ll ON r.number = ll.number
-                    AND r.timestamp = ll.last_lap_timestamp
-                JOIN registration reg ON reg.number = r.number 
-                    AND reg.race_id = :race_id
-                JOIN users u ON u.id = reg.user_id
-                JOIN track t ON t.id = reg.track_id
-                LEFT JOIN category c ON c.track_id = reg.track_id 
-                    AND c.gender = u.gender 
-                    AND EXTRACT(YEAR FROM CURRENT_DATE) - u.year 
-                        BETWEEN c.min_age AND c.max_age
-            ),
-            results_with_category_time AS (
-                SELECT *,
-                    MIN(race_time_seconds) OVER (PARTITION BY category_name, track_name) as min_category_time,
-                    RANK() OVER (
-                        PARTITION BY category_name, track_name
-                        ORDER BY 
-                            CASE 
-                                WHEN status IS NOT NULL THEN 2
-                                WHEN race_time_seconds IS NULL THEN 1 
-                                ELSE 0 
-                            END,
-                            race_time_seconds
-                    ) as position_category
-                FROM ranked_results
-                WHERE status IS NULL OR status IN ('DNF', 'DNS', 'DSQ')
-            )
-            SELECT 
-                number,
-                firstname,
-                surname,
-                club,
-                category_name,
-                track_name,
-                status,
-                lap_number,
-                number_of_laps,
-                race_time,
-                last_seen_time,
-                track_id,
-                CASE 
-                    WHEN status IS NOT NULL THEN status
-                    ELSE position_category::text 
-                END as position_category,
-                CASE 
-                    WHEN status IS NOT NULL THEN NULL
-                    WHEN race_time_seconds IS NULL THEN NULL
-                    ELSE TO_CHAR(
-                        ((race_time_seconds - min_category_time) || ' seconds')::interval,
-                        'HH24:MI:SS'
-                    )
-                END as behind_time_category
-            FROM results_with_category_time
-            ORDER BY 
-                category_name,
-                track_name,
-                CASE 
-                    WHEN status IS NOT NULL THEN 2
-                    WHEN race_time_seconds IS NULL THEN 1 
-                    ELSE 0 
-                END,
-                race_time_seconds;
-        """)
-
-        results = db.session.execute(query, {'race_id': race_id}).fetchall()
-
-        if not results:
-            return jsonify({'results': []}), 204
+        ranking = rankings.ranking(race_id)
+        if not ranking.entries and not race_results_exist(race_id, revalidate=True):
+            return jsonify({'error': f'No results found for race {race_id}'}), 404
 
         formatted_results = []
-        for row in results:
+        for entry in ranking.by_category():
+            result = format_result(entry)
             formatted_results.append({
-                'number': row.number,
-                'name': f"{row.firstname} {row.surname}",
-                'club': row.club,
-                'category': row.category_name or 'N/A',
-                'track': row.track_name,
-                'track_id': row.track_id,
-                'race_time': row.race_time or '--:--:--',
-                'last_seen_time': row.last_seen_time.strftime('%H:%M:%S') if row.last_seen_time else '--:--:--',
-                'position_category': row.position_category if row.race_time is not None else '-',
-                'behind_time_category': row.behind_time_category or ' ',
-                'status': row.status
+                key: result[key] for key in (
+                    'number', 'name', 'club', 'category', 'track', 'track_id', 'race_time',
+                    'last_seen_time', 'position_category', 'behind_time_category', 'status'
+                )
             })
 
         return jsonify({
@@ -789,6 +365,7 @@ def get_race_results_by_category(race_id):
         return jsonify({'error': 'Failed to fetch race results'}), 500
 
 @results_bp.route('/race/<int:race_id>/results/by-track', methods=['GET'])
+@results_cache.cached('by-track')
 def get_race_results_by_track(race_id):
     """
     Retrieve race results grouped and ranked by track.
@@ -801,177 +378,21 @@ def get_race_results_by_track(race_id):
     """
 
     try:
-        table_name = f'race_results_{race_id}'
-
-        table_exists_query = text("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_name = :table_name
-            );
-        """)
-        table_exists = db.session.execute(table_exists_query, 
-            {'table_name': table_name}).scalar()
-
-        if not table_exists:
+        if not race_results_exist(race_id):
             return jsonify({'error': f'No results found for race {race_id}'}), 404
 
-        query = text(f"""
-            WITH status_laps AS (
-                SELECT 
-                    r.number,
-                    r.timestamp,
-                    r.lap_number,
-                    r.status,
-                    r.last_seen_time
-                FROM {table_name} r
-                WHERE r.status IN ('DNF', 'DNS', 'DSQ')
-            ),
-            latest_laps AS (
-                SELECT 
-                    r.number,
-                    CASE 
-                        WHEN sl.timestamp IS NOT NULL THEN sl.timestamp
-                        ELSE MAX(r.timestamp)
-                    END as last_lap_timestamp,
-                    CASE 
-                        WHEN sl.lap_number IS NOT NULL THEN sl.lap_number
-                        ELSE MAX(r.lap_number)
-                    END as lap_number,
-                    sl.status,
-                    MAX(r.last_seen_time) as last_seen_time
-                FROM {table_name} r
-                LEFT JOIN (
-                    SELECT DISTINCT ON (number)
-                        number, timestamp, lap_number, status, last_seen_time
-                    FROM status_laps
-                    ORDER BY number, timestamp ASC
-                ) sl ON r.number = sl.number
-                GROUP BY r.number, sl.timestamp, sl.lap_number, sl.status
-            ),
-            ranked_results AS (
-                SELECT 
-                    r.number,
-                    r.timestamp,
-                    ll.lap_number,
-                    ll.status,
-                    ll.last_seen_time,
-                    u.firstname,
-                    u.surname,
-                    u.club,
-                    u.year,
-                    u.gender,
-                    t.name as track_name,
-                    reg.track_id,
-                    c.category_name,
-                    t.actual_start_time,
-                    t.number_of_laps,
-                    reg.user_start_time,
-                    CASE 
-                        WHEN ll.lap_number = t.number_of_laps THEN
-                            TO_CHAR(
-                                (EXTRACT(EPOCH FROM (
-                                    ll.last_lap_timestamp - 
-                                    (date_trunc('day', ll.last_lap_timestamp) + 
-                                    t.actual_start_time::time + 
-                                    reg.user_start_time::interval)
-                                )) || ' seconds')::interval,
-                                'HH24:MI:SS'
-                            )
-                        ELSE '--:--:--'
-                    END as race_time,
-                    CASE 
-                        WHEN ll.status IS NULL AND ll.lap_number = t.number_of_laps THEN
-                            EXTRACT(EPOCH FROM (
-                                ll.last_lap_timestamp - 
-                                (date_trunc('day', ll.last_lap_timestamp) + 
-                                t.actual_start_time::time + 
-                                reg.user_start_time::interval)
-                            ))
-                        ELSE NULL
-                    END as race_time_seconds
-                FROM {table_name} r
-                JOIN latest_laps ll ON r.number = ll.number
-                    AND r.timestamp = ll.last_lap_timestamp
-                JOIN registration reg ON reg.number = r.number 
-                    AND reg.race_id = :race_id
-                JOIN users u ON u.id = reg.user_id
-                JOIN track t ON t.id = reg.track_id
-                LEFT JOIN category c ON c.track_id = reg.track_id 
-                    AND c.gender = u.gender 
-                    AND EXTRACT(YEAR FROM CURRENT_DATE) - u.year 
-                        BETWEEN c.min_age AND c.max_age
-            ),
-            results_with_track_time AS (
-                SELECT *,
-                    MIN(race_time_seconds) OVER (PARTITION BY track_name) as min_track_time,
-                    RANK() OVER (
-                        PARTITION BY track_name 
-                        ORDER BY 
-                            CASE 
-                                WHEN status IS NOT NULL THEN 2
-                                WHEN race_time_seconds IS NULL THEN 1 
-                                ELSE 0 
-                            END,
-                            race_time_seconds
-                    ) as position_track
-                FROM ranked_results
-                WHERE status IS NULL OR status IN ('DNF', 'DNS', 'DSQ')
-            )
-            SELECT 
-                number,
-                firstname,
-                surname,
-                club,
-                category_name,
-                track_name,
-                status,
-                lap_number,
-                number_of_laps,
-                race_time,
-                last_seen_time,
-                track_id,
-                CASE 
-                    WHEN status IS NOT NULL THEN status
-                    ELSE position_track::text 
-                END as position_track,
-                CASE 
-                    WHEN status IS NOT NULL THEN NULL
-                    WHEN race_time_seconds IS NULL THEN NULL
-                    ELSE TO_CHAR(
-                        ((race_time_seconds - min_track_time) || ' seconds')::interval,
-                        'HH24:MI:SS'
-                    )
-                END as behind_time_track
-            FROM results_with_track_time
-            ORDER BY 
-                track_name,
-                CASE 
-                    WHEN status IS NOT NULL THEN 2
-                    WHEN race_time_seconds IS NULL THEN 1 
-                    ELSE 0 
-                END,
-                race_time_seconds;
-        """)
-
-        results = db.session.execute(query, {'race_id': race_id}).fetchall()
-
-        if not results:
-            return jsonify({'results': []}), 204
+        ranking = rankings.ranking(race_id)
+        if not ranking.entries and not race_results_exist(race_id, revalidate=True):
+            return jsonify({'error': f'No results found for race {race_id}'}), 404
 
         formatted_results = []
-        for row in results:
+        for entry in ranking.by_track():
+            result = format_result(entry)
             formatted_results.append({
-                'number': row.number,
-                'name': f"{row.firstname} {row.surname}",
-                'club': row.club,
-                'category': row.category_name or 'N/A',
-                'track': row.track_name,
-                'track_id': row.track_id,
-                'race_time': row.race_time or '--:--:--',
-                'last_seen_time': row.last_seen_time.strftime('%H:%M:%S') if row.last_seen_time else '--:--:--',
-                'position_track': row.position_track if row.race_time is not None else '-',
-                'behind_time_track': row.behind_time_track or ' ',
-                'status': row.status
+                key: result[key] for key in (
+                    'number', 'name', 'club', 'category', 'track', 'track_id', 'race_time',
+                    'last_seen_time', 'position_track', 'behind_time_track', 'status'
+                )
             })
 
         return jsonify({
@@ -983,6 +404,7 @@ def get_race_results_by_track(race_id):
         return jsonify({'error': 'Failed to fetch race results'}), 500
 
 @results_bp.route('/race/<int:race_id>/racer/<int:number>/laps', methods=['GET'])
+@results_cache.cached('racer-laps')
 def get_runner_laps(race_id, number):
     """
     Get all lap times for a specific runner.
@@ -997,69 +419,104 @@ def get_runner_laps(race_id, number):
     """
 
     try:
-        table_name = f'race_results_{race_id}'
-
-        query = text(f"""
-            WITH runner_laps AS (
-                SELECT 
-                    r.lap_number,
-                    r.timestamp,
-                    reg.user_start_time,
-                    t.actual_start_time
-                FROM {table_name} r
-                JOIN registration reg ON reg.number = r.number 
-                    AND reg.race_id = :race_id
-                JOIN track t ON t.id = reg.track_id
-                WHERE r.number = :number
-                ORDER BY r.lap_number
-            ),
-            lap_times AS (
-                SELECT 
-                    lap_number,
-                    timestamp,
-                    CASE 
-                        WHEN lap_number = 1 THEN
-                            timestamp - (date_trunc('day', timestamp) + 
-                                actual_start_time::time + 
-                                user_start_time::interval)
-                        ELSE
-                            timestamp - LAG(timestamp) OVER (ORDER BY lap_number)
-                    END as lap_time,
-                    timestamp - (date_trunc('day', timestamp) + 
-                        actual_start_time::time + 
-                        user_start_time::interval) as total_time
-                FROM runner_laps
-            )
-            SELECT 
-                lap_number,
-                TO_CHAR(timestamp, 'HH24:MI:SS') as timestamp,
-                TO_CHAR(lap_time, 'HH24:MI:SS.MS') as lap_time,
-                TO_CHAR(total_time, 'HH24:MI:SS.MS') as total_time
-            FROM lap_times
-            ORDER BY lap_number;
-        """)
-
-        results = db.session.execute(query, {
-            'race_id': race_id,
-            'number': number
-        }).fetchall()
-
-        if not results:
-            return jsonify({'error': 'No lap data found'}), 404
+        laps = get_lap_splits(race_id, number=number).get(number)
 
-        laps = [{
-            'lap_number': row.lap_number,
-            'timestamp': row.timestamp,
-            'lap_time': row.lap_time,
-            'total_time': row.total_time
-        } for row in results]
+        if not laps:
+            return jsonify({'error': 'No lap data found'}), 404
 
-        return jsonify({'laps': laps}), 200
+        return jsonify({'laps': [format_lap(lap) for lap in laps]}), 200
 
     except Exception as e:
         current_app.logger.error(f'Error fetching runner laps: {str(e)}')
         return jsonify({'error': 'Failed to fetch runner laps'}), 500
 
+def _laps_response(race_id, track_id=None, category=None):
+    """
+    Lap times of many runners as a compact payload: each lap is a list of
+    values in the order given by 'columns'.
+
+    Args:
+        race_id (int): ID of the race
+        track_id (int): Only runners of this track, all tracks if None
+        category (str): Only runners of this category, all categories if None
+
+    Returns:
+        tuple: JSON response with laps by bib number and HTTP status code
+    """
+
+    if not race_results_exist(race_id):
+        return jsonify({'error': 'Race not found'}), 404
+
+    laps_by_number = {}
+    for number, laps in get_lap_splits(race_id, track_id=track_id, category=category).items():
+        formatted = [format_lap(lap) for lap in laps]
+        laps_by_number[str(number)] = [[lap[column] for column in LAP_COLUMNS] for lap in formatted]
+
+    if not laps_by_number and not race_results_exist(race_id, revalidate=True):
+        return jsonify({'error': 'Race not found'}), 404
+
+    return jsonify({'columns': LAP_COLUMNS, 'laps': laps_by_number}), 200
+
+@results_bp.route('/race/<int:race_id>/laps', methods=['GET'])
+@results_cache.cached('laps')
+def get_race_laps(race_id):
+    """
+    Get lap times of all runners of a race in one request.
+    Replaces fetching /racer/<number>/laps for every row of the results.
+
+    Args:
+        race_id (int): ID of the race
+
+    Returns:
+        tuple: JSON response with laps by bib number and HTTP status code
+    """
+
+    try:
+        return _laps_response(race_id)
+    except Exception as e:
+        current_app.logger.error(f'Error fetching race laps: {str(e)}')
+        return jsonify({'error': 'Failed to fetch race laps'}), 500
+
+@results_bp.route('/race/<int:race_id>/track/<int:track_id>/laps', methods=['GET'])
+@results_cache.cached('track-laps')
+def get_track_laps(race_id, track_id):
+    """
+    Get lap times of all runners of a track.
+
+    Args:
+        race_id (int): ID of the race
+        track_id (int): ID of the track
+
+    Returns:
+        tuple: JSON response with laps by bib number and HTTP status code
+    """
+
+    try:
+        return _laps_response(race_id, track_id=track_id)
+    except Exception as e:
+        current_app.logger.error(f'Error fetching track laps: {str(e)}')
+        return jsonify({'error': 'Failed to fetch track laps'}), 500
+
+@results_bp.route('/race/<int:race_id>/category/<category>/laps', methods=['GET'])
+@results_cache.cached('category-laps')
+def get_category_laps(race_id, category):
+    """
+    Get lap times of all runners of a category.
+
+    Args:
+        race_id (int): ID of the race
+        category (str): Category name
+
+    Returns:
+        tuple: JSON response with laps by bib number and HTTP status code
+    """
+
+    try:
+        return _laps_response(race_id, category=category)
+    except Exception as e:
+        current_app.logger.error(f'Error fetching category laps: {str(e)}')
+        return jsonify({'error': 'Failed to fetch category laps'}), 500
+
 @results_bp.route('/race/<int:race_id>/result/update', methods=['POST'])
 def update_race_result(race_id):
     """
@@ -1093,24 +550,24 @@ def update_race_result(race_id):
         if not track or not registration:
             return jsonify({'error': 'Track or registration not found'}), 404
 
-        table_name = f'race_results_{race_id}'
         updates = []
-        params = {'number': number}
+        params = {'race_id': race_id, 'number': number}
 
         if status is not None or 'status' in data:
-            status_update_query = text(f"""
-                UPDATE {table_name}
+            status_update_query = text("""
+                UPDATE race_results
                 SET status = :status
-                WHERE number = :number
+                WHERE race_id = :race_id AND number = :number
             """)
             db.session.execute(status_update_query, {
+                'race_id': race_id,
                 'status': status,
                 'number': number
             })
 
         if last_seen_time:
             try:
-                time_obj = parse_time_with_ms(last_seen_time)
+                time_obj = parse_clock(last_seen_time)
                 full_last_seen = datetime.combine(datetime.now().date(), time_obj)
                 
                 updates.append("last_seen_time = :last_seen_time")
@@ -1125,33 +582,12 @@ def update_race_result(race_id):
 
         if new_time:
             try:
-                time_obj = parse_time_with_ms(new_time)
-
-                actual_start_time = track.actual_start_time
-                user_start_time = registration.user_start_time
+                time_obj = parse_clock(new_time)
 
-                if not actual_start_time or not user_start_time:
+                if registration.start_timestamp is None:
                     return jsonify({'error': 'Missing start time information'}), 400
 
-                actual_delta = timedelta(hours=actual_start_time.hour,
-                                    minutes=actual_start_time.minute,
-                                    seconds=actual_start_time.second,
-                                    microseconds=actual_start_time.microsecond)
-
-                user_delta = timedelta(hours=user_start_time.hour,
-                                    minutes=user_start_time.minute,
-                                    seconds=user_start_time.second,
-                                    microseconds=user_start_time.microsecond)
-
-                time_delta = timedelta(hours=time_obj.hour,
-                                    minutes=time_obj.minute,
-                                    seconds=time_obj.second,
-                                    microseconds=time_obj.microsecond)
-
-                total_time = actual_delta + user_delta + time_delta
-
-                current_date = datetime.now().date()
-                final_timestamp = datetime.combine(current_date, datetime.min.time()) + total_time
+                final_timestamp = registration.start_timestamp + as_duration(time_obj)
 
                 updates.append("timestamp = :new_timestamp")
                 params['new_timestamp'] = final_timestamp
@@ -1164,18 +600,21 @@ def update_race_result(race_id):
 
         if updates:
             update_query = text(f"""
-                UPDATE {table_name}
+                UPDATE race_results
                 SET {', '.join(updates)}
-                WHERE number = :number
+                WHERE race_id = :race_id AND number = :number
                 AND lap_number = (
                     SELECT MAX(lap_number)
-                    FROM {table_name}
-                    WHERE number = :number
+                    FROM race_results
+                    WHERE race_id = :race_id AND number = :number
                 )
             """)
 
             db.session.execute(update_query, params)
+            update_lap_times(race_id, [number])
 
+        refresh_standings(race_id, [number])
+        race_state.touch(race_id)
         db.session.commit()
 
         return jsonify({
@@ -1193,7 +632,9 @@ def update_race_result(race_id):
 def update_lap_time(race_id):
     """
     Update time for a specific lap.
-    Recalculates subsequent lap times to maintain consistency.
+    The runner's laps are locked, the lap gets its new timestamp and all laps
+    are renumbered in passing order in one statement. Times of the other
+    laps are kept, their stored lap times are recomputed.
     
     Args:
         race_id (int): ID of the race
@@ -1215,7 +656,10 @@ def update_lap_time(race_id):
         if not lap_time and not timestamp:
             return jsonify({'error': 'Either lap_time or timestamp must be provided'}), 400
 
-        table_name = f'race_results_{race_id}'
+        try:
+            time_obj = parse_clock(timestamp or lap_time)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid time format: {str(e)}'}), 400
 
         registration = Registration.query.filter_by(
             race_id=race_id,
@@ -1225,175 +669,48 @@ def update_lap_time(race_id):
         if not registration:
             return jsonify({'error': 'Runner not found'}), 404
 
-        track = Track.query.get(registration.track_id)
+        track = db.session.get(Track, registration.track_id)
         if not track:
             return jsonify({'error': 'Track not found'}), 404
 
-        query = text(f"""
-            SELECT 
-                lap_number,
-                timestamp
-            FROM {table_name}
-            WHERE number = :number
-            ORDER BY lap_number
-        """)
-
-        laps = db.session.execute(query, {'number': number}).fetchall()
-
-        target_lap = None
-        for lap in laps:
-            if lap.lap_number == lap_number:
-                target_lap = lap
-                break
-
-        if not target_lap:
-            return jsonify({'error': 'Lap not found'}), 404
+        with race_state.race_lock(race_id):
+            laps = {lap.lap_number: lap for lap in lock_runner_laps(race_id, number)}
 
-        if timestamp:
-            try:
-                time_obj = parse_time_with_ms(timestamp)
-                update_query = text(f"""
-                    UPDATE {table_name}
-                    SET 
-                        timestamp = DATE(timestamp) + time :time_obj,
-                        last_seen_time = DATE(timestamp) + time :time_obj
-                    WHERE number = :number
-                    AND lap_number = :lap_number
-                    RETURNING timestamp
-                """)
-                result = db.session.execute(update_query, {
-                    'time_obj': time_obj,
-                    'number': number,
-                    'lap_number': lap_number
-                }).first()
-                
-                if not result:
-                    return jsonify({'error': 'Failed to update timestamp'}), 500
+            target_lap = laps.get(lap_number)
+            if not target_lap:
+                return jsonify({'error': 'Lap not found'}), 404
 
-                new_timestamp = result[0]
+            time_delta = as_duration(time_obj)
 
-            except ValueError as e:
-                return jsonify({'error': f'Invalid time format: {str(e)}'}), 400
+            if timestamp:
+                new_timestamp = datetime.combine(target_lap.timestamp.date(), time_obj)
+            elif lap_number == 1:
+                if registration.start_timestamp is None:
+                    return jsonify({'error': 'Start time not set'}), 400
 
-        else:
-            try:
-                time_obj = parse_time_with_ms(lap_time)
-            except ValueError as e:
-                return jsonify({'error': f'Invalid time format: {str(e)}'}), 400
-
-            if lap_number == 1:
-                actual_start = datetime.combine(target_lap.timestamp.date(), track.actual_start_time)
-                user_start_delta = timedelta(
-                    hours=registration.user_start_time.hour,
-                    minutes=registration.user_start_time.minute,
-                    seconds=registration.user_start_time.second,
-                    microseconds=registration.user_start_time.microsecond
-                )
-
-                time_delta = timedelta(
-                    hours=time_obj.hour,
-                    minutes=time_obj.minute,
-                    seconds=time_obj.second,
-                    microseconds=time_obj.microsecond
-                )
-
-                new_timestamp = actual_start + user_start_delta + time_delta
+                new_timestamp = registration.start_timestamp + time_delta
             else:
-                prev_lap = None
-                for lap in laps:
-                    if lap.lap_number == lap_number - 1:
-                        prev_lap = lap
-                        break
-
+                prev_lap = laps.get(lap_number - 1)
                 if not prev_lap:
                     return jsonify({'error': 'Previous lap not found'}), 404
 
-                time_delta = timedelta(
-                    hours=time_obj.hour,
-                    minutes=time_obj.minute,
-                    seconds=time_obj.second,
-                    microseconds=time_obj.microsecond
-                )
-
                 new_timestamp = prev_lap.timestamp + time_delta
 
-            update_query = text(f"""
-                UPDATE {table_name}
-                SET 
-                    timestamp = :new_timestamp,
-                    last_seen_time = :new_timestamp
-                WHERE number = :number
-                AND lap_number = :lap_number
-            """)
-
-            db.session.execute(update_query, {
-                'new_timestamp': new_timestamp,
-                'number': number,
-                'lap_number': lap_number
-            })
-
-        subsequent_laps = [lap for lap in laps if lap.lap_number > lap_number]
-        for next_lap in subsequent_laps:
-            query = text(f"""
-                SELECT 
-                    timestamp - LAG(timestamp) OVER (ORDER BY lap_number) as lap_time
-                FROM {table_name}
-                WHERE number = :number
-                AND lap_number = :lap_number
-            """)
-
-            result = db.session.execute(query, {
-                'number': number,
-                'lap_number': next_lap.lap_number
-            }).first()
-
-            if result and result.lap_time:
-                update_query = text(f"""
-                    UPDATE {table_name}
-                    SET 
-                        timestamp = (
-                            SELECT timestamp + :lap_time
-                            FROM {table_name}
-                            WHERE number = :number
-                            AND lap_number = :prev_lap_number
-                        ),
-                        last_seen_time = (
-                            SELECT timestamp + :lap_time
-                            FROM {table_name}
-                            WHERE number = :number
-                            AND lap_number = :prev_lap_number
-                        )
-                    WHERE number = :number
-                    AND lap_number = :lap_number
-                """)
-
-                db.session.execute(update_query, {
-                    'lap_time': result.lap_time,
-                    'number': number,
-                    'prev_lap_number': next_lap.lap_number - 1,
-                    'lap_number': next_lap.lap_number
-                })
-
-        final_lap_query = text(f"""
-            UPDATE {table_name}
-            SET 
-                last_seen_time = timestamp,
-                timestamp = timestamp
-            WHERE number = :number
-            AND lap_number = (
-                SELECT MAX(lap_number)
-                FROM {table_name}
-                WHERE number = :number
+            db.session.execute(
+                update(RaceResult).where(
+                    RaceResult.race_id == race_id,
+                    RaceResult.id == target_lap.id
+                ).values(timestamp=new_timestamp, last_seen_time=new_timestamp)
             )
-        """)
+            renumber_laps(race_id, number)
 
-        db.session.execute(final_lap_query, {'number': number})
-
-        db.session.commit()
+            refresh_standings(race_id, [number])
+            race_state.touch(race_id)
+            db.session.commit()
 
         return jsonify({
             'message': 'Lap updated successfully',
-            'new_timestamp': new_timestamp.strftime('%H:%M:%S.%f')[:-3]
+            'new_timestamp': format_clock(new_timestamp, milliseconds=True)
         }), 200
 
     except Exception as e:
@@ -1404,8 +721,9 @@ def update_lap_time(race_id):
 @results_bp.route('/race/<int:race_id>/lap/delete', methods=['POST'])
 def delete_lap(race_id):
     """
-    Delete a lap record and updates subsequent laps.
-    Maintains lap sequence and timing consistency.
+    Delete a lap record and renumber the following laps.
+    Timestamps of the other laps are kept, so the next lap's time spans
+    the deleted one.
     
     Args:
         race_id (int): ID of the race
@@ -1422,8 +740,6 @@ def delete_lap(race_id):
         if not number or not lap_number:
             return jsonify({'error': 'Missing required fields'}), 400
 
-        table_name = f'race_results_{race_id}'
-
         registration = Registration.query.filter_by(
             race_id=race_id,
             number=number
@@ -1432,104 +748,26 @@ def delete_lap(race_id):
         if not registration:
             return jsonify({'error': 'Runner not found'}), 404
 
-        query = text(f"""
-            SELECT 
-                lap_number,
-                timestamp
-            FROM {table_name}
-            WHERE number = :number
-            ORDER BY lap_number
-        """)
-
-        laps = db.session.execute(query, {'number': number}).fetchall()
-        
-        target_lap = None
-        for lap in laps:
-            if lap.lap_number == lap_number:
-                target_lap = lap
-                break
-
-        if not target_lap:
-            return jsonify({'error': 'Lap not found'}), 404
-
-        delete_query = text(f"""
-            DELETE FROM {table_name}
-            WHERE number = :number
-            AND lap_number = :lap_number
-        """)
-
-        db.session.execute(delete_query, {
-            'number': number,
-            'lap_number': lap_number
-        })
+        with race_state.race_lock(race_id):
+            target_lap = next(
+                (lap for lap in lock_runner_laps(race_id, number) if lap.lap_number == lap_number),
+                None
+            )
 
-        subsequent_laps = [lap for lap in laps if lap.lap_number > lap_number]
+            if not target_lap:
+                return jsonify({'error': 'Lap not found'}), 404
 
-        if subsequent_laps:
-            prev_lap_query = text(f"""
-                SELECT timestamp
-                FROM {table_name}
-                WHERE number = :number
-                AND lap_number < :deleted_lap_number
-                ORDER BY lap_number DESC
-                LIMIT 1
-            """)
-
-            prev_lap = db.session.execute(prev_lap_query, {
-                'number': number,
-                'deleted_lap_number': lap_number
-            }).first()
-
-            prev_timestamp = prev_lap.timestamp if prev_lap else None
-
-            for next_lap in subsequent_laps:
-                lap_time_query = text(f"""
-                    SELECT 
-                        timestamp - LAG(timestamp) OVER (ORDER BY lap_number) as lap_time
-                    FROM {table_name}
-                    WHERE number = :number
-                    AND lap_number = :lap_number
-                """)
-
-                result = db.session.execute(lap_time_query, {
-                    'number': number,
-                    'lap_number': next_lap.lap_number
-                }).first()
-
-                if result and result.lap_time and prev_timestamp:
-                    update_query = text(f"""
-                        UPDATE {table_name}
-                        SET 
-                            timestamp = :new_timestamp,
-                            last_seen_time = :new_timestamp
-                        WHERE number = :number
-                        AND lap_number = :lap_number
-                    """)
-
-                    new_timestamp = prev_timestamp + result.lap_time
-
-                    db.session.execute(update_query, {
-                        'new_timestamp': new_timestamp,
-                        'number': number,
-                        'lap_number': next_lap.lap_number
-                    })
-
-                    prev_timestamp = new_timestamp
-
-        final_lap_query = text(f"""
-            UPDATE {table_name}
-            SET last_seen_time = timestamp
-            WHERE number = :number
-            AND lap_number = (
-                SELECT MAX(lap_number)
-                FROM {table_name}
-                WHERE number = :number
+            db.session.execute(
+                delete(RaceResult).where(
+                    RaceResult.race_id == race_id,
+                    RaceResult.id == target_lap.id
+                )
             )
-        """)
+            renumber_laps(race_id, number)
 
-        db.session.execute(final_lap_query, {'number': number})
-
-        db.session.commit()
+            refresh_standings(race_id, [number])
+            race_state.touch(race_id)
+            db.session.commit()
 
         return jsonify({'message': 'Lap deleted successfully'}), 200
 
@@ -1542,7 +780,8 @@ def delete_lap(race_id):
 def add_manual_lap(race_id):
     """
     Manually add a lap for a participant.
-    Validates lap timing and sequence.
+    A lap added between recorded ones takes its place in passing order,
+    the following laps are renumbered.
     
     Args:
         race_id (int): ID of the race
@@ -1581,106 +820,83 @@ def add_manual_lap(race_id):
         if not registration:
             return jsonify({"status": "error", "message": "Registration not found"}), 404
 
-        table_name = f'race_results_{race_id}'
-
-        query = text(f"""
-            SELECT 
-                lap_number,
-                timestamp
-            FROM {table_name}
-            WHERE number = :number
-            ORDER BY lap_number
-        """)
-
-        laps = db.session.execute(query, {'number': number}).fetchall()
-
         if timestamp_str:
             try:
-                timestamp = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S.%f")
+                timestamp = parse_timestamp(timestamp_str)
             except ValueError:
-                try:
-                    timestamp = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    return jsonify({
-                        "status": "error",
-                        "message": "Invalid timestamp format. Use YYYY-MM-DD HH:MM:SS or YYYY-MM-DD HH:MM:SS.fff"
-                    }), 400
+                return jsonify({
+                    "status": "error",
+                    "message": "Invalid timestamp format. Use YYYY-MM-DD HH:MM:SS or YYYY-MM-DD HH:MM:SS.fff"
+                }), 400
         else:
             try:
-                time_obj = parse_time_with_ms(time_str)
+                time_delta = as_duration(parse_clock(time_str))
             except ValueError as e:
                 return jsonify({'error': f'Invalid time format: {str(e)}'}), 400
 
-            if lap_number == 1:
-                actual_start = datetime.combine(
-                    datetime.strptime(data.get('date'), "%Y-%m-%d").date(),
-                    track.actual_start_time
-                )
-                user_start_delta = timedelta(
-                    hours=registration.user_start_time.hour,
-                    minutes=registration.user_start_time.minute,
-                    seconds=registration.user_start_time.second,
-                    microseconds=registration.user_start_time.microsecond
-                )
-
-                time_delta = timedelta(
-                    hours=time_obj.hour,
-                    minutes=time_obj.minute,
-                    seconds=time_obj.second,
-                    microseconds=time_obj.microsecond
-                )
+        tag_id = f"manually added Tag: {number}"
 
-                timestamp = actual_start + user_start_delta + time_delta
-            else:
-                prev_lap = None
-                for lap in laps:
-                    if lap.lap_number == lap_number - 1:
-                        prev_lap = lap
-                        break
+        with race_state.race_lock(race_id):
+            laps = {lap.lap_number: lap for lap in lock_runner_laps(race_id, number)}
 
-                if not prev_lap:
-                    return jsonify({'error': 'Previous lap not found'}), 404
+            if not timestamp_str:
+                if lap_number == 1:
+                    if registration.start_timestamp is None:
+                        return jsonify({'error': 'Start time not set'}), 400
 
-                time_delta = timedelta(
-                    hours=time_obj.hour,
-                    minutes=time_obj.minute,
-                    seconds=time_obj.second,
-                    microseconds=time_obj.microsecond
+                    timestamp = registration.start_timestamp + time_delta
+                else:
+                    prev_lap = laps.get(lap_number - 1)
+                    if not prev_lap:
+                        return jsonify({'error': 'Previous lap not found'}), 404
+
+                    timestamp = prev_lap.timestamp + time_delta
+
+            insert_sql = text('''
+                INSERT INTO race_results (
+                    race_id,
+                    number,
+                    tag_id,
+                    track_id,
+                    timestamp,
+                    last_seen_time,
+                    lap_number
+                ) 
+                VALUES (
+                    :race_id,
+                    :number,
+                    :tag_id,
+                    :track_id,
+                    :timestamp,
+                    :last_seen_time,
+                    :lap_number
                 )
+                ON CONFLICT (race_id, number, lap_number) DO NOTHING
+            ''')
 
-                timestamp = prev_lap.timestamp + time_delta
+            # Stored after the runner's last lap, renumbering puts it in passing
+            # order and moves the following laps up
+            inserted = insert_race_results(race_id, insert_sql, {
+                'race_id': race_id,
+                'number': number,
+                'tag_id': tag_id,
+                'track_id': track_id,
+                'timestamp': timestamp,
+                'last_seen_time': timestamp,
+                'lap_number': max(laps, default=0) + 1
+            }).rowcount
 
-        tag_id = f"manually added Tag: {number}"
+            if not inserted:
+                # A lap was recorded for the runner in the meantime
+                db.session.rollback()
+                race_state.invalidate(race_id)
+                return jsonify({'error': 'Results changed concurrently, try again'}), 409
 
-        insert_sql = text(f'''
-            INSERT INTO {table_name} (
-                number,
-                tag_id,
-                track_id,
-                timestamp,
-                last_seen_time,
-                lap_number
-            ) 
-            VALUES (
-                :number,
-                :tag_id,
-                :track_id,
-                :timestamp,
-                :last_seen_time,
-                :lap_number
-            )
-        ''')
-
-        db.session.execute(insert_sql, {
-            'number': number,
-            'tag_id': tag_id,
-            'track_id': track_id,
-            'timestamp': timestamp,
-            'last_seen_time': timestamp,
-            'lap_number': lap_number
-        })
+            renumber_laps(race_id, number)
 
-        db.session.commit()
+            refresh_standings(race_id, [number])
+            race_state.touch(race_id)
+            db.session.commit()
 
         return jsonify({
             "status": "success", 
@@ -1695,10 +911,12 @@ def add_manual_lap(race_id):
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @results_bp.route('/race/<race_id>/results/by-email/<email>', methods=['GET'])
+@results_cache.cached('by-email')
 def get_race_results_by_email(race_id, email):
     """
     Get race results for a specific participant by email.
-    Includes position, time, and performance against category/track leaders.
+    Includes position, time, and performance against category/track leaders,
+    sliced from the race ranking without ranking the race again.
     
     Args:
         race_id (int): ID of the race
@@ -1713,192 +931,30 @@ def get_race_results_by_email(race_id, email):
         if not user:
             return jsonify({'error': f'User with email {email} not found'}), 404
 
-        table_name = f'race_results_{race_id}'
-
-        table_exists_query = text("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_schema = 'public'
-                AND table_name = :table_name
-            );
-        """)
-
-        table_exists = db.session.execute(table_exists_query, 
-            {'table_name': table_name}).scalar()
-
-        if not table_exists:
+        if not race_results_exist(race_id):
             return jsonify({'error': f'No results found for race {race_id}'}), 404
 
-        query = text(f"""
-            WITH status_laps AS (
-                SELECT 
-                    r.number,
-                    r.timestamp,
-                    r.lap_number,
-                    r.status,
-                    r.last_seen_time
-                FROM race_results_{race_id} r
-                WHERE r.status IN ('DNF', 'DNS', 'DSQ')
-            ),
-            latest_laps AS (
-                SELECT 
-                    r.number,
-                    CASE 
-                        WHEN sl.timestamp IS NOT NULL THEN sl.timestamp
-                        ELSE MAX(r.timestamp)
-                    END as last_lap_timestamp,
-                    CASE 
-                        WHEN sl.lap_number IS NOT NULL THEN sl.lap_number
-                        ELSE MAX(r.lap_number)
-                    END as lap_number,
-                    sl.status,
-                    MAX(r.last_seen_time) as last_seen_time
-                FROM race_results_{race_id} r
-                LEFT JOIN (
-                    SELECT DISTINCT ON (number)
-                        number, timestamp, lap_number, status, last_seen_time
-                    FROM status_laps
-                    ORDER BY number, timestamp ASC
-                ) sl ON r.number = sl.number
-                GROUP BY r.number, sl.timestamp, sl.lap_number, sl.status
-            ),
-            ranked_results AS (
-                SELECT 
-                    r.number,
-                    ll.last_lap_timestamp,  -- Changed from ll.timestamp to ll.last_lap_timestamp
-                    ll.lap_number,
-                    ll.status,
-                    ll.last_seen_time,
-                    u.firstname,
-                    u.surname,
-                    u.club,
-                    u.gender,
-                    t.name as track_name,
-                    c.category_name,
-                    t.actual_start_time,
-                    t.number_of_laps,
-                    reg.user_start_time,
-                    CASE 
-                        WHEN ll.lap_number = t.number_of_laps THEN
-                            EXTRACT(EPOCH FROM (
-                                ll.last_lap_timestamp - 
-                                (date_trunc('day', ll.last_lap_timestamp) + 
-                                t.actual_start_time::time + 
-                                reg.user_start_time::interval)
-                            ))
-                        ELSE NULL
-                    END as race_time_seconds
-                FROM race_results_{race_id} r
-                JOIN latest_laps ll ON r.number = ll.number
-                JOIN registration reg ON reg.number = r.number 
-                    AND reg.race_id = :race_id
-                JOIN users u ON u.id = reg.user_id
-                JOIN track t ON t.id = reg.track_id
-                LEFT JOIN category c ON c.track_id = reg.track_id 
-                    AND c.gender = u.gender 
-                    AND EXTRACT(YEAR FROM CURRENT_DATE) - u.year 
-                        BETWEEN c.min_age AND c.max_age
-                WHERE u.email = :email
-            ),
-            track_results AS (
-                SELECT *,
-                    MIN(race_time_seconds) OVER (PARTITION BY track_name) as min_track_time,
-                    RANK() OVER (
-                        PARTITION BY track_name 
-                        ORDER BY 
-                            CASE 
-                                WHEN status IS NOT NULL THEN 2
-                                WHEN race_time_seconds IS NULL THEN 1 
-                                ELSE 0 
-                            END,
-                            race_time_seconds
-                    ) as position_track
-                FROM ranked_results
-            ),
-            category_results AS (
-                SELECT
-                    tr.*,
-                    MIN(race_time_seconds) OVER (PARTITION BY category_name, track_name) as min_category_time,
-                    RANK() OVER (
-                        PARTITION BY category_name, track_name
-                        ORDER BY 
-                            CASE 
-                                WHEN status IS NOT NULL THEN 2
-                                WHEN race_time_seconds IS NULL THEN 1 
-                                ELSE 0 
-                            END,
-                            race_time_seconds
-                    ) as position_category
-                FROM track_results tr
-            )
-            SELECT 
-                number,
-                firstname,
-                surname, 
-                track_name,
-                category_name,
-                lap_number,
-                number_of_laps,
-                last_seen_time,
-                status,
-                CASE 
-                    WHEN race_time_seconds IS NOT NULL THEN 
-                        TO_CHAR((race_time_seconds || ' seconds')::interval, 'HH24:MI:SS')
-                    ELSE '--:--:--'
-                END as race_time,
-                CASE 
-                    WHEN status IS NOT NULL THEN status
-                    ELSE position_track::text 
-                END as position_track,
-                CASE 
-                    WHEN status IS NOT NULL THEN NULL
-                    WHEN race_time_seconds IS NULL THEN NULL
-                    ELSE TO_CHAR(
-                        ((race_time_seconds - min_track_time) || ' seconds')::interval,
-                        'HH24:MI:SS'
-                    )
-                END as behind_time_track,
-                CASE 
-                    WHEN status IS NOT NULL THEN status
-                    ELSE position_category::text 
-                END as position_category,
-                CASE 
-                    WHEN status IS NOT NULL THEN NULL
-                    WHEN race_time_seconds IS NULL THEN NULL
-                    ELSE TO_CHAR(
-                        ((race_time_seconds - min_category_time) || ' seconds')::interval,
-                        'HH24:MI:SS'
-                    )
-                END as behind_time_category
-            FROM category_results
-            ORDER BY track_name, number;
-        """)
-
-        results = db.session.execute(query, {
-            'race_id': str(race_id),
-            'email': email
-        }).fetchall()
-
-        if not results:
-            return jsonify({'results': []}), 200
+        ranking = rankings.ranking(int(race_id))
+        if not ranking.entries and not race_results_exist(race_id, revalidate=True):
+            return jsonify({'error': f'No results found for race {race_id}'}), 404
 
         formatted_results = []
-        for row in results:
+        for entry in ranking.for_email(email):
             formatted_results.append({
-                'number': row.number,
-                'firstname': row.firstname,
-                'surname': row.surname,
-                'track': row.track_name,
-                'category': row.category_name or 'N/A',
-                'lap_number': row.lap_number,
-                'total_laps': row.number_of_laps,
-                'race_time': row.race_time,
-                'last_seen': row.last_seen_time.strftime('%H:%M:%S') if row.last_seen_time else '--:--:--',
-                'position_track': row.position_track,
-                'behind_time_track': row.behind_time_track or '--:--:--',
-                'position_category': row.position_category,
-                'behind_time_category': row.behind_time_category or '--:--:--',
-                'status': row.status
+                'number': entry['number'],
+                'firstname': entry['firstname'],
+                'surname': entry['surname'],
+                'track': entry['track'],
+                'category': entry['category'] or 'N/A',
+                'lap_number': entry['lap_number'],
+                'total_laps': entry['number_of_laps'],
+                'race_time': format_duration(entry['race_time']) if entry['race_time'] is not None else '--:--:--',
+                'last_seen': format_clock(entry['last_seen_time']) if entry['last_seen_time'] else '--:--:--',
+                'position_track': entry['position_track'],
+                'behind_time_track': entry['behind_time_track'] or '--:--:--',
+                'position_category': entry['position_category'],
+                'behind_time_category': entry['behind_time_category'] or '--:--:--',
+                'status': entry['status']
             })
 
         return jsonify({
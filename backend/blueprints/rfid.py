@@ -1,11 +1,17 @@
 # blueprints/rfid.py
 from flask import Blueprint, jsonify, request
-from database import db
 from database.backup import BackUpTag
-import telnetlib
-import re
+from database.backup_operations import tag_archive
 from datetime import datetime
 import configparser
+from reader.terminal import SocketTerminal
+from reader.taglist import parse_taglist
+
+try:
+    import telnetlib
+except ImportError:
+    # telnetlib was removed in Python 3.13
+    telnetlib = None
 
 config = configparser.ConfigParser()
 config.read('config.ini')
@@ -22,7 +28,10 @@ class AlienRFID:
         self.connected = False
 
     def connect(self):
-        self.terminal = telnetlib.Telnet(self.hostname, self.port)
+        if telnetlib:
+            self.terminal = telnetlib.Telnet(self.hostname, self.port)
+        else:
+            self.terminal = SocketTerminal(self.hostname, self.port)
         self.terminal.read_until(b'Username>', timeout=3)
         self.terminal.write(b'alien\n')
         self.terminal.read_until(b'Password>', timeout=3)
@@ -44,79 +53,6 @@ class AlienRFID:
 
 alien = AlienRFID(hostname, port)
 
-
-def parse_tags(data):
-    """
-    Parse tag data from RFID reader response.
-    Extracts tag IDs, timestamps and other information.
-    
-    Args:
-        data (str): Raw tag data from RFID reader
-        
-    Returns:
-        list: Processed tag objects
-    """
-
-    pattern = r"Tag:([\w\s]+), Disc:(\d{4}/\d{2}/\d{2}\s\d{2}:\d{2}:\d{2}\.\d{3}), Last:(\d{4}/\d{2}/\d{2}\s\d{2}:\d{2}:\d{2}\.\d{3}), Count:(\d+), Ant:(\d+), Proto:(\d+)"
-    tags_found = []
-
-    for line in data.split('\n'):
-        if not line.strip():
-            continue
-
-        match = re.match(pattern, line.strip())
-        if match:
-            try:
-                tag_id, discovery_time, last_seen_time, count, ant, proto = match.groups()
-
-                number = tag_id.strip().split()[-1]
-
-                result = store_tags_to_database(
-                    tag_id=tag_id.strip(),
-                    number=int(number),
-                    last_seen_time=last_seen_time
-                )
-                if result:
-                    tags_found.append(result)
-                    print(f'Successfully processed tag: {tag_id}')
-            except Exception as e:
-                print(f'Error processing line "{line}": {str(e)}')
-        else:
-            print(f'Line did not match pattern: {line}')
-
-    return tags_found
-
-def store_tags_to_database(tag_id, number, last_seen_time):
-    """
-    Store tag data in the database.
-    Creates new BackUpTag entry.
-    
-    Args:
-        tag_id (str): RFID tag identifier
-        number (int): Runner's bib number
-        last_seen_time (str): Timestamp of last tag reading
-        
-    Returns:
-        BackUpTag: Created database entry or None if error
-    """
-
-    try:
-        new_tag = BackUpTag(
-            tag_id=tag_id,
-            number=number,
-            last_seen_time=last_seen_time
-        )
-
-        db.session.add(new_tag)
-        db.session.commit()
-        print(f'Stored new tag: {tag_id}')
-        return new_tag
-
-    except Exception as e:
-        db.session.rollback()
-        print(f'Error storing/updating tag {tag_id}: {str(e)}')
-        raise
-
 @rfid_bp.route('/connect', methods=['POST'])
 def connect_reader():
     """
@@ -155,7 +91,7 @@ def connect_reader():
 def fetch_taglist():
     """
     Fetch list of tags from connected RFID reader.
-    Parses and stores received tags in database.
+    Parses received tags and queues them for the raw read archive.
     
     Returns:
         tuple: JSON response with tag list and HTTP status code
@@ -166,7 +102,7 @@ def fetch_taglist():
             return jsonify({"status": "error", "message": "Not connected to RFID reader"})
 
         taglist_response = alien.command('get Taglist')
-        parse_tags(taglist_response)
+        tag_archive.submit(parse_taglist(taglist_response))
         print(taglist_response)
         tags = taglist_response.split("\n")
         middle_tags = tags[1:-1]
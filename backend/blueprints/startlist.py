@@ -4,6 +4,10 @@ from database import db
 from database.registration import Registration
 from database.track import Track
 from database.user import Users
+from database.category import Category
+from database.category_operations import assign_categories
+from database.lineup_operations import update_start_timestamps
+from timing.race_state import race_state
 from datetime import datetime
 
 startlist_bp = Blueprint('startlist', __name__)
@@ -26,15 +30,16 @@ def get_race_startlist(race_id):
         track_ids = [track.id for track in tracks]
 
         registrations = (
-            db.session.query(Registration, Users, Track)
+            db.session.query(Registration, Users, Track, Category)
             .join(Users, Registration.user_id == Users.id)
             .join(Track, Registration.track_id == Track.id)
+            .outerjoin(Category, Registration.category_id == Category.id)
             .filter(Registration.race_id == race_id)
             .all()
         )
 
         start_list = []
-        for reg, user, track in registrations:
+        for reg, user, track, category in registrations:
             start_list.append({
                 'registration_id': reg.id,
                 'user_id': user.id,
@@ -45,6 +50,7 @@ def get_race_startlist(race_id):
                 'number': '---' if reg.number is None else reg.number,
                 'track_id': track.id,
                 'track_name': track.name,
+                'category': category.category_name if category else 'N/A',
                 'user_start_time': '--:--:--' if reg.user_start_time is None else reg.user_start_time.strftime('%H:%M:%S')
             })
 
@@ -78,6 +84,12 @@ def update_startlist_user(race_id):
         user.club = data['club']
         user.year = data['year']
 
+        db.session.flush()
+        assign_categories(race_id, [
+            registration.id for registration in Registration.query.filter_by(race_id=race_id, user_id=user.id)
+        ])
+
+        race_state.touch(race_id)
         db.session.commit()
         return jsonify({'message': 'User updated successfully'}), 200
     except Exception as e:
@@ -113,6 +125,15 @@ def update_startlist_registration(race_id):
         if 'user_start_time' in data:
             registration.user_start_time = datetime.strptime(data['user_start_time'], '%H:%M:%S').time()
 
+        if 'track_id' in data:
+            db.session.flush()
+            assign_categories(race_id, [registration.id])
+
+        # Also fills in a start instant missing e.g. after a late registration
+        db.session.flush()
+        update_start_timestamps(race_id, registration_ids=[registration.id])
+
+        race_state.touch(race_id)
         db.session.commit()
         return jsonify({'message': 'Registration updated successfully'}), 200
     except Exception as e:
@@ -150,6 +171,7 @@ def delete_registration(race_id, registration_id):
         if user:
             db.session.delete(user)
 
+        race_state.touch(race_id)
         db.session.commit()
 
         return jsonify({'message': 'Registration and user deleted successfully'}), 200
@@ -0,0 +1,32 @@
+# commands.py
+import click
+from database.race import Race
+from database.standings_operations import rebuild_standings
+from database.race_operations import create_results_table, migrate_race_results_tables, setup_all_race_results_tables
+
+def register_commands(app):
+    """
+    Register maintenance commands with the Flask CLI.
+    Run from the backend directory, e.g. `flask --app app:create_app rebuild-standings`.
+
+    Args:
+        app (Flask): Flask application instance
+    """
+
+    @app.cli.command('rebuild-standings')
+    @click.argument('race_id', type=int, required=False)
+    def rebuild_standings_command(race_id):
+        """Rebuild results standings of one race, or of all races."""
+        race_ids = [race_id] if race_id else [race.id for race in Race.query.order_by(Race.id)]
+        for current_race_id in race_ids:
+            count = rebuild_standings(current_race_id)
+            click.echo(f"Race {current_race_id}: rebuilt {count} standings")
+
+    @app.cli.command('migrate-results-tables')
+    def migrate_results_tables_command():
+        """Move per-race results tables of older releases into race_results and create partitions of all races."""
+        create_results_table()
+        migrated = migrate_race_results_tables()
+        click.echo(f"Migrated results of {len(migrated)} races")
+        setup_all_race_results_tables()
+        click.echo("Results partitions of all races are ready")
@@ -6,6 +6,9 @@ class BackUpTag(db.Model):
     number = db.Column(db.Integer, nullable=False)
     tag_id = db.Column(db.String(50), nullable=False)
     last_seen_time = db.Column(db.String(25), nullable=False)
+    count = db.Column(db.Integer)
+    antenna = db.Column(db.Integer)
+    protocol = db.Column(db.Integer)
 
     def __repr__(self):
-        return f'<BackUpTag {self.tag_id}>'
\ No newline at end of file
+        return f'<BackUpTag {self.tag_id}>'
@@ -1,25 +1,152 @@
-# database/tag_operations.py
-from backend.database.backup import db, BackUpTag
+# database/backup_operations.py
+import atexit
+import csv
+import io
+import threading
+from collections import deque
+from sqlalchemy import insert
+from database import db
+from database.backup import BackUpTag
+from reader.taglist import format_timestamp
 
-def add_tag(tag, number, lastSeenTime):
+ARCHIVE_COLUMNS = ['number', 'tag_id', 'last_seen_time', 'count', 'antenna', 'protocol']
+
+def _archive_row(record):
+    return {
+        'number': record.number,
+        'tag_id': record.tag_id,
+        'last_seen_time': format_timestamp(record.last_seen),
+        'count': record.count,
+        'antenna': record.antenna,
+        'protocol': record.protocol
+    }
+
+def insert_tags(records):
     """
-    Add a new tag to the database.
-    
+    Store parsed tag reads in the raw read archive in one statement.
+    Uses COPY on PostgreSQL, a bulk INSERT elsewhere.
+    Reads whose tag ID does not end with a bib number are skipped.
+
     Args:
-        tag (str): RFID tag identifier
-        number (int): Runner's bib number
-        lastSeenTime (str): Timestamp of last tag reading
-        
+        records (list): TagRecord reads
+
     Returns:
-        BackUpTag: Created database entry or None if error
+        int: Number of stored reads
     """
 
-    detected_tag = BackUpTag(number=number, tag=tag, lastSeenTime=lastSeenTime)
-    db.session.add(detected_tag)
-    try:
-        db.session.commit()
-        return detected_tag
-    except Exception as e:
-        db.session.rollback()
-        print("Error adding tag %s", e)
-        return None
\ No newline at end of file
+    rows = [_archive_row(record) for record in records if record.number is not None]
+    if not rows:
+        return 0
+
+    if db.engine.dialect.name == 'postgresql':
+        data = io.StringIO()
+        writer = csv.DictWriter(data, fieldnames=ARCHIVE_COLUMNS)
+        writer.writerows(rows)
+        data.seek(0)
+
+        cursor = db.session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {BackUpTag.__table__.name} ({', '.join(ARCHIVE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                data
+            )
+        finally:
+            cursor.close()
+    else:
+        db.session.execute(insert(BackUpTag.__table__), rows)
+
+    db.session.commit()
+    return len(rows)
+
+class TagArchive:
+    """
+    Write-behind buffer of the raw read archive.
+    Reads are queued in memory and written in bulk by a background thread,
+    so archiving never holds up live timing. The buffer is bounded; when the
+    database falls behind, the oldest queued reads are dropped and counted.
+    """
+
+    def __init__(self, max_size=10000, batch_size=1000, flush_interval=1.0):
+        self.app = None
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = deque()
+        self.lock = threading.Lock()
+        self.pending = threading.Event()
+        self.thread = None
+        self.dropped = 0
+        self.stored = 0
+
+    def init_app(self, app):
+        self.app = app
+
+    def submit(self, records):
+        """
+        Queue parsed reads for archiving.
+
+        Args:
+            records (iterable): TagRecord reads
+        """
+
+        with self.lock:
+            self.buffer.extend(records)
+            overflow = len(self.buffer) - self.max_size
+            for _ in range(max(overflow, 0)):
+                self.buffer.popleft()
+                self.dropped += 1
+            ready = len(self.buffer) >= self.batch_size
+
+        self._ensure_worker()
+        if ready:
+            self.pending.set()
+
+    def flush(self):
+        """
+        Write all queued reads now.
+
+        Returns:
+            int: Number of stored reads
+        """
+
+        stored = 0
+        while True:
+            with self.lock:
+                batch = [self.buffer.popleft() for _ in range(min(self.batch_size, len(self.buffer)))]
+            if not batch:
+                return stored
+
+            with self.app.app_context():
+                try:
+                    count = insert_tags(batch)
+                except Exception as e:
+                    db.session.rollback()
+                    self.app.logger.error(f"Error archiving {len(batch)} tag reads: {str(e)}")
+                    count = 0
+                finally:
+                    db.session.remove()
+
+            stored += count
+            with self.lock:
+                self.stored += count
+
+    def stats(self):
+        with self.lock:
+            return {'queued': len(self.buffer), 'stored': self.stored, 'dropped': self.dropped}
+
+    def _ensure_worker(self):
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            if self.thread is None:
+                atexit.register(self.flush)
+            self.thread = threading.Thread(target=self._run, name='tag-archive', daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            self.pending.wait(self.flush_interval)
+            self.pending.clear()
+            self.flush()
+
+tag_archive = TagArchive()
@@ -0,0 +1,128 @@
+# database/category_operations.py
+from collections import defaultdict
+from database import db
+from database.race import Race
+from database.track import Track
+from database.category import Category
+from database.registration import Registration
+from database.user import Users
+
+def race_age(race, year):
+    """
+    Age of a participant in the year of the race.
+
+    Args:
+        race (Race): Race
+        year (int): Participant's year of birth
+
+    Returns:
+        int: Age reached in the race year
+    """
+
+    return race.date.year - year
+
+def find_category(categories, track_id, gender, age):
+    """
+    Find the category a participant belongs to.
+
+    Args:
+        categories (iterable): Categories to choose from
+        track_id (int): ID of the participant's track
+        gender (str): Participant's gender
+        age (int): Age in the race year
+
+    Returns:
+        Category: First matching category or None
+    """
+
+    for category in categories:
+        if category.track_id == track_id and category.gender == gender and category.min_age <= age <= category.max_age:
+            return category
+    return None
+
+def load_categories(race_id):
+    """
+    Load categories of a race for find_category().
+
+    Args:
+        race_id (int): ID of the race
+
+    Returns:
+        dict: (track_id, gender) -> list of categories
+    """
+
+    categories = defaultdict(list)
+    for category in Category.query.join(Track, Track.id == Category.track_id).filter(Track.race_id == race_id):
+        categories[(category.track_id, category.gender)].append(category)
+    return categories
+
+def resolve_category(categories, race, track_id, user):
+    """
+    Find the category of a participant on a track of a race.
+
+    Args:
+        categories (dict): Categories from load_categories()
+        race (Race): Race
+        track_id (int): ID of the participant's track
+        user (Users): Participant
+
+    Returns:
+        Category: Matching category or None
+    """
+
+    return find_category(categories[(track_id, user.gender)], track_id, user.gender, race_age(race, user.year))
+
+def assign_categories(race_id, registration_ids=None, missing_only=False):
+    """
+    Resolve and store the category of registrations of a race.
+    Categories are resolved for the age in the race year, so they stay the
+    same however late the results are looked at. Runs in the caller's
+    transaction.
+
+    Args:
+        race_id (int): ID of the race
+        registration_ids (iterable): Only these registrations, all of the race if None
+        missing_only (bool): Only registrations without a category
+
+    Returns:
+        int: Number of registrations whose category changed
+    """
+
+    race = db.session.get(Race, race_id)
+    if not race:
+        return 0
+
+    categories = load_categories(race_id)
+
+    query = db.session.query(Registration, Users).join(
+        Users, Users.id == Registration.user_id
+    ).filter(Registration.race_id == race_id)
+    if registration_ids is not None:
+        query = query.filter(Registration.id.in_(list(registration_ids)))
+    if missing_only:
+        query = query.filter(Registration.category_id.is_(None))
+
+    changed = 0
+    for registration, user in query:
+        category = resolve_category(categories, race, registration.track_id, user)
+        category_id = category.id if category else None
+        if registration.category_id != category_id:
+            registration.category_id = category_id
+            changed += 1
+
+    return changed
+
+def assign_missing_categories():
+    """
+    Resolve categories of registrations stored before categories were kept
+    on registrations.
+
+    Returns:
+        int: Number of registrations updated
+    """
+
+    race_ids = db.session.query(Registration.race_id).filter(
+        Registration.category_id.is_(None)
+    ).distinct().all()
+
+    return sum(assign_categories(race_id, missing_only=True) for (race_id,) in race_ids)
@@ -0,0 +1,238 @@
+# database/lap_operations.py
+from collections import defaultdict
+from sqlalchemy import text, select, bindparam, DateTime, Integer
+from database import db
+from database.race_result import RaceResult
+from timing.times import format_duration, format_clock
+
+# Order of the values of each lap in compact payloads
+LAP_COLUMNS = ['lap_number', 'timestamp', 'lap_time', 'total_time']
+
+# Numbers a runner's laps 1..n in passing order in one pass, and resets
+# last_seen_time of the final lap. Rows already numbered right are left alone.
+# Renumbered laps get their new number negated first and RESTORE_LAP_NUMBERS_SQL
+# flips them back, so no row ever takes a lap number another row still holds
+# (ux_race_results_lap is checked row by row).
+RENUMBER_LAPS_SQL = text('''
+    UPDATE race_results
+    SET
+        lap_number = -ordered.position,
+        last_seen_time = CASE
+            WHEN ordered.position = ordered.laps THEN race_results.timestamp
+            ELSE race_results.last_seen_time
+        END
+    FROM (
+        SELECT
+            id,
+            ROW_NUMBER() OVER (ORDER BY timestamp, lap_number, id) AS position,
+            COUNT(*) OVER () AS laps
+        FROM race_results
+        WHERE race_id = :race_id AND number = :number
+    ) ordered
+    WHERE race_results.race_id = :race_id
+    AND race_results.id = ordered.id
+    AND (race_results.lap_number <> ordered.position OR ordered.position = ordered.laps)
+''')
+
+RESTORE_LAP_NUMBERS_SQL = text('''
+    UPDATE race_results
+    SET lap_number = -lap_number
+    WHERE race_id = :race_id AND number = :number AND lap_number < 0
+''')
+
+def elapsed_ms_sql(since, until):
+    """
+    SQL expression for the milliseconds between two TIMESTAMP expressions.
+
+    Args:
+        since (str): SQL expression of the earlier instant
+        until (str): SQL expression of the later instant
+
+    Returns:
+        str: SQL expression of an INTEGER, NULL if either instant is NULL
+    """
+
+    if db.engine.dialect.name == 'postgresql':
+        return f'CAST(ROUND(EXTRACT(EPOCH FROM ({until}) - ({since})) * 1000) AS INTEGER)'
+    return f'CAST(ROUND((julianday({until}) - julianday({since})) * 86400000) AS INTEGER)'
+
+def update_lap_times(race_id=None, numbers=None, missing_only=False):
+    """
+    Recompute stored lap and race times of laps from their timestamps and
+    the runners' start instants, in one statement in the caller's
+    transaction. Call after timestamps, lap order or start instants change;
+    ingestion computes the times of new laps itself (RaceState.lap_times()).
+    Only rows whose times change are written.
+
+    Args:
+        race_id (int): ID of the race, all races if None
+        numbers (iterable): Only laps of these bib numbers, all runners if None
+        missing_only (bool): Only runners with laps lacking times
+
+    Returns:
+        int: Number of laps updated
+    """
+
+    params = {}
+    filters = []
+    if race_id is not None:
+        filters.append('r.race_id = :race_id')
+        params['race_id'] = race_id
+    if numbers is not None:
+        params['numbers'] = [int(number) for number in numbers]
+        if not params['numbers']:
+            return 0
+        filters.append('r.number IN :numbers')
+    if missing_only:
+        filters.append('''EXISTS (
+            SELECT 1 FROM race_results missing
+            WHERE missing.race_id = r.race_id AND missing.number = r.number AND missing.lap_time_ms IS NULL
+        )''')
+
+    previous = '''COALESCE(
+        LAG(r.timestamp) OVER (PARTITION BY r.race_id, r.number ORDER BY r.lap_number),
+        reg.start_timestamp
+    )'''
+
+    query = text(f'''
+        UPDATE race_results
+        SET lap_time_ms = timed.lap_time_ms, race_time_ms = timed.race_time_ms
+        FROM (
+            SELECT
+                r.race_id,
+                r.id,
+                {elapsed_ms_sql(previous, 'r.timestamp')} AS lap_time_ms,
+                {elapsed_ms_sql('reg.start_timestamp', 'r.timestamp')} AS race_time_ms
+            FROM race_results r
+            LEFT JOIN registration reg ON reg.race_id = r.race_id
+                AND reg.number = r.number
+            {'WHERE ' + ' AND '.join(filters) if filters else ''}
+        ) timed
+        WHERE race_results.race_id = timed.race_id
+        AND race_results.id = timed.id
+        AND (race_results.lap_time_ms IS DISTINCT FROM timed.lap_time_ms
+            OR race_results.race_time_ms IS DISTINCT FROM timed.race_time_ms)
+    ''')
+    if numbers is not None:
+        query = query.bindparams(bindparam('numbers', expanding=True))
+
+    return db.session.execute(query, params).rowcount
+
+def get_lap_splits(race_id, track_id=None, category=None, number=None):
+    """
+    Read lap and total times of runners in one query.
+    Times are stored with the laps when written, so reading a whole race
+    costs the same one query as a single runner.
+
+    Args:
+        race_id (int): ID of the race
+        track_id (int): Only runners of this track, all tracks if None
+        category (str): Only runners of this category, all categories if None
+        number (int): Only this runner, all runners if None
+
+    Returns:
+        dict: Bib number -> list of laps in lap order, each a dict with
+        lap_number, timestamp (datetime), lap_time and total_time
+        (milliseconds, None if the runner has no start instant)
+    """
+
+    params = {'race_id': race_id}
+    filters = []
+    if track_id is not None:
+        filters.append('AND reg.track_id = :track_id')
+        params['track_id'] = track_id
+    if category is not None:
+        filters.append('AND c.category_name = :category')
+        params['category'] = category
+    if number is not None:
+        filters.append('AND r.number = :number')
+        params['number'] = number
+
+    query = text(f'''
+        SELECT
+            r.number,
+            r.lap_number,
+            r.timestamp,
+            r.lap_time_ms,
+            r.race_time_ms
+        FROM race_results r
+        JOIN registration reg ON reg.number = r.number
+            AND reg.race_id = :race_id
+        LEFT JOIN category c ON c.id = reg.category_id
+        WHERE r.race_id = :race_id
+        {' '.join(filters)}
+        ORDER BY r.number, r.lap_number
+    ''').columns(
+        number=Integer,
+        lap_number=Integer,
+        timestamp=DateTime,
+        lap_time_ms=Integer,
+        race_time_ms=Integer
+    )
+
+    splits = defaultdict(list)
+
+    for row in db.session.execute(query, params):
+        splits[row.number].append({
+            'lap_number': row.lap_number,
+            'timestamp': row.timestamp,
+            'lap_time': row.lap_time_ms,
+            'total_time': row.race_time_ms
+        })
+
+    return dict(splits)
+
+def format_lap(lap):
+    """
+    Format a lap from get_lap_splits() for the API.
+
+    Args:
+        lap (dict): Lap with times in milliseconds
+
+    Returns:
+        dict: Lap with timestamp as HH:MM:SS and times as HH:MM:SS.mmm
+    """
+
+    return {
+        'lap_number': lap['lap_number'],
+        'timestamp': format_clock(lap['timestamp']),
+        'lap_time': format_duration(lap['lap_time']) if lap['lap_time'] is not None else None,
+        'total_time': format_duration(lap['total_time']) if lap['total_time'] is not None else None
+    }
+
+def lock_runner_laps(race_id, number):
+    """
+    Load the laps of a runner, locking them until the end of the transaction
+    so a concurrent edit or ingestion write cannot interleave (PostgreSQL;
+    SQLite serializes writers anyway).
+
+    Args:
+        race_id (int): ID of the race
+        number (int): Runner's bib number
+
+    Returns:
+        list: Rows with id, lap_number and timestamp in lap order
+    """
+
+    return db.session.execute(
+        select(RaceResult.id, RaceResult.lap_number, RaceResult.timestamp).where(
+            RaceResult.race_id == race_id,
+            RaceResult.number == number
+        ).order_by(RaceResult.lap_number).with_for_update()
+    ).all()
+
+def renumber_laps(race_id, number):
+    """
+    Renumber the laps of a runner after an edit, see RENUMBER_LAPS_SQL,
+    and recompute their stored times (update_lap_times()). Call with the
+    runner's laps locked (lock_runner_laps()).
+
+    Args:
+        race_id (int): ID of the race
+        number (int): Runner's bib number
+    """
+
+    params = {'race_id': race_id, 'number': number}
+    db.session.execute(RENUMBER_LAPS_SQL, params)
+    db.session.execute(RESTORE_LAP_NUMBERS_SQL, params)
+    update_lap_times(race_id, [number])
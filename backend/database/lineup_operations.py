@@ -0,0 +1,170 @@
+# database/lineup_operations.py
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from sqlalchemy import update
+from database import db
+from database.race import Race
+from database.track import Track
+from database.category import Category
+from database.registration import Registration
+from database.user import Users
+from database.lap_operations import update_lap_times
+from database.standings_operations import update_standing_times
+from timing.times import as_duration
+
+LineupEntry = namedtuple('LineupEntry', ['registration', 'user', 'track', 'category', 'number', 'start_offset'])
+
+def load_lineup(race_id):
+    """
+    Load registrations of a race with their participant, track and category
+    in a single query.
+
+    Args:
+        race_id (int): ID of the race
+
+    Returns:
+        list: (Registration, Users, Track, Category) rows in registration order,
+        Category is None for registrations without one
+    """
+
+    return db.session.query(Registration, Users, Track, Category).join(
+        Users, Users.id == Registration.user_id
+    ).join(
+        Track, Track.id == Registration.track_id
+    ).outerjoin(
+        Category, Category.id == Registration.category_id
+    ).filter(
+        Track.race_id == race_id
+    ).order_by(Registration.id).all()
+
+def plan_lineup(race, rows):
+    """
+    Assign start numbers and start offsets.
+    Numbers run from each category's min_number in registration order;
+    participants are then lined up by category and number, and on interval
+    start each one starts one interval after the previous one.
+    Registrations without a category are left out.
+
+    Args:
+        race (Race): Race
+        rows (iterable): Rows from load_lineup()
+
+    Returns:
+        list: LineupEntry tuples in lineup order
+    """
+
+    counters = {}
+    numbered = []
+
+    for registration, user, track, category in rows:
+        if category is None:
+            continue
+
+        key = (category.id, user.gender)
+        counters[key] = counters.get(key, 0) + 1
+        numbered.append((registration, user, track, category, category.min_number + counters[key] - 1))
+
+    numbered.sort(key=lambda entry: (entry[3].id, entry[4]))
+
+    if race.start == 'I' and race.interval_time:
+        interval = timedelta(
+            hours=race.interval_time.hour,
+            minutes=race.interval_time.minute,
+            seconds=race.interval_time.second
+        )
+    else:
+        interval = timedelta(0)
+
+    return [
+        LineupEntry(registration, user, track, category, number, interval * (index + 1))
+        for index, (registration, user, track, category, number) in enumerate(numbered)
+    ]
+
+def start_timestamp(race_date, actual_start_time, user_start_time):
+    """
+    Absolute start instant of a runner: the track's actual start on the race
+    day plus the runner's start offset. A start after midnight lands on the
+    next day, whatever day the passings are recorded on.
+
+    Args:
+        race_date (date): Date of the race
+        actual_start_time (time): Actual start time of the track
+        user_start_time (time): Runner's start offset, None for no offset
+
+    Returns:
+        datetime: Start instant, None if the track has not started
+    """
+
+    if actual_start_time is None:
+        return None
+
+    return datetime.combine(race_date, actual_start_time) + as_duration(user_start_time or time())
+
+def update_start_timestamps(race_id, track_id=None, registration_ids=None, missing_only=False):
+    """
+    Recompute the stored start instants of registrations of a race, see
+    start_timestamp(), and the stored times of their laps and standings.
+    Call whenever a track start time or start offsets change. One query and
+    a constant number of updates, in the caller's transaction.
+
+    Args:
+        race_id (int): ID of the race
+        track_id (int): Only registrations of this track, all tracks if None
+        registration_ids (iterable): Only these registrations, all if None
+        missing_only (bool): Only registrations without a start instant
+
+    Returns:
+        int: Number of registrations whose start instant changed
+    """
+
+    query = db.session.query(
+        Registration.id,
+        Registration.number,
+        Registration.user_start_time,
+        Registration.start_timestamp,
+        Track.actual_start_time,
+        Race.date
+    ).join(
+        Track, Track.id == Registration.track_id
+    ).join(
+        Race, Race.id == Registration.race_id
+    ).filter(Registration.race_id == race_id)
+    if track_id is not None:
+        query = query.filter(Registration.track_id == track_id)
+    if registration_ids is not None:
+        query = query.filter(Registration.id.in_(list(registration_ids)))
+    if missing_only:
+        query = query.filter(Registration.start_timestamp.is_(None))
+
+    batch = []
+    numbers = []
+    for row in query:
+        start = start_timestamp(row.date, row.actual_start_time, row.user_start_time)
+        if start != row.start_timestamp:
+            batch.append({'id': row.id, 'start_timestamp': start})
+            if row.number is not None:
+                numbers.append(row.number)
+
+    if batch:
+        db.session.execute(update(Registration), batch)
+        update_lap_times(race_id, numbers)
+        update_standing_times(race_id, numbers)
+    return len(batch)
+
+def assign_missing_start_timestamps():
+    """
+    Compute start instants of registrations stored before they were kept
+    on registrations.
+
+    Returns:
+        int: Number of registrations updated
+    """
+
+    race_ids = db.session.query(Registration.race_id).join(
+        Track, Track.id == Registration.track_id
+    ).filter(
+        Registration.start_timestamp.is_(None),
+        Track.actual_start_time.isnot(None)
+    ).distinct().all()
+
+    return sum(update_start_timestamps(race_id, missing_only=True) for (race_id,) in race_ids)
@@ -1,54 +1,340 @@
 # database/race_operations.py
+import re
+import threading
 from flask import current_app
-from sqlalchemy import text
+from sqlalchemy import text, inspect
+from sqlalchemy.exc import DBAPIError
 from database.race import db, Race
+from database.race_result import RaceResult
+from database.lap_operations import update_lap_times
+
+RESULTS_TABLE = RaceResult.__tablename__
+
+# Per-race results tables of releases before the shared race_results table
+LEGACY_TABLE_PATTERN = re.compile(r'^race_results_(\d+)$')
+
+def _is_postgresql():
+    return db.engine.dialect.name == 'postgresql'
+
+def partition_name(race_id):
+    return f'{RESULTS_TABLE}_{int(race_id)}'
+
+def create_results_table():
+    """
+    Create the shared results table partitioned by race on PostgreSQL.
+    Must run before db.create_all(), which would create it unpartitioned.
+    Other databases get the plain table from db.create_all().
+    """
+
+    if not _is_postgresql():
+        return
+
+    db.session.execute(text(f'''
+        CREATE TABLE IF NOT EXISTS {RESULTS_TABLE} (
+            id SERIAL,
+            race_id INTEGER NOT NULL,
+            number INTEGER NOT NULL,
+            tag_id VARCHAR(255) NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            lap_number INTEGER DEFAULT 1,
+            track_id INTEGER NOT NULL,
+            last_seen_time TIMESTAMP,
+            status VARCHAR(5),
+            lap_time_ms INTEGER,
+            race_time_ms INTEGER,
+            PRIMARY KEY (race_id, id)
+        ) PARTITION BY LIST (race_id)
+    '''))
+    db.session.commit()
 
 def create_race_results_table(race_id):
     """
-    Dynamically create a results table for a specific race with extended tracking.
-    Creates a table with runner numbers, timestamps, and lap information.
-    
+    Create the results partition of a race.
+    On PostgreSQL each race's results live in their own partition of
+    race_results, so queries filtered by race_id touch only that race and
+    old races can be detached or dropped cheaply. Other databases keep all
+    races in the one table and need nothing per race.
+
+    Runs on its own connection and commits at once, so it is safe to call in
+    the middle of a transaction that already reads race_results: the table
+    is created standalone and attached, which unlike CREATE TABLE ...
+    PARTITION OF does not wait for readers of race_results to finish.
+
     Args:
         race_id (int): ID of the race
+
+    Returns:
+        bool: True if the race has its partition
     """
 
-    table_name = f'race_results_{race_id}'
-    
-    # SQL to create dynamic results table with additional columns
-    create_table_sql = text(f'''
-    CREATE TABLE IF NOT EXISTS {table_name} (
-        id SERIAL PRIMARY KEY,
-        number INTEGER NOT NULL,
-        tag_id VARCHAR(255) NOT NULL,
-        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        lap_number INTEGER DEFAULT 1,
-        track_id INTEGER NOT NULL,
-        last_seen_time TIMESTAMP,
-        status VARCHAR(5)
-    )
-    ''')
-    
-    # Create index for performance
-    create_index_sql = text(f'''
-    CREATE INDEX IF NOT EXISTS idx_{table_name}_number ON {table_name} (number);
-    CREATE INDEX IF NOT EXISTS idx_{table_name}_timestamp ON {table_name} (timestamp);
-    ''')
-    
+    if not _is_postgresql():
+        return True
+
+    race_id = int(race_id)
+    table_name = partition_name(race_id)
+
     try:
-        # Execute the table creation
-        db.session.execute(create_table_sql)
-        db.session.execute(create_index_sql)
-        db.session.commit()
-        current_app.logger.info(f"Created results table for race {race_id}")
+        with db.engine.begin() as connection:
+            is_partition = connection.execute(
+                text('SELECT relispartition FROM pg_class WHERE oid = to_regclass(:table_name)'),
+                {'table_name': table_name}
+            ).scalar()
+            if is_partition:
+                return True
+
+            connection.execute(text(f'CREATE TABLE IF NOT EXISTS {table_name} (LIKE {RESULTS_TABLE} INCLUDING DEFAULTS)'))
+            connection.execute(text(f'ALTER TABLE {RESULTS_TABLE} ATTACH PARTITION {table_name} FOR VALUES IN ({race_id})'))
+        current_app.logger.info(f"Created results partition for race {race_id}")
+        return True
     except Exception as e:
-        db.session.rollback()
-        current_app.logger.error(f"Error creating results table for race {race_id}: {str(e)}")
+        current_app.logger.error(f"Error creating results partition for race {race_id}: {str(e)}")
+        return False
+
+# Races this process knows to exist, and those of them known to have their
+# results partition. Entries are dropped by drop_race_results().
+_known_races = set()
+_ready_races = set()
+_registry_lock = threading.Lock()
+
+def ensure_race_results(race_id):
+    """
+    Make sure results of a race can be written, creating its partition on
+    first use. Checked once per race and process, later calls cost a set lookup.
+    Another process may drop the partition after that (deleting the race,
+    whose ID add_race() can hand out again); insert_race_results() recovers.
+
+    Args:
+        race_id (int): ID of the race
+
+    Returns:
+        bool: True if the race has its partition
+    """
+
+    race_id = int(race_id)
+    if race_id in _ready_races:
+        return True
+
+    if not create_race_results_table(race_id):
+        return False
+
+    with _registry_lock:
+        _ready_races.add(race_id)
+    return True
+
+def _is_missing_partition(error):
+    # PostgreSQL rejects rows without a partition with check_violation
+    return getattr(error.orig, 'pgcode', None) == '23514' and 'no partition' in str(error.orig)
+
+def insert_race_results(race_id, statement, params):
+    """
+    Execute an INSERT into race_results for one race in the current transaction.
+    On PostgreSQL the INSERT runs in a savepoint: if the race's partition has
+    been dropped by another process since this one created it, the race is
+    forgotten, its partition created again and the INSERT repeated.
+
+    Args:
+        race_id (int): ID of the race
+        statement (TextClause): INSERT statement
+        params (dict): Bind parameters
+
+    Returns:
+        CursorResult: Result of the INSERT
+
+    Raises:
+        RuntimeError: If the partition of the race cannot be created
+    """
+
+    if not ensure_race_results(race_id):
+        raise RuntimeError(f"Results partition of race {race_id} could not be created")
+
+    if not _is_postgresql():
+        return db.session.execute(statement, params)
+
+    try:
+        with db.session.begin_nested():
+            return db.session.execute(statement, params)
+    except DBAPIError as e:
+        if not _is_missing_partition(e):
+            raise
+
+    current_app.logger.warning(f"Results partition of race {race_id} was missing, creating it again")
+    forget_race_results(race_id)
+    if not ensure_race_results(race_id):
+        raise RuntimeError(f"Results partition of race {race_id} could not be created")
+    return db.session.execute(statement, params)
+
+def forget_race_results(race_id=None):
+    """
+    Drop a race, or all races, from the registry of known races and partitions.
+
+    Args:
+        race_id (int): ID of the race, None for all
+    """
+
+    with _registry_lock:
+        if race_id is None:
+            _known_races.clear()
+            _ready_races.clear()
+        else:
+            _known_races.discard(int(race_id))
+            _ready_races.discard(int(race_id))
+
+def drop_race_results(race_id):
+    """
+    Remove all results of a race within the current transaction.
+
+    Args:
+        race_id (int): ID of the race
+    """
+
+    if _is_postgresql():
+        db.session.execute(text(f'DROP TABLE IF EXISTS {partition_name(race_id)}'))
+    else:
+        db.session.execute(RaceResult.__table__.delete().where(RaceResult.race_id == race_id))
+    forget_race_results(race_id)
+
+def race_results_exist(race_id, revalidate=False):
+    """
+    Tell whether results of a race can be stored and queried.
+    Existing races are remembered for the life of the process, so results
+    requests skip the lookup after the first one. Unknown IDs are looked up
+    every time, a race added later is found on its first request.
+    A race deleted by another process stays remembered here; callers that
+    get no results for a remembered race revalidate before answering.
+
+    Args:
+        race_id (int): ID of the race
+        revalidate (bool): Look the race up even if it is remembered
+
+    Returns:
+        bool: True if the race exists
+    """
+
+    try:
+        race_id = int(race_id)
+    except (TypeError, ValueError):
+        return False
+
+    if race_id in _known_races and not revalidate:
+        return True
+
+    if db.session.get(Race, race_id) is None:
+        forget_race_results(race_id)
+        return False
+
+    with _registry_lock:
+        _known_races.add(race_id)
+    return True
 
 def setup_all_race_results_tables():
     """
-    Create results tables for all existing races.
-    Iterates through all races and ensures they have results tables.
+    Create results partitions for all existing races.
+    Not needed at startup, partitions are created on first write by
+    ensure_race_results(); used by the migrate-results-tables command.
     """
     races = Race.query.all()
     for race in races:
-        create_race_results_table(race.id)
\ No newline at end of file
+        ensure_race_results(race.id)
+
+def remove_duplicate_laps(table_name=RESULTS_TABLE):
+    """
+    Delete repeated rows of the same lap of a runner, keeping the earliest
+    passing. Laps written twice by overlapping requests of releases before
+    the unique lap index would keep the index from being created.
+
+    Args:
+        table_name (str): Results table, race_results or a per-race legacy table
+
+    Returns:
+        int: Number of deleted rows
+    """
+
+    partition = 'race_id, number, lap_number' if table_name == RESULTS_TABLE else 'number, lap_number'
+    return db.session.execute(text(f'''
+        DELETE FROM {table_name}
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY {partition} ORDER BY timestamp, id) AS copy
+                FROM {table_name}
+            ) copies
+            WHERE copy > 1
+        )
+    ''')).rowcount
+
+def _legacy_results_tables():
+    if _is_postgresql():
+        names = db.session.execute(text('''
+            SELECT c.relname
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE c.relkind = 'r'
+            AND NOT c.relispartition
+            AND n.nspname = current_schema()
+        ''')).scalars().all()
+    else:
+        names = inspect(db.engine).get_table_names()
+
+    tables = []
+    for name in names:
+        match = LEGACY_TABLE_PATTERN.match(name)
+        if match:
+            tables.append((name, int(match.group(1))))
+    return sorted(tables)
+
+def migrate_race_results_tables():
+    """
+    Move per-race results tables into the shared race_results table.
+    On PostgreSQL each table is attached in place as the race's partition,
+    without copying rows; elsewhere its rows are copied and the table dropped.
+    Lap and race times of the moved laps are computed afterwards.
+    Each table is migrated in its own transaction. Safe to run repeatedly.
+
+    Returns:
+        list: IDs of the migrated races
+    """
+
+    migrated = []
+
+    for table_name, race_id in _legacy_results_tables():
+        try:
+            remove_duplicate_laps(table_name)
+            if _is_postgresql():
+                db.session.execute(text(f'ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS race_id INTEGER NOT NULL DEFAULT {race_id}'))
+                db.session.execute(text(f'ALTER TABLE {table_name} ALTER COLUMN race_id DROP DEFAULT'))
+                db.session.execute(text(f'ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS lap_time_ms INTEGER'))
+                db.session.execute(text(f'ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS race_time_ms INTEGER'))
+                # A partition's key has to match race_results' PRIMARY KEY (race_id, id)
+                db.session.execute(text(f'ALTER TABLE {table_name} DROP CONSTRAINT IF EXISTS {table_name}_pkey'))
+                db.session.execute(text(f'ALTER TABLE {table_name} ADD PRIMARY KEY (race_id, id)'))
+                # Lets ATTACH PARTITION skip scanning the table to validate it
+                db.session.execute(text(f'ALTER TABLE {table_name} ADD CONSTRAINT {table_name}_race_id CHECK (race_id = {race_id})'))
+                db.session.execute(text(f'ALTER TABLE {RESULTS_TABLE} ATTACH PARTITION {table_name} FOR VALUES IN ({race_id})'))
+                db.session.execute(text(f'ALTER TABLE {table_name} DROP CONSTRAINT {table_name}_race_id'))
+                # Superseded by the race_results indexes the partition got on attach
+                db.session.execute(text(f'DROP INDEX IF EXISTS idx_{table_name}_number'))
+                db.session.execute(text(f'DROP INDEX IF EXISTS idx_{table_name}_timestamp'))
+            else:
+                db.session.execute(text(f'''
+                    INSERT INTO {RESULTS_TABLE} (race_id, number, tag_id, timestamp, lap_number, track_id, last_seen_time, status)
+                    SELECT {race_id}, number, tag_id, timestamp, lap_number, track_id, last_seen_time, status
+                    FROM {table_name}
+                    ORDER BY id
+                '''))
+                db.session.execute(text(f'DROP TABLE {table_name}'))
+            update_lap_times(race_id)
+            db.session.commit()
+            migrated.append(race_id)
+            current_app.logger.info(f"Migrated results table {table_name} into {RESULTS_TABLE}")
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error migrating results table {table_name}: {str(e)}")
+
+    if migrated and _is_postgresql():
+        # Attached rows keep their ids, new rows must not reuse them
+        db.session.execute(text(f'''
+            SELECT setval(pg_get_serial_sequence('{RESULTS_TABLE}', 'id'),
+                          (SELECT COALESCE(MAX(id), 0) + 1 FROM {RESULTS_TABLE}), false)
+        '''))
+        db.session.commit()
+
+    return migrated
@@ -0,0 +1,42 @@
+# database/race_result.py
+from . import db
+
+class RaceResult(db.Model):
+    """
+    Lap records of all races.
+    On PostgreSQL the table is partitioned by race_id, one partition per race,
+    and created by create_results_table() in database/race_operations.py
+    rather than by db.create_all().
+    """
+
+    __tablename__ = 'race_results'
+    id = db.Column(db.Integer, primary_key=True)
+    race_id = db.Column(db.Integer, nullable=False)
+    number = db.Column(db.Integer, nullable=False)
+    tag_id = db.Column(db.String(255), nullable=False)
+    timestamp = db.Column(db.DateTime, server_default=db.func.current_timestamp())
+    lap_number = db.Column(db.Integer, server_default='1')
+    track_id = db.Column(db.Integer, nullable=False)
+    last_seen_time = db.Column(db.DateTime)
+    status = db.Column(db.String(5))
+    # Milliseconds since the previous lap (the start for lap 1) and since the
+    # runner's start, computed on write, see database/lap_operations.py
+    lap_time_ms = db.Column(db.Integer)
+    race_time_ms = db.Column(db.Integer)
+
+    # Every lookup is per race, so race_id leads each index. Databases created
+    # before an index was added get it from upgrade_schema().
+    __table_args__ = (
+        # Latest lap of a runner: WHERE number = ? ORDER BY timestamp DESC
+        db.Index('ix_race_results_number_timestamp', race_id, number, timestamp.desc()),
+        # One row per lap of a runner, so concurrent writers of the same lap
+        # cannot both store it (INSERT ... ON CONFLICT DO NOTHING); also serves
+        # laps of a runner in lap order and the highest lap per runner
+        db.Index('ux_race_results_lap', race_id, number, lap_number, unique=True),
+        # DNF/DNS/DSQ records, a handful among all laps
+        db.Index('ix_race_results_status', race_id, status,
+                 postgresql_where=status.isnot(None), sqlite_where=status.isnot(None)),
+    )
+
+    def __repr__(self):
+        return f'<RaceResult {self.race_id}/{self.number}: lap {self.lap_number}>'
@@ -0,0 +1,21 @@
+# database/race_standing.py
+from . import db
+
+class RaceStanding(db.Model):
+    """
+    Current standing of one runner, aggregated from the race results table.
+    Maintained on every results write, see database/standings_operations.py.
+    """
+
+    __tablename__ = 'race_standing'
+    race_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    number = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    lap_number = db.Column(db.Integer, nullable=False)
+    last_lap_timestamp = db.Column(db.DateTime, nullable=False)
+    # Milliseconds from the runner's start to last_lap_timestamp
+    race_time_ms = db.Column(db.Integer)
+    last_seen_time = db.Column(db.DateTime)
+    status = db.Column(db.String(5))
+
+    def __repr__(self):
+        return f'<RaceStanding {self.race_id}/{self.number}: lap {self.lap_number}>'
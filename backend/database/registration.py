@@ -11,3 +11,7 @@ class Registration(db.Model):
     registration_time = db.Column(db.Time, nullable=False)
     user_start_time = db.Column(db.Time)
     number = db.Column(db.Integer)
+    # Resolved for the age in the race year, see database/category_operations.py
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'))
+    # Track's actual start on the race day plus user_start_time, see database/lineup_operations.py
+    start_timestamp = db.Column(db.DateTime)
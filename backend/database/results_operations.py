@@ -0,0 +1,144 @@
+from sqlalchemy import text
+from datetime import datetime, timedelta
+from database import db
+from database.race_operations import insert_race_results
+from reader.taglist import parse_line
+from database.standings_operations import refresh_standings
+from timing.race_state import race_state, ACCEPTED
+from timing.times import truncate_ms
+
+# Rows per multi-row INSERT, keeps the bind parameter count well below driver limits
+INSERT_CHUNK_SIZE = 500
+
+# Attempts to decide a batch again after another process wrote the same race
+STATE_CONFLICT_RETRIES = 3
+
+class MissingStartTimeError(Exception):
+    """Raised when reads arrive for a track whose actual start time is not set."""
+
+def insert_laps(race_id, laps):
+    """
+    Insert lap rows with multi-row INSERT statements.
+    A lap some other writer has already stored (same runner and lap number,
+    see the unique index ux_race_results_lap) is skipped instead of failing
+    the transaction, so writers of the same race can run in parallel.
+
+    Args:
+        race_id (int): ID of the race
+        laps (list): Dicts with number, tag_id, track_id, timestamp, last_seen_time,
+            lap_number, lap_time_ms and race_time_ms
+
+    Returns:
+        int: Number of inserted laps
+    """
+
+    columns = ['number', 'tag_id', 'track_id', 'timestamp', 'last_seen_time', 'lap_number', 'lap_time_ms', 'race_time_ms']
+
+    inserted = 0
+    for start in range(0, len(laps), INSERT_CHUNK_SIZE):
+        chunk = laps[start:start + INSERT_CHUNK_SIZE]
+        params = {'race_id': race_id}
+        rows = []
+        for i, lap in enumerate(chunk):
+            rows.append('(:race_id, ' + ', '.join(f':{column}_{i}' for column in columns) + ')')
+            for column in columns:
+                params[f'{column}_{i}'] = lap[column]
+
+        inserted += insert_race_results(race_id, text(f'''
+            INSERT INTO race_results (race_id, {', '.join(columns)})
+            VALUES {', '.join(rows)}
+            ON CONFLICT (race_id, number, lap_number) DO NOTHING
+        '''), params).rowcount
+
+    return inserted
+
+def store_tag_results(race_id, track, lines):
+    """
+    Store RFID taglist lines as race results for one track.
+    Validates every read against registrations, start time and minimum lap duration.
+    Laps are decided against the in-memory race state (see RaceStateEngine)
+    and written with one multi-row INSERT, so a batch costs a constant number
+    of round trips regardless of its size. Laps another writer stored in the
+    meantime are skipped by the INSERT and the batch is decided again.
+    Shared by the /api/store_results endpoint and the ingestion service.
+
+    Args:
+        race_id (int): ID of the race
+        track (Track): Track the reads are evaluated for
+        lines (list): Raw taglist lines as returned by the reader
+
+    Returns:
+        tuple: Number of stored results and list of stored tag IDs
+
+    Raises:
+        MissingStartTimeError: If the track start time has not been set yet
+        RuntimeError: If other processes kept writing the race during every attempt
+    """
+
+    reads = []
+    for line in lines:
+        record = parse_line(line)
+        if record and record.number is not None:
+            reads.append((record.tag_id, record.number))
+
+    if not reads:
+        return 0, []
+
+    with race_state.race_lock(race_id):
+        for _ in range(STATE_CONFLICT_RETRIES):
+            state = race_state.current(race_id)
+            race_state.load_runners(state, {number for _, number in reads})
+
+            if not any(number in state.runners and state.runners[number].track_id == track.id for _, number in reads):
+                return 0, []
+
+            if not track.actual_start_time:
+                raise MissingStartTimeError("Actual start time not set for category")
+
+            # Reads are timed on arrival, the reader clock is not trusted
+            current_time = truncate_ms(datetime.now() + timedelta(hours=1))
+            last_seen_datetime = current_time
+
+            new_laps = []
+            tags_found = []
+
+            try:
+                for tag_id, number in reads:
+                    lap_number, reason = state.decide(number, last_seen_datetime, track)
+                    if reason is not ACCEPTED:
+                        continue
+
+                    lap_time_ms, race_time_ms = state.lap_times(number, current_time)
+                    new_laps.append({
+                        'number': number,
+                        'tag_id': tag_id,
+                        'track_id': track.id,
+                        'timestamp': current_time,
+                        'last_seen_time': last_seen_datetime,
+                        'lap_number': lap_number,
+                        'lap_time_ms': lap_time_ms,
+                        'race_time_ms': race_time_ms
+                    })
+                    state.record(number, lap_number, current_time, last_seen_datetime)
+                    tags_found.append(tag_id)
+
+                if not new_laps:
+                    return 0, []
+
+                if insert_laps(race_id, new_laps) < len(new_laps):
+                    # Another writer stored some of these laps first, decide again on its results
+                    db.session.rollback()
+                    race_state.invalidate(race_id)
+                    continue
+
+                refresh_standings(race_id, {lap['number'] for lap in new_laps})
+                if not race_state.advance(state):
+                    continue
+
+                db.session.commit()
+                return len(new_laps), tags_found
+            except Exception:
+                race_state.invalidate(race_id)
+                raise
+
+    raise RuntimeError(f"Results of race {race_id} changed concurrently, try again")
@@ -0,0 +1,134 @@
+# database/results_queries.py
+from sqlalchemy import text, bindparam, select, update, insert, delete
+from sqlalchemy.exc import IntegrityError
+from database import db
+from database.registration import Registration
+from database.results_version import ResultsVersion
+from timing.times import as_datetime
+
+def get_last_laps(race_id, numbers=None):
+    """
+    Fetch the latest lap of each runner in one query.
+
+    Args:
+        race_id (int): ID of the race
+        numbers (iterable): Runners' bib numbers, None for all runners
+
+    Returns:
+        dict: Bib number -> (lap number, timestamp, last seen datetime)
+    """
+
+    params = {'race_id': race_id}
+    where = ''
+    if numbers is not None:
+        params['numbers'] = list(numbers)
+        if not params['numbers']:
+            return {}
+        where = 'AND number IN :numbers'
+
+    query = text(f'''
+        SELECT number, lap_number, timestamp, last_seen_time
+        FROM (
+            SELECT
+                number,
+                lap_number,
+                timestamp,
+                last_seen_time,
+                ROW_NUMBER() OVER (PARTITION BY number ORDER BY timestamp DESC) AS position
+            FROM race_results
+            WHERE race_id = :race_id
+            {where}
+        ) latest
+        WHERE position = 1
+    ''')
+    if numbers is not None:
+        query = query.bindparams(bindparam('numbers', expanding=True))
+
+    rows = db.session.execute(query, params).fetchall()
+    return {
+        row.number: (row.lap_number, as_datetime(row.timestamp), as_datetime(row.last_seen_time))
+        for row in rows
+    }
+
+def get_registered_runners(race_id, numbers=None):
+    """
+    Fetch bib number, track and start instant of registered runners.
+
+    Args:
+        race_id (int): ID of the race
+        numbers (iterable): Runners' bib numbers, None for all runners
+
+    Returns:
+        list: Rows with number, track_id and start_timestamp
+    """
+
+    query = db.session.query(
+        Registration.number,
+        Registration.track_id,
+        Registration.start_timestamp
+    ).filter(
+        Registration.race_id == race_id,
+        Registration.number.isnot(None)
+    )
+    if numbers is not None:
+        query = query.filter(Registration.number.in_(list(numbers)))
+    return query.all()
+
+def get_results_generation(race_id):
+    """
+    Get the current generation of a race's results.
+
+    Args:
+        race_id (int): ID of the race
+
+    Returns:
+        int: Generation, 0 if the race has never been written
+    """
+
+    generation = db.session.execute(
+        select(ResultsVersion.generation).where(ResultsVersion.race_id == race_id)
+    ).scalar()
+    return generation or 0
+
+def bump_results_generation(race_id, expected=None):
+    """
+    Advance the generation of a race's results within the current transaction.
+    With expected set the bump only succeeds if nobody else has written since
+    (optimistic concurrency); on conflict the transaction is rolled back.
+
+    Args:
+        race_id (int): ID of the race
+        expected (int): Generation the caller's decisions were based on
+
+    Returns:
+        int: New generation, None on conflict
+    """
+
+    statement = update(ResultsVersion).where(ResultsVersion.race_id == race_id)
+    if expected is not None:
+        statement = statement.where(ResultsVersion.generation == expected)
+    result = db.session.execute(statement.values(generation=ResultsVersion.generation + 1))
+
+    if result.rowcount:
+        return get_results_generation(race_id)
+
+    if expected:
+        db.session.rollback()
+        return None
+
+    try:
+        db.session.execute(insert(ResultsVersion).values(race_id=race_id, generation=1))
+    except IntegrityError:
+        db.session.rollback()
+        return None
+    return 1
+
+def delete_results_generation(race_id):
+    """
+    Remove the generation of a deleted race's results within the current transaction.
+
+    Args:
+        race_id (int): ID of the race
+    """
+
+    db.session.execute(delete(ResultsVersion).where(ResultsVersion.race_id == race_id))
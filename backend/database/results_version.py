@@ -0,0 +1,16 @@
+# database/results_version.py
+from . import db
+
+class ResultsVersion(db.Model):
+    """
+    Generation counter of a race's results and registrations.
+    Bumped in the same transaction as every write, so processes holding
+    in-memory state derived from the results can tell when it is stale.
+    """
+
+    __tablename__ = 'results_version'
+    race_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ResultsVersion {self.race_id}: {self.generation}>'
@@ -0,0 +1,167 @@
+# database/schema_upgrades.py
+from flask import current_app
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+from database import db
+from database.backup import BackUpTag
+from database.registration import Registration
+from database.race_result import RaceResult
+from database.race_standing import RaceStanding
+from database.category_operations import assign_missing_categories
+from database.lineup_operations import assign_missing_start_timestamps
+from database.lap_operations import update_lap_times
+from database.race_operations import remove_duplicate_laps
+
+# Columns added to existing tables after their first release: table -> {column: DDL type}
+ADDED_COLUMNS = {
+    BackUpTag.__table__.name: {
+        'count': 'INTEGER',
+        'antenna': 'INTEGER',
+        'protocol': 'INTEGER'
+    },
+    Registration.__table__.name: {
+        'category_id': 'INTEGER REFERENCES category(id)',
+        'start_timestamp': 'TIMESTAMP'
+    },
+    RaceResult.__table__.name: {
+        'lap_time_ms': 'INTEGER',
+        'race_time_ms': 'INTEGER'
+    },
+    RaceStanding.__table__.name: {
+        'race_time_ms': 'INTEGER'
+    }
+}
+
+def add_missing_columns(table_name, columns):
+    """
+    Add columns missing in an existing table.
+    db.create_all() creates new tables only, so columns added to models
+    later have to be added to databases created before.
+
+    Args:
+        table_name (str): Name of the table
+        columns (dict): Column name -> DDL type
+
+    Returns:
+        list: Names of added columns
+    """
+
+    inspector = inspect(db.engine)
+    if not inspector.has_table(table_name):
+        return []
+
+    existing = {column['name'] for column in inspector.get_columns(table_name)}
+    added = []
+    for name, ddl_type in columns.items():
+        if name not in existing:
+            db.session.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {name} {ddl_type}'))
+            added.append(name)
+
+    return added
+
+# Tables whose model indexes are created on existing databases too
+INDEXED_TABLES = [
+    RaceResult.__table__
+]
+
+# Indexes of earlier releases replaced by a model index: table -> index names
+SUPERSEDED_INDEXES = {
+    RaceResult.__table__.name: ['ix_race_results_number_lap']
+}
+
+def add_missing_indexes(table):
+    """
+    Create model indexes missing in an existing table.
+    On PostgreSQL an index created on the partitioned race_results table is
+    created on every partition, present and future, as well.
+
+    Args:
+        table (Table): Table with the indexes declared on its model
+
+    Returns:
+        list: Names of created indexes
+    """
+
+    inspector = inspect(db.engine)
+    if not inspector.has_table(table.name):
+        return []
+
+    existing = {index['name'] for index in inspector.get_indexes(table.name)}
+    created = []
+    for index in sorted(table.indexes, key=lambda index: index.name):
+        if index.name not in existing:
+            db.session.execute(CreateIndex(index, if_not_exists=True))
+            created.append(index.name)
+
+    return created
+
+def has_index(table_name, index_name):
+    """
+    Check whether an existing table has an index.
+
+    Args:
+        table_name (str): Name of the table
+        index_name (str): Name of the index
+
+    Returns:
+        bool: True if the table exists and has the index
+    """
+
+    inspector = inspect(db.engine)
+    if not inspector.has_table(table_name):
+        return False
+    return index_name in {index['name'] for index in inspector.get_indexes(table_name)}
+
+def upgrade_schema():
+    """
+    Bring tables of an existing database up to the current models.
+    Safe to run repeatedly. Existing rows are backfilled once, by the
+    upgrade that adds the columns they need, so later startups only
+    inspect the schema.
+    """
+
+    try:
+        # Laps are unique once the index exists, only older databases need cleaning up
+        deduplicated = has_index(RaceResult.__table__.name, 'ux_race_results_lap')
+
+        added_columns = {}
+        for table_name, columns in ADDED_COLUMNS.items():
+            added = add_missing_columns(table_name, columns)
+            if added:
+                added_columns[table_name] = added
+                current_app.logger.info(f"Added columns {', '.join(added)} to {table_name}")
+
+        if not deduplicated:
+            duplicates = remove_duplicate_laps()
+            if duplicates:
+                # Committed before the indexes are inspected on another connection
+                db.session.commit()
+                current_app.logger.info(f"Removed {duplicates} duplicate laps")
+
+        for index_names in SUPERSEDED_INDEXES.values():
+            for index_name in index_names:
+                db.session.execute(text(f'DROP INDEX IF EXISTS {index_name}'))
+
+        for table in INDEXED_TABLES:
+            created = add_missing_indexes(table)
+            if created:
+                current_app.logger.info(f"Created indexes {', '.join(created)} on {table.name}")
+
+        if 'category_id' in added_columns.get(Registration.__table__.name, []):
+            assigned = assign_missing_categories()
+            if assigned:
+                current_app.logger.info(f"Assigned categories to {assigned} registrations")
+
+        if 'start_timestamp' in added_columns.get(Registration.__table__.name, []):
+            started = assign_missing_start_timestamps()
+            if started:
+                current_app.logger.info(f"Computed start instants of {started} registrations")
+
+        if 'lap_time_ms' in added_columns.get(RaceResult.__table__.name, []):
+            timed = update_lap_times(missing_only=True)
+            if timed:
+                current_app.logger.info(f"Computed lap times of {timed} laps")
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error upgrading database schema: {str(e)}")
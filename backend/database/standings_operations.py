@@ -0,0 +1,295 @@
+# database/standings_operations.py
+from collections import defaultdict
+from sqlalchemy import text, bindparam, and_
+from database import db
+from database.race_standing import RaceStanding
+from database.registration import Registration
+from database.user import Users
+from database.track import Track
+from database.category import Category
+from database.lap_operations import elapsed_ms_sql
+from timing.times import as_datetime, format_duration, format_clock
+
+STATUSES = ('DNF', 'DNS', 'DSQ')
+
+def aggregate_standings(laps):
+    """
+    Reduce result rows to one standing per runner.
+    The first status row (DNF, DNS, DSQ) freezes the standing at that lap,
+    otherwise the runner stands at the highest lap recorded.
+
+    Args:
+        laps (iterable): Rows with number, timestamp, lap_number, status, last_seen_time and race_time_ms
+
+    Returns:
+        dict: Bib number -> dict with lap_number, last_lap_timestamp, race_time_ms,
+        last_seen_time and status
+    """
+
+    standings = {}
+    status_laps = {}
+
+    for lap in laps:
+        timestamp = as_datetime(lap.timestamp)
+        last_seen = as_datetime(lap.last_seen_time)
+
+        standing = standings.get(lap.number)
+        if standing is None:
+            standings[lap.number] = {
+                'lap_number': lap.lap_number,
+                'last_lap_timestamp': timestamp,
+                'race_time_ms': lap.race_time_ms,
+                'last_seen_time': last_seen,
+                'status': None
+            }
+        else:
+            standing['lap_number'] = max(standing['lap_number'], lap.lap_number)
+            if timestamp > standing['last_lap_timestamp']:
+                standing['last_lap_timestamp'] = timestamp
+                standing['race_time_ms'] = lap.race_time_ms
+            if last_seen and (standing['last_seen_time'] is None or last_seen > standing['last_seen_time']):
+                standing['last_seen_time'] = last_seen
+
+        if lap.status in STATUSES:
+            first = status_laps.get(lap.number)
+            if first is None or timestamp < first[0]:
+                status_laps[lap.number] = (timestamp, lap.race_time_ms, lap.lap_number, lap.status)
+
+    for number, (timestamp, race_time_ms, lap_number, status) in status_laps.items():
+        standings[number].update(last_lap_timestamp=timestamp, race_time_ms=race_time_ms,
+                                 lap_number=lap_number, status=status)
+
+    return standings
+
+def mark_standings_changed(race_id, numbers=None):
+    """
+    Note in the session which runners' standings the pending transaction changes.
+    Collected in session.info['changed_standings'] (None stands for the whole
+    race) for listeners of the commit, see timing/live.py.
+
+    Args:
+        race_id (int): ID of the race
+        numbers (iterable): Changed bib numbers, None for the whole race
+    """
+
+    changed = db.session.info.setdefault('changed_standings', {}).setdefault(race_id, set())
+    if numbers is None:
+        changed.add(None)
+    else:
+        changed.update(numbers)
+
+def refresh_standings(race_id, numbers=None):
+    """
+    Recompute standings of runners from the race results table.
+    Runs in the caller's transaction, so standings change atomically with the laps.
+
+    Args:
+        race_id (int): ID of the race
+        numbers (iterable): Bib numbers whose laps changed, None for the whole race
+
+    Returns:
+        int: Number of standings written
+    """
+
+    query = text('''
+        SELECT number, timestamp, lap_number, status, last_seen_time, race_time_ms
+        FROM race_results
+        WHERE race_id = :race_id
+    ''')
+    params = {'race_id': race_id}
+
+    if numbers is not None:
+        numbers = {int(number) for number in numbers}
+        if not numbers:
+            return 0
+        query = text(f'{query.text} AND number IN :numbers').bindparams(bindparam('numbers', expanding=True))
+        params['numbers'] = list(numbers)
+
+    standings = aggregate_standings(db.session.execute(query, params).fetchall())
+
+    delete = RaceStanding.__table__.delete().where(RaceStanding.race_id == race_id)
+    if numbers is not None:
+        delete = delete.where(RaceStanding.number.in_(numbers))
+    db.session.execute(delete)
+
+    mark_standings_changed(race_id, numbers)
+
+    if standings:
+        db.session.execute(RaceStanding.__table__.insert(), [
+            dict(race_id=race_id, number=number, **standing)
+            for number, standing in standings.items()
+        ])
+
+    return len(standings)
+
+def update_standing_times(race_id=None, numbers=None, missing_only=False):
+    """
+    Recompute stored race times of standings from the runners' start
+    instants, in one statement in the caller's transaction. Call when start
+    instants change; refresh_standings() takes the times from the laps.
+
+    Args:
+        race_id (int): ID of the race, all races if None
+        numbers (iterable): Only standings of these bib numbers, all runners if None
+        missing_only (bool): Only standings lacking a race time
+
+    Returns:
+        int: Number of standings updated
+    """
+
+    race_time_ms = elapsed_ms_sql('registration.start_timestamp', 'race_standing.last_lap_timestamp')
+    params = {}
+    filters = []
+    if race_id is not None:
+        filters.append('AND race_standing.race_id = :race_id')
+        params['race_id'] = race_id
+    if numbers is not None:
+        params['numbers'] = [int(number) for number in numbers]
+        if not params['numbers']:
+            return 0
+        filters.append('AND race_standing.number IN :numbers')
+    if missing_only:
+        filters.append('AND race_standing.race_time_ms IS NULL')
+
+    query = text(f'''
+        UPDATE race_standing
+        SET race_time_ms = {race_time_ms}
+        FROM registration
+        WHERE registration.race_id = race_standing.race_id
+        AND registration.number = race_standing.number
+        AND race_standing.race_time_ms IS DISTINCT FROM {race_time_ms}
+        {' '.join(filters)}
+    ''')
+    if numbers is not None:
+        query = query.bindparams(bindparam('numbers', expanding=True))
+
+    return db.session.execute(query, params).rowcount
+
+def rebuild_standings(race_id):
+    """
+    Rebuild all standings of a race from its results table and commit.
+
+    Args:
+        race_id (int): ID of the race
+
+    Returns:
+        int: Number of standings written
+    """
+
+    count = refresh_standings(race_id)
+    db.session.commit()
+    return count
+
+def rank_standings(race_id):
+    """
+    Rank all runners of a race from its standings.
+    Ranks runners by track and by category within the track: finished runners
+    by race time, then unfinished runners, then runners with a status.
+    Entries are plain values, so a ranking can outlive the session it was
+    computed in (see timing/ranking.py).
+
+    Args:
+        race_id (int): ID of the race
+
+    Returns:
+        list: Entry dicts ordered by track and position, with 'rank' being the
+        sort key within a partition and race_time in milliseconds (None if unfinished)
+    """
+
+    rows = db.session.query(RaceStanding, Registration, Users, Track, Category).join(
+        Registration,
+        and_(Registration.number == RaceStanding.number, Registration.race_id == race_id)
+    ).join(
+        Users, Users.id == Registration.user_id
+    ).join(
+        Track, Track.id == Registration.track_id
+    ).outerjoin(
+        Category, Category.id == Registration.category_id
+    ).filter(
+        RaceStanding.race_id == race_id
+    ).all()
+
+    entries = []
+
+    for standing, registration, user, track, category in rows:
+        if standing.status is not None and standing.status not in STATUSES:
+            continue
+
+        race_time = standing.race_time_ms if standing.lap_number == track.number_of_laps else None
+
+        ranked_time = race_time if standing.status is None else None
+        if standing.status is not None:
+            group = 2
+        elif ranked_time is None:
+            group = 1
+        else:
+            group = 0
+
+        entries.append({
+            'number': standing.number,
+            'firstname': user.firstname,
+            'surname': user.surname,
+            'club': user.club,
+            'email': user.email,
+            'category': category.category_name if category else None,
+            'track': track.name,
+            'track_id': track.id,
+            'number_of_laps': track.number_of_laps,
+            'lap_number': standing.lap_number,
+            'race_time': race_time,
+            'ranked_time': ranked_time,
+            'last_seen_time': standing.last_seen_time,
+            'status': standing.status,
+            'rank': (group, ranked_time or 0, standing.number)
+        })
+
+    entries.sort(key=lambda entry: (entry['track'], entry['rank']))
+
+    for partition_key, position_key, behind_key in (
+        (lambda entry: entry['track'], 'position_track', 'behind_time_track'),
+        (lambda entry: (entry['category'], entry['track']), 'position_category', 'behind_time_category')
+    ):
+        partitions = defaultdict(list)
+        for entry in entries:
+            partitions[partition_key(entry)].append(entry)
+
+        for partition in partitions.values():
+            times = [entry['ranked_time'] for entry in partition if entry['ranked_time'] is not None]
+            leader_time = min(times) if times else None
+
+            for position, entry in enumerate(partition, start=1):
+                entry[position_key] = entry['status'] if entry['status'] is not None else str(position)
+                entry[behind_key] = (
+                    format_duration(entry['ranked_time'] - leader_time)
+                    if entry['ranked_time'] is not None else None
+                )
+
+    return entries
+
+def format_result(entry):
+    """
+    Format a ranked entry as a row of the race results.
+
+    Args:
+        entry (dict): Entry from rank_standings()
+
+    Returns:
+        dict: Result with positions and times by track and category
+    """
+
+    return {
+        'number': entry['number'],
+        'name': f"{entry['firstname']} {entry['surname']}",
+        'club': entry['club'],
+        'category': entry['category'] or 'N/A',
+        'track': entry['track'],
+        'track_id': entry['track_id'],
+        'race_time': format_duration(entry['race_time']) if entry['race_time'] is not None else '--:--:--',
+        'last_seen_time': format_clock(entry['last_seen_time']) if entry['last_seen_time'] else '--:--:--',
+        'position_track': entry['position_track'],
+        'position_category': entry['position_category'],
+        'behind_time_track': entry['behind_time_track'] or ' ',
+        'behind_time_category': entry['behind_time_category'] or ' ',
+        'status': entry['status'],
+        'lap_number': entry['lap_number']
+    }
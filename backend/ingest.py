@@ -0,0 +1,291 @@
+# ingest.py
+import asyncio
+import configparser
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from app import create_app
+from database import db
+from database.race import Race
+from database.track import Track
+from database.results_operations import store_tag_results, MissingStartTimeError
+from database.backup_operations import tag_archive
+from reader.aio_client import serve_notifications
+from reader.registry import ReaderRegistry, FINISH
+from reader.taglist import parse_taglist
+from timing.dedup import ReadDeduplicator, read_deduplicator
+from timing.race_state import race_state
+
+class TaglistIngestor:
+    """
+    Standalone ingestion service for the Alien RFID readers.
+    Keeps one session per configured reader open, polls each taglist on its own
+    schedule (or lets the reader push reads in notify mode) and feeds the reads
+    into the results pipeline, independent of any browser tab.
+    Reader I/O runs as one asyncio task per reader, database writes run on a
+    single writer thread; both are joined by a bounded queue, so a slow reader
+    delays neither the other readers nor the writes.
+    """
+
+    def __init__(self, app, registry, poll_interval=0.5, reconnect_delay=5.0, queue_size=64,
+                 listen_host='0.0.0.0', persist_time=2):
+        self.app = app
+        self.registry = registry
+        self.poll_interval = poll_interval
+        self.reconnect_delay = reconnect_delay
+        self.queue_size = queue_size
+        self.listen_host = listen_host
+        self.persist_time = persist_time
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='results-writer')
+        self.skipped_polls = 0
+        self.archived = ReadDeduplicator()
+        self.taglists = None
+        self.stopping = None
+        self.servers = []
+
+    def prepare(self):
+        """
+        Create the loop-bound queue and stop event, must run inside the event loop.
+        """
+
+        self.taglists = asyncio.Queue(maxsize=self.queue_size)
+        self.stopping = asyncio.Event()
+
+    async def serve(self):
+        """
+        Run the reader and writer tasks until stop() is called.
+        """
+
+        self.prepare()
+        tasks = [asyncio.create_task(self._write_loop())]
+
+        for reader in self.registry:
+            if reader.mode == 'notify':
+                self.servers.append(await serve_notifications(
+                    self.listen_host,
+                    reader.listen_port,
+                    lambda lines, name=reader.name: self.taglists.put(self.registry.route(name, lines))
+                ))
+                tasks.append(asyncio.create_task(self._session_loop(reader)))
+            else:
+                tasks.append(asyncio.create_task(self._poll_loop(reader)))
+
+        try:
+            await self.stopping.wait()
+        finally:
+            for server in self.servers:
+                server.close()
+                await server.wait_closed()
+            self.servers = []
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.registry.disconnect_all()
+
+    def stop(self):
+        """
+        Ask the running service to stop.
+        """
+
+        if self.stopping:
+            self.stopping.set()
+
+    async def _ensure_connected(self, reader):
+        client = self.registry.client(reader.name)
+        if not client.connected:
+            await client.connect()
+            self.app.logger.info(f"Connected to RFID reader {reader.name} ({reader.hostname}:{reader.port})")
+            if reader.mode == 'notify':
+                await client.enable_notify(reader.notify_address, self.persist_time)
+        return client
+
+    async def poll_once(self, reader):
+        """
+        Read the current taglist of one reader and queue it for processing.
+        Reconnects first if the session was lost.
+
+        Args:
+            reader (ReaderConfig): Reader to poll
+        """
+
+        client = await self._ensure_connected(reader)
+        lines = await client.taglist()
+        if lines:
+            self._enqueue(self.registry.route(reader.name, lines))
+
+    def _enqueue(self, reads):
+        """
+        Put polled reads into the processing queue.
+        When the writer falls behind the poll is skipped, the next taglist of
+        the same reader contains all tags seen within the persist time again.
+        Pushed reads (notify mode) never go through here, they are reported
+        only once and wait for free space instead.
+        """
+
+        try:
+            self.taglists.put_nowait(reads)
+        except asyncio.QueueFull:
+            self.skipped_polls += 1
+
+    async def _poll_loop(self, reader):
+        while True:
+            try:
+                await self.poll_once(reader)
+            except Exception as e:
+                self.app.logger.error(f"RFID reader {reader.name} polling failed: {str(e)}")
+                await self.registry.client(reader.name).disconnect()
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            await asyncio.sleep(self.poll_interval)
+
+    async def _session_loop(self, reader):
+        while True:
+            try:
+                client = await self._ensure_connected(reader)
+                await client.command('get NotifyMode')
+            except Exception as e:
+                self.app.logger.error(f"RFID reader {reader.name} session failed: {str(e)}")
+                await self.registry.client(reader.name).disconnect()
+
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            reads = await self.taglists.get()
+            while not self.taglists.empty():
+                reads = reads + self.taglists.get_nowait()
+
+            try:
+                stored = await loop.run_in_executor(self.executor, self.process, reads)
+                if stored:
+                    self.app.logger.info(f"Stored {stored} results")
+            except Exception as e:
+                self.app.logger.error(f"Error processing taglist: {str(e)}")
+
+    def active_tracks(self, reader):
+        """
+        Get tracks whose reads should be evaluated for a reader.
+        Uses the reader's race and tracks, otherwise all races held today.
+
+        Args:
+            reader (ReaderConfig): Reader the reads came from
+
+        Returns:
+            list: Started tracks (actual start time set)
+        """
+
+        query = Track.query.filter(Track.actual_start_time.isnot(None))
+        if reader.race_id:
+            query = query.filter(Track.race_id == reader.race_id)
+        else:
+            query = query.join(Race, Track.race_id == Race.id).filter(Race.date == date.today())
+        if reader.track_ids:
+            query = query.filter(Track.id.in_(reader.track_ids))
+        return query.all()
+
+    def process(self, reads):
+        """
+        Queue tag reads for the archive and store finish-line reads as results for every started track.
+        Reads already archived or stored are dropped before touching the database.
+        Runs on the writer thread.
+
+        Args:
+            reads (list): TagRead records
+
+        Returns:
+            int: Number of stored results
+        """
+
+        finish_lines = defaultdict(list)
+        reader_lines = defaultdict(list)
+        for read in reads:
+            reader_lines[read.reader].append(read.line)
+            if read.checkpoint == FINISH:
+                finish_lines[read.reader].append(read.line)
+
+        archive = []
+        for name, lines in reader_lines.items():
+            fresh = self.archived.filter(None, name, lines)[0]
+            self.archived.record(None, name, fresh)
+            archive.extend(fresh)
+        if archive:
+            tag_archive.submit(parse_taglist('\n'.join(archive)))
+
+        stored = 0
+        with self.app.app_context():
+            try:
+                for name, lines in finish_lines.items():
+                    for track in self.active_tracks(self.registry.get(name)):
+                        fresh, _ = read_deduplicator.filter(track.race_id, track.id, lines)
+                        if not fresh:
+                            continue
+                        try:
+                            count, _ = store_tag_results(track.race_id, track, fresh)
+                            stored += count
+                            read_deduplicator.record(track.race_id, track.id, fresh)
+                        except MissingStartTimeError:
+                            db.session.rollback()
+            finally:
+                db.session.remove()
+
+        return stored
+
+    def warm_up(self):
+        """
+        Build the live state of all races the readers time, so the first
+        reads are decided without loading the results table.
+        """
+
+        with self.app.app_context():
+            try:
+                race_ids = {track.race_id for reader in self.registry for track in self.active_tracks(reader)}
+                race_state.warm_up(race_ids)
+            except Exception as e:
+                self.app.logger.error(f"Error loading race state: {str(e)}")
+            finally:
+                db.session.remove()
+
+    def run(self):
+        """
+        Run the service until interrupted.
+        """
+
+        self.warm_up()
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.executor.shutdown(wait=True)
+
+def create_ingestor(app):
+    """
+    Create the ingestion service from the [ingestion] and reader config sections.
+    Readers are listed as [reader <name>] sections, see ReaderRegistry.from_config.
+
+    Args:
+        app (Flask): Flask application instance
+
+    Returns:
+        TaglistIngestor: Configured ingestion service
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    return TaglistIngestor(
+        app,
+        ReaderRegistry.from_config(config),
+        poll_interval=config.getfloat('ingestion', 'poll_interval', fallback=0.5),
+        reconnect_delay=config.getfloat('ingestion', 'reconnect_delay', fallback=5.0),
+        queue_size=config.getint('ingestion', 'queue_size', fallback=64),
+        listen_host=config.get('ingestion', 'listen_host', fallback='0.0.0.0'),
+        persist_time=config.getint('ingestion', 'persist_time', fallback=2)
+    )
+
+if __name__ == '__main__':
+    app = create_app()
+    create_ingestor(app).run()
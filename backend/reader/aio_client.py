@@ -0,0 +1,248 @@
+# reader/aio_client.py
+import asyncio
+
+from reader.notify import NotificationBuffer, notify_commands
+
+IAC = 255
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250
+SE = 240
+
+class AsyncAlienClient:
+    """
+    Asyncio client for the Alien reader command protocol.
+    Every network wait is bounded by a timeout, so a slow or unreachable reader
+    never blocks anything but its own task. Commands on one connection are
+    serialized, the reader answers them strictly in order.
+    """
+
+    def __init__(self, hostname, port, username='alien', password='password', timeout=5.0, connect_timeout=3.0):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.reader = None
+        self.writer = None
+        self.connected = False
+        self.lock = None
+        # Received bytes not decoded yet (an incomplete telnet sequence) and decoded bytes not consumed yet
+        self._raw = b''
+        self._data = b''
+
+    async def connect(self):
+        """
+        Open the connection and log in.
+
+        Raises:
+            asyncio.TimeoutError: If the reader does not answer in time
+            ConnectionError: If the login is rejected
+        """
+
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.hostname, self.port),
+            timeout=self.connect_timeout
+        )
+        self._raw = b''
+        self._data = b''
+        self.lock = asyncio.Lock()
+
+        try:
+            await self._read_until(b'Username>', self.connect_timeout)
+            await self._send(self.username)
+            await self._read_until(b'Password>', self.connect_timeout)
+            await self._send(self.password)
+            response = await self._read_until(b'>', self.connect_timeout)
+        except Exception:
+            await self.disconnect()
+            raise
+
+        if b'Error' in response:
+            await self.disconnect()
+            raise ConnectionError("RFID reader rejected the login")
+
+        self.connected = True
+
+    async def disconnect(self):
+        """
+        Close the connection.
+        """
+
+        self.connected = False
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self.reader = None
+        self.writer = None
+
+    async def command(self, cmd):
+        """
+        Send one command and wait for the response.
+
+        Args:
+            cmd (str): Reader command
+
+        Returns:
+            str: Raw response including the trailing prompt
+        """
+
+        if not self.connected:
+            raise RuntimeError("Not connected to the RFID reader.")
+
+        async with self.lock:
+            try:
+                await self._send(cmd)
+                response = await self._read_until(b'>', self.timeout)
+            except Exception:
+                await self.disconnect()
+                raise
+
+        return response.decode('ascii')
+
+    async def taglist(self):
+        """
+        Read the current taglist.
+
+        Returns:
+            list: Tag report lines
+        """
+
+        response = await self.command('get Taglist')
+        lines = (line.strip() for line in response.split('\n')[1:-1])
+        return [line for line in lines if line and line != '(No Tags)']
+
+    async def stream(self, interval=0.5):
+        """
+        Poll the taglist continuously.
+        The next poll starts only after the consumer has taken the previous
+        result, so a slow consumer slows down polling instead of piling up reads.
+
+        Args:
+            interval (float): Seconds between polls
+
+        Yields:
+            list: Tag report lines of each poll
+        """
+
+        while self.connected:
+            yield await self.taglist()
+            await asyncio.sleep(interval)
+
+    async def enable_notify(self, address, persist_time=2):
+        """
+        Switch the reader to autonomous notify mode.
+        The reader reads on its own and pushes every newly seen tag to the given address.
+
+        Args:
+            address (str): host:port of the notify listener as reachable from the reader
+            persist_time (int): Seconds a tag stays in the reader taglist
+        """
+
+        for cmd in notify_commands(address, persist_time):
+            await self.command(cmd)
+
+    async def _send(self, text):
+        self.writer.write(text.encode('utf-8') + b'\n')
+        await asyncio.wait_for(self.writer.drain(), timeout=self.timeout)
+
+    async def _read_until(self, marker, timeout):
+        async def read():
+            while True:
+                index = self._data.find(marker)
+                if index >= 0:
+                    response = self._data[:index + len(marker)]
+                    self._data = self._data[index + len(marker):]
+                    return response
+
+                chunk = await self.reader.read(4096)
+                if not chunk:
+                    raise ConnectionError("RFID reader closed the connection")
+                # Each received byte is decoded exactly once, an escaped IAC must not be read as a command later
+                decoded, self._raw = self._strip_telnet(self._raw + chunk)
+                self._data += decoded
+
+        return await asyncio.wait_for(read(), timeout=timeout)
+
+    def _strip_telnet(self, data):
+        """
+        Remove telnet negotiation from received bytes and refuse every option.
+
+        Returns:
+            tuple: Decoded bytes and an incomplete sequence at the end, to be
+            decoded together with the next read
+        """
+
+        if IAC not in data:
+            return data, b''
+
+        output = bytearray()
+        i = 0
+        while i < len(data):
+            byte = data[i]
+            if byte != IAC:
+                output.append(byte)
+                i += 1
+                continue
+            if i + 1 >= len(data):
+                break
+            command = data[i + 1]
+            if command == IAC:
+                output.append(IAC)
+                i += 2
+            elif command in (DO, DONT, WILL, WONT):
+                if i + 2 >= len(data):
+                    break
+                if command in (DO, WILL):
+                    self.writer.write(bytes([IAC, WONT if command == DO else DONT, data[i + 2]]))
+                i += 3
+            elif command == SB:
+                end = data.find(bytes([IAC, SE]), i)
+                if end < 0:
+                    break
+                i = end + 2
+            else:
+                i += 2
+
+        return bytes(output), data[i:]
+
+async def serve_notifications(host, port, deliver):
+    """
+    Accept tag reports pushed by a reader in notify mode.
+    Each received batch of lines is awaited through deliver; while it waits
+    (e.g. on a full queue) the connection is not read any further, which
+    throttles the reader through TCP flow control instead of dropping reads.
+
+    Args:
+        host (str): Address to bind
+        port (int): Port to bind, 0 picks a free port
+        deliver (callable): Coroutine function receiving each list of tag lines
+
+    Returns:
+        asyncio.Server: Running server
+    """
+
+    async def handle(reader, writer):
+        buffer = NotificationBuffer()
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                lines = buffer.feed(data)
+                if lines:
+                    await deliver(lines)
+
+            lines = buffer.flush()
+            if lines:
+                await deliver(lines)
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
@@ -0,0 +1,197 @@
+# reader/fake_reader.py
+import argparse
+import socket
+import socketserver
+import threading
+import time
+from datetime import datetime
+
+PROMPT = b'\r\nAlien>'
+
+def format_tag_line(number, seen=None, count=1, antenna=0, tag_prefix='EPC 0000'):
+    """
+    Format one tag report the way the Alien reader does.
+
+    Args:
+        number (int): Runner's bib number encoded at the end of the tag ID
+        seen (datetime): Time the tag was seen, defaults to now
+        count (int): Read count
+        antenna (int): Antenna the tag was read on
+        tag_prefix (str): Leading part of the tag ID
+
+    Returns:
+        str: Tag report line
+    """
+
+    seen = seen or datetime.now()
+    timestamp = seen.strftime('%Y/%m/%d %H:%M:%S.%f')[:-3]
+    return f"Tag:{tag_prefix} {number}, Disc:{timestamp}, Last:{timestamp}, Count:{count}, Ant:{antenna}, Proto:2"
+
+class _CommandHandler(socketserver.StreamRequestHandler):
+    def _readline(self):
+        line = self.rfile.readline()
+        if not line:
+            raise ConnectionError("Client disconnected")
+        return line.decode('ascii').strip()
+
+    def handle(self):
+        reader = self.server.reader
+        try:
+            self.wfile.write(b'Username>')
+            username = self._readline()
+            self.wfile.write(b'Password>')
+            password = self._readline()
+
+            if (username, password) != (reader.username, reader.password):
+                # The reader asks again, this fake hangs up after the prompt
+                self.wfile.write(b'Error: Invalid login\r\nUsername>')
+                return
+
+            self.wfile.write(PROMPT)
+            while True:
+                command = self._readline()
+                if command.lower() in ('quit', 'exit'):
+                    return
+                self.wfile.write(b'\r\n' + reader.execute(command).encode('ascii') + PROMPT)
+        except (ConnectionError, OSError):
+            return
+
+class _CommandServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+class FakeAlienReader:
+    """
+    Local stand-in for an Alien RFID reader.
+    Serves the telnet command interface (login, get/set, get Taglist) and can
+    push notification messages to the configured NotifyAddress, so polling and
+    notify mode can be exercised without hardware.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, username='alien', password='password'):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.settings = {'NotifyMode': 'Off', 'AutoMode': 'Off'}
+        self.taglist = []
+        self.commands = []
+        self.lock = threading.Lock()
+        self.server = None
+
+    @property
+    def address(self):
+        return self.server.server_address if self.server else (self.host, self.port)
+
+    def start(self):
+        """
+        Start serving the command interface.
+        """
+
+        self.server = _CommandServer((self.host, self.port), _CommandHandler)
+        self.server.reader = self
+        threading.Thread(target=self.server.serve_forever, name='fake-alien-reader', daemon=True).start()
+
+    def stop(self):
+        """
+        Stop the command interface.
+        """
+
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def execute(self, command):
+        """
+        Execute one reader command.
+
+        Args:
+            command (str): Command as sent over telnet
+
+        Returns:
+            str: Reader response without prompt
+        """
+
+        with self.lock:
+            self.commands.append(command)
+
+            if command.lower() == 'get taglist':
+                return '\r\n'.join(self.taglist) if self.taglist else '(No Tags)'
+
+            action, _, argument = command.partition(' ')
+            if action.lower() == 'set' and '=' in argument:
+                name, value = (part.strip() for part in argument.split('=', 1))
+                self.settings[name] = value
+                return f"{name} = {value}"
+
+            if action.lower() == 'get':
+                name = argument.strip()
+                return f"{name} = {self.settings.get(name, '')}"
+
+            return f"Error: Unknown command '{command}'"
+
+    def see(self, lines):
+        """
+        Simulate tags passing the antenna.
+        Lines are added to the taglist and pushed to the notify address when notify mode is on.
+
+        Args:
+            lines (list): Tag report lines
+        """
+
+        with self.lock:
+            self.taglist.extend(lines)
+            notify = self.settings.get('NotifyMode', '').lower() == 'on'
+
+        if notify:
+            self.push(lines)
+
+    def push(self, lines):
+        """
+        Send one notification message with the given tag lines to NotifyAddress.
+
+        Args:
+            lines (list): Tag report lines
+        """
+
+        address = self.settings.get('NotifyAddress')
+        if not address:
+            return
+
+        host, _, port = address.rpartition(':')
+        message = '\r\n'.join([
+            '#Alien RFID Reader Auto Notification Message',
+            '#ReaderName: Fake Alien Reader',
+            f"#Time: {datetime.now().strftime('%Y/%m/%d %H:%M:%S')}",
+            '#Reason: TAGS ADDED',
+            *lines,
+            '#End of Notification Message'
+        ]) + '\r\n\0'
+
+        with socket.create_connection((host, int(port)), timeout=5) as connection:
+            connection.sendall(message.encode('ascii'))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fake Alien RFID reader for local testing')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=2323)
+    parser.add_argument('--runners', type=int, default=50, help='number of simulated bib numbers')
+    parser.add_argument('--interval', type=float, default=1.0, help='seconds between simulated passings')
+    args = parser.parse_args()
+
+    reader = FakeAlienReader(args.host, args.port)
+    reader.start()
+    print(f"Fake Alien reader listening on {args.host}:{args.port}")
+
+    number = 0
+    try:
+        while True:
+            time.sleep(args.interval)
+            number = number % args.runners + 1
+            try:
+                reader.see([format_tag_line(number)])
+            except OSError as e:
+                print(f"Notification push failed: {e}")
+    except KeyboardInterrupt:
+        reader.stop()
@@ -0,0 +1,87 @@
+# reader/notify.py
+NOTIFY_TERMINATOR = b'\0'
+NOTIFY_END_LINE = '#End of Notification Message'
+
+def notify_commands(address, persist_time=2):
+    """
+    Build the reader commands switching it to autonomous notify mode.
+
+    Args:
+        address (str): host:port of the notify listener as reachable from the reader
+        persist_time (int): Seconds a tag stays in the reader taglist, a runner
+            is reported again only after this time without being seen
+
+    Returns:
+        list: Reader commands in the order they have to be sent
+    """
+
+    return [
+        f'set NotifyAddress = {address}',
+        'set NotifyFormat = Text',
+        'set NotifyHeader = On',
+        'set NotifyTrigger = Add',
+        'set TagListMillis = On',
+        f'set PersistTime = {persist_time}',
+        'set NotifyMode = On',
+        'set AutoMode = On'
+    ]
+
+class NotificationBuffer:
+    """
+    Reassembles Alien notification messages from a TCP byte stream.
+    Messages are terminated by a null byte; header lines start with '#'
+    and every other non-empty line is a tag report.
+    """
+
+    def __init__(self):
+        self.pending = b''
+
+    def feed(self, data):
+        """
+        Add received bytes and return tag lines of all completed messages.
+
+        Args:
+            data (bytes): Bytes received from the reader
+
+        Returns:
+            list: Tag report lines in arrival order
+        """
+
+        self.pending += data
+        *messages, self.pending = self.pending.split(NOTIFY_TERMINATOR)
+
+        lines = []
+        for message in messages:
+            lines.extend(parse_notification(message.decode('ascii', errors='replace')))
+        return lines
+
+    def flush(self):
+        """
+        Return tag lines of an unterminated trailing message, e.g. when the reader closed the connection.
+
+        Returns:
+            list: Tag report lines
+        """
+
+        message, self.pending = self.pending, b''
+        if NOTIFY_END_LINE.encode('ascii') not in message:
+            return []
+        return parse_notification(message.decode('ascii', errors='replace'))
+
+def parse_notification(message):
+    """
+    Extract tag report lines from one notification message.
+
+    Args:
+        message (str): Text notification message
+
+    Returns:
+        list: Tag report lines
+    """
+
+    lines = []
+    for line in message.splitlines():
+        line = line.strip()
+        if line and not line.startswith('#') and line != '(No Tags)':
+            lines.append(line)
+    return lines
@@ -0,0 +1,168 @@
+# reader/registry.py
+import re
+from collections import namedtuple
+
+from reader.aio_client import AsyncAlienClient
+
+READER_SECTION_PREFIX = 'reader '
+FINISH = 'finish'
+
+ANTENNA_PATTERN = re.compile(r'Ant:(\d+)')
+
+TagRead = namedtuple('TagRead', ['reader', 'antenna', 'checkpoint', 'line'])
+
+class ReaderConfig:
+    """
+    Configuration of one reader: where it is, what it times and how its antennas are used.
+    Antennas map to checkpoints; only reads routed to the finish checkpoint count as laps.
+    """
+
+    def __init__(self, name, hostname, port, race_id=None, track_ids=None, mode='poll',
+                 notify_address=None, listen_port=None, antennas=None, default_checkpoint=FINISH):
+        self.name = name
+        self.hostname = hostname
+        self.port = port
+        self.race_id = race_id
+        self.track_ids = track_ids or []
+        self.mode = mode
+        self.notify_address = notify_address
+        self.listen_port = listen_port
+        self.antennas = antennas or {}
+        self.default_checkpoint = default_checkpoint
+
+    def checkpoint(self, antenna):
+        """
+        Get the checkpoint an antenna belongs to.
+
+        Args:
+            antenna (int): Antenna number, None if unknown
+
+        Returns:
+            str: Checkpoint name
+        """
+
+        return self.antennas.get(antenna, self.default_checkpoint)
+
+    @classmethod
+    def from_section(cls, name, section, defaults):
+        """
+        Build reader configuration from a config section.
+
+        Args:
+            name (str): Reader name
+            section (SectionProxy): Reader config section
+            defaults (SectionProxy): [ingestion] section used for missing values
+
+        Returns:
+            ReaderConfig: Reader configuration
+        """
+
+        race_id = section.get('race_id', fallback=defaults.get('race_id', fallback=''))
+        track_ids = [int(track_id) for track_id in section.get('track_ids', fallback='').split(',') if track_id.strip()]
+
+        antennas = {}
+        for mapping in section.get('antennas', fallback='').split(','):
+            if ':' in mapping:
+                antenna, checkpoint = mapping.split(':', 1)
+                antennas[int(antenna)] = checkpoint.strip()
+
+        return cls(
+            name,
+            section.get('hostname'),
+            section.getint('port', fallback=23),
+            race_id=int(race_id) if race_id else None,
+            track_ids=track_ids,
+            mode=section.get('mode', fallback=defaults.get('mode', fallback='poll')),
+            notify_address=section.get('notify_address', fallback=defaults.get('notify_address', fallback=None)),
+            listen_port=section.getint('listen_port', fallback=defaults.getint('listen_port', fallback=4000)),
+            antennas=antennas,
+            default_checkpoint=section.get('default_checkpoint', fallback=FINISH)
+        )
+
+class ReaderRegistry:
+    """
+    All readers of the installation, each with its own persistent connection.
+    Readers are configured in [reader <name>] sections; without any, the single
+    reader from [alien_rfid] is used as reader 'default'.
+    """
+
+    def __init__(self, readers, timeout=5.0):
+        self.readers = {reader.name: reader for reader in readers}
+        self.timeout = timeout
+        self.clients = {}
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Build the registry from parsed config.ini.
+
+        Args:
+            config (ConfigParser): Application configuration
+
+        Returns:
+            ReaderRegistry: Registry of configured readers
+        """
+
+        if not config.has_section('ingestion'):
+            config.add_section('ingestion')
+        defaults = config['ingestion']
+
+        readers = [
+            ReaderConfig.from_section(section[len(READER_SECTION_PREFIX):].strip(), config[section], defaults)
+            for section in config.sections()
+            if section.startswith(READER_SECTION_PREFIX)
+        ]
+
+        if not readers:
+            readers.append(ReaderConfig.from_section('default', config['alien_rfid'], defaults))
+
+        return cls(readers, timeout=defaults.getfloat('command_timeout', fallback=5.0))
+
+    def __iter__(self):
+        return iter(self.readers.values())
+
+    def __len__(self):
+        return len(self.readers)
+
+    def get(self, name):
+        return self.readers[name]
+
+    def client(self, name):
+        """
+        Get the persistent client of a reader, created on first use.
+
+        Args:
+            name (str): Reader name
+
+        Returns:
+            AsyncAlienClient: Client bound to the reader
+        """
+
+        if name not in self.clients:
+            reader = self.readers[name]
+            self.clients[name] = AsyncAlienClient(reader.hostname, reader.port, timeout=self.timeout)
+        return self.clients[name]
+
+    async def disconnect_all(self):
+        for client in self.clients.values():
+            await client.disconnect()
+
+    def route(self, name, lines):
+        """
+        Tag raw reads with reader, antenna and checkpoint.
+
+        Args:
+            name (str): Name of the reader the lines came from
+            lines (list): Tag report lines
+
+        Returns:
+            list: TagRead records
+        """
+
+        reader = self.readers[name]
+        reads = []
+        for line in lines:
+            match = ANTENNA_PATTERN.search(line)
+            antenna = int(match.group(1)) if match else None
+            reads.append(TagRead(name, antenna, reader.checkpoint(antenna), line))
+        return reads
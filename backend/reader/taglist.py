@@ -0,0 +1,100 @@
+# reader/taglist.py
+import re
+from collections import namedtuple
+from datetime import datetime
+
+TIMESTAMP = r'\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2}\.\d{3}'
+
+# Tag IDs never span lines, so the ID allows only spaces and tabs besides word characters
+TAG_PATTERN = re.compile(
+    rf'^[ \t]*Tag:([\w \t]+), Disc:({TIMESTAMP}), Last:({TIMESTAMP}), Count:(\d+), Ant:(\d+), Proto:(\d+)',
+    re.MULTILINE
+)
+
+TagRecord = namedtuple('TagRecord', ['tag_id', 'number', 'discovered', 'last_seen', 'count', 'antenna', 'protocol'])
+
+def parse_timestamp(value):
+    """
+    Parse an Alien reader timestamp.
+    The reader always sends the fixed format YYYY/MM/DD HH:MM:SS.mmm, so the
+    fields are sliced directly instead of going through strptime.
+
+    Args:
+        value (str): Timestamp string
+
+    Returns:
+        datetime: Parsed timestamp
+
+    Raises:
+        ValueError: If the timestamp is not a valid date and time
+    """
+
+    return datetime(
+        int(value[0:4]), int(value[5:7]), int(value[8:10]),
+        int(value[11:13]), int(value[14:16]), int(value[17:19]),
+        int(value[20:23]) * 1000
+    )
+
+def format_timestamp(value):
+    """
+    Format a datetime the way the Alien reader does.
+
+    Args:
+        value (datetime): Timestamp
+
+    Returns:
+        str: Timestamp string YYYY/MM/DD HH:MM:SS.mmm
+    """
+
+    return (f'{value.year:04d}/{value.month:02d}/{value.day:02d} '
+            f'{value.hour:02d}:{value.minute:02d}:{value.second:02d}.{value.microsecond // 1000:03d}')
+
+def _record(match):
+    tag_id, discovered, last_seen, count, antenna, protocol = match.groups()
+    tag_id = tag_id.strip()
+
+    number = tag_id.rsplit(None, 1)[-1] if tag_id else ''
+    try:
+        return TagRecord(
+            tag_id,
+            int(number) if number.isdigit() else None,
+            parse_timestamp(discovered),
+            parse_timestamp(last_seen),
+            int(count),
+            int(antenna),
+            int(protocol)
+        )
+    except ValueError:
+        return None
+
+def parse_line(line):
+    """
+    Parse one tag report line.
+
+    Args:
+        line (str): Tag report line
+
+    Returns:
+        TagRecord: Parsed read, None if the line is not a valid tag report.
+                   The number is None when the tag ID does not end with a bib number.
+    """
+
+    match = TAG_PATTERN.match(line)
+    return _record(match) if match else None
+
+def parse_taglist(data):
+    """
+    Parse a whole taglist buffer in one pass.
+    Lines that are not tag reports (headers, "(No Tags)", prompts) are skipped.
+
+    Args:
+        data (str): Raw taglist as returned by the reader
+
+    Yields:
+        TagRecord: Parsed reads in the order of the buffer
+    """
+
+    for match in TAG_PATTERN.finditer(data):
+        record = _record(match)
+        if record:
+            yield record
@@ -0,0 +1,50 @@
+# reader/terminal.py
+import socket
+import time
+
+class SocketTerminal:
+    """
+    Minimal replacement for telnetlib.Telnet on interpreters without telnetlib.
+    Provides only the calls AlienRFID uses: read_until, write and close.
+    """
+
+    def __init__(self, host, port, timeout=10):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.buffer = b''
+
+    def read_until(self, match, timeout=None):
+        """
+        Read until the given bytes are received or the timeout expires.
+
+        Args:
+            match (bytes): Expected byte sequence
+            timeout (float): Seconds to wait, None waits indefinitely
+
+        Returns:
+            bytes: Data read including the match, or whatever arrived before the timeout
+        """
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while match not in self.buffer:
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                break
+            self.sock.settimeout(remaining)
+            try:
+                chunk = self.sock.recv(4096)
+            except socket.timeout:
+                break
+            if not chunk:
+                break
+            self.buffer += chunk
+
+        index = self.buffer.find(match)
+        end = index + len(match) if index >= 0 else len(self.buffer)
+        data, self.buffer = self.buffer[:end], self.buffer[end:]
+        return data
+
+    def write(self, data):
+        self.sock.sendall(data)
+
+    def close(self):
+        self.sock.close()
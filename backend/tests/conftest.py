@@ -2,8 +2,10 @@ import os
 import sys
 import pytest
 import tempfile
+from contextlib import contextmanager
 from flask import Flask
-from datetime import datetime, timedelta
+from sqlalchemy import event, text
+from datetime import datetime, time, timedelta
 import configparser
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -17,16 +19,26 @@ from database.track import Track
 from database.category import Category
 from database.registration import Registration
 from database.backup import BackUpTag
+from reader.fake_reader import FakeAlienReader
+from timing.dedup import read_deduplicator
+from timing.race_state import race_state
+from timing.results_cache import results_cache
+from timing.live import live_results
+from timing.ranking import rankings
+from database.race_operations import forget_race_results, create_results_table
+from database.schema_upgrades import upgrade_schema
+from database.category_operations import assign_categories
+from database.lineup_operations import update_start_timestamps
 from werkzeug.security import generate_password_hash
 
-@pytest.fixture(scope='function')
-def app():
-    """Create and configure a Flask app for testing."""
+@contextmanager
+def _test_app(database_url):
+    """Create a Flask app for testing on the given database, config file mocked."""
     fd, temp_config_path = tempfile.mkstemp(suffix='.ini')
     test_config = configparser.ConfigParser()
 
     test_config['database'] = {
-        'DATABASE_URL': 'sqlite:///:memory:'
+        'DATABASE_URL': database_url
     }
 
     test_config['jwt'] = {
@@ -61,30 +73,133 @@ def app():
     original_read = configparser.ConfigParser.read
     configparser.ConfigParser.read = mock_read
 
-    app = create_app()
-    app.config.update({
-        'TESTING': True,
-        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
-        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
-        'WTF_CSRF_ENABLED': False
-    })
+    read_deduplicator.clear()
+    race_state.invalidate()
+    results_cache.reset()
+    live_results.reset()
+    rankings.reset()
+    forget_race_results()
 
-    with app.app_context():
-        db.create_all()
-        _init_test_data(db)
+    try:
+        app = create_app()
+        app.config.update({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': database_url,
+            'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+            'WTF_CSRF_ENABLED': False
+        })
         yield app
+    finally:
+        configparser.ConfigParser.read = original_read
+        os.unlink(temp_config_path)
 
-        db.session.remove()
-        db.drop_all()
+@pytest.fixture(scope='function')
+def app():
+    """Create and configure a Flask app for testing."""
+    with _test_app('sqlite:///:memory:') as app:
+        with app.app_context():
+            db.create_all()
+            _init_test_data(db)
+            yield app
 
-    configparser.ConfigParser.read = original_read
-    os.unlink(temp_config_path)
+            db.session.remove()
+            db.drop_all()
+
+@pytest.fixture(scope='function')
+def postgresql_app():
+    """
+    Flask app on a scratch PostgreSQL database given by TEST_POSTGRESQL_URL,
+    for code paths that only run on PostgreSQL. Skipped when not set.
+    The database is emptied before and after the test.
+    """
+    database_url = os.environ.get('TEST_POSTGRESQL_URL')
+    if not database_url:
+        pytest.skip('TEST_POSTGRESQL_URL not set')
+
+    with _test_app(database_url) as app:
+        with app.app_context():
+            db.drop_all()
+            create_results_table()
+            db.create_all()
+            # Indexes of the partitioned race_results, as init_db() creates them
+            upgrade_schema()
+            yield app
+
+            db.session.remove()
+            db.drop_all()
 
 @pytest.fixture
 def client(app):
     """A test client for the app."""
     return app.test_client()
 
+@pytest.fixture
+def statements(app):
+    """
+    SQL statements executed during the test, for tests of query counts.
+    Clear the list before the part being measured.
+    """
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+@pytest.fixture
+def fake_reader():
+    """Simulated Alien reader listening on a free local port."""
+    reader = FakeAlienReader()
+    reader.start()
+    yield reader
+    reader.stop()
+
+@pytest.fixture
+def race_start():
+    """Start of the test track's race used by add_lap."""
+    return datetime.combine(datetime.now().date(), time(10, 0, 0))
+
+@pytest.fixture
+def add_runner(app):
+    """
+    Register runners for race 240401 on track 24040101, with categories and
+    start instants resolved. Call as add_runner(number, gender='M', year=1990).
+    """
+
+    def add(number, gender='M', year=1990):
+        user = Users(firstname=f'Runner{number}', surname='Test', year=year, club='Test Club',
+                     email=f'runner{number}@example.com', gender=gender)
+        db.session.add(user)
+        db.session.flush()
+        registration = Registration(user_id=user.id, track_id=24040101, race_id=240401,
+                                    registration_time=time(9, 0), user_start_time=time(0, 0, 0), number=number)
+        db.session.add(registration)
+        db.session.flush()
+        assign_categories(240401)
+        update_start_timestamps(240401)
+        return registration
+
+    return add
+
+@pytest.fixture
+def add_lap(app, race_start):
+    """
+    Store laps of race 240401 on track 24040101 directly in race_results.
+    Call as add_lap(number, minutes, lap_number=1, status=None), minutes
+    counting from race_start.
+    """
+
+    def add(number, minutes, lap_number=1, status=None):
+        timestamp = race_start + timedelta(minutes=minutes)
+        db.session.execute(text('''
+            INSERT INTO race_results (race_id, number, tag_id, track_id, timestamp, last_seen_time, lap_number, status)
+            VALUES (240401, :number, 'tag', 24040101, :timestamp, :timestamp, :lap_number, :status)
+        '''), {'number': number, 'timestamp': timestamp, 'lap_number': lap_number, 'status': status})
+
+    return add
+
 @pytest.fixture
 def auth_headers(client):
     """Get authentication headers."""
@@ -116,20 +231,6 @@ def _init_test_data(db):
     db.session.add(test_race)
     db.session.flush()
 
-    from sqlalchemy import text
-    db.session.execute(text(f'''
-        CREATE TABLE race_results_{test_race.id} (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            number INTEGER NOT NULL,
-            tag_id VARCHAR(255) NOT NULL,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            lap_number INTEGER DEFAULT 1,
-            track_id INTEGER NOT NULL,
-            last_seen_time TIMESTAMP,
-            status VARCHAR(5)
-        )
-    '''))
-
     test_track = Track(
         id=24040101,
         name='Test Track',
@@ -185,7 +286,9 @@ def _init_test_data(db):
         race_id=test_race.id,
         registration_time=datetime.now().time(),
         user_start_time=datetime.strptime('00:00:00', '%H:%M:%S').time(),
-        number=1
+        number=1,
+        category_id=test_category_m.id,
+        start_timestamp=datetime.combine(race_date, test_track.actual_start_time)
     )
     db.session.add(test_registration)
 
@@ -0,0 +1,74 @@
+import pytest
+import asyncio
+from reader.aio_client import AsyncAlienClient
+from reader.fake_reader import format_tag_line
+
+def test_connect_and_command(fake_reader):
+    """Test přihlášení a příkazu přes asyncio klienta."""
+    async def run():
+        client = AsyncAlienClient(*fake_reader.address)
+        await client.connect()
+        response = await client.command('get NotifyMode')
+        await client.disconnect()
+        return client, response
+
+    client, response = asyncio.run(run())
+
+    assert 'NotifyMode = Off' in response
+    assert not client.connected
+
+def test_taglist_stream(fake_reader):
+    """Test průběžného čtení taglistu."""
+    fake_reader.taglist = [format_tag_line(1), format_tag_line(2)]
+
+    async def run():
+        client = AsyncAlienClient(*fake_reader.address)
+        await client.connect()
+        batches = []
+        async for lines in client.stream(interval=0):
+            batches.append(lines)
+            if len(batches) == 2:
+                break
+        await client.disconnect()
+        return batches
+
+    batches = asyncio.run(run())
+
+    assert len(batches) == 2
+    assert all(len(lines) == 2 for lines in batches)
+
+def test_rejected_login(fake_reader):
+    """Test odmítnutého přihlášení."""
+    async def run():
+        client = AsyncAlienClient(*fake_reader.address, password='wrong')
+        await client.connect()
+
+    with pytest.raises(ConnectionError, match='rejected the login'):
+        asyncio.run(run())
+
+def test_escaped_iac_split_across_reads():
+    """Test dekódování zdvojeného IAC jen jednou, i když zbytek odpovědi přijde později."""
+    async def run():
+        client = AsyncAlienClient('127.0.0.1', 0)
+        client.reader = asyncio.StreamReader()
+        client.reader.feed_data(b'value \xff\xff')
+        response = asyncio.ensure_future(client._read_until(b'>', 1))
+        await asyncio.sleep(0.05)
+        client.reader.feed_data(b'more>')
+        return await response
+
+    assert asyncio.run(run()) == b'value \xffmore>'
+
+def test_command_timeout():
+    """Test vypršení času u neodpovídající čtečky."""
+    async def run():
+        server = await asyncio.start_server(lambda reader, writer: None, '127.0.0.1', 0)
+        host, port = server.sockets[0].getsockname()[:2]
+        client = AsyncAlienClient(host, port, connect_timeout=0.2)
+        try:
+            await client.connect()
+        finally:
+            server.close()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
@@ -0,0 +1,73 @@
+from datetime import datetime
+from sqlalchemy import text, inspect
+from extensions import db
+from database.backup import BackUpTag
+from database.backup_operations import insert_tags, TagArchive
+from database.schema_upgrades import upgrade_schema
+from reader.taglist import parse_taglist
+from reader.fake_reader import format_tag_line
+
+def _records(numbers, antenna=0):
+    seen = datetime(2024, 4, 1, 10, 30)
+    return list(parse_taglist('\n'.join(format_tag_line(number, seen, count=3, antenna=antenna) for number in numbers)))
+
+def test_insert_tags_bulk(app):
+    """Test hromadného uložení čtení do archivu."""
+    assert insert_tags(_records(range(1, 11), antenna=2)) == 10
+
+    tags = BackUpTag.query.filter(BackUpTag.antenna == 2).all()
+    assert len(tags) == 10
+    assert tags[0].count == 3
+    assert tags[0].protocol == 2
+    assert tags[0].last_seen_time == '2024/04/01 10:30:00.000'
+
+def test_archive_flush(app):
+    """Test zápisu čtení z bufferu archivu."""
+    archive = TagArchive(batch_size=4)
+    archive.init_app(app)
+    archive.buffer.extend(_records(range(1, 11)))
+
+    assert archive.flush() == 10
+    assert archive.stats() == {'queued': 0, 'stored': 10, 'dropped': 0}
+
+def test_archive_buffer_is_bounded(app):
+    """Test omezení velikosti bufferu archivu."""
+    archive = TagArchive(max_size=5, batch_size=100, flush_interval=60)
+    archive.init_app(app)
+    archive._ensure_worker = lambda: None
+
+    archive.submit(_records(range(1, 9)))
+
+    stats = archive.stats()
+    assert stats['queued'] == 5
+    assert stats['dropped'] == 3
+    assert archive.buffer[0].number == 4
+
+def test_get_tags_returns_archived_fields(client, app):
+    """Test vrácení počtu čtení, antény a protokolu endpointem /tags."""
+    insert_tags(_records([7], antenna=1))
+
+    response = client.get('/api/tags')
+    tag = [tag for tag in response.json['tags'] if tag['number'] == 7][0]
+
+    assert response.status_code == 200
+    assert (tag['count'], tag['antenna'], tag['protocol']) == (3, 1, 2)
+
+def test_upgrade_schema_adds_columns(app):
+    """Test doplnění nových sloupců do existující tabulky archivu."""
+    db.session.execute(text('DROP TABLE back_up_tag'))
+    db.session.execute(text('''
+        CREATE TABLE back_up_tag (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            number INTEGER NOT NULL,
+            tag_id VARCHAR(50) NOT NULL,
+            last_seen_time VARCHAR(25) NOT NULL
+        )
+    '''))
+    db.session.commit()
+
+    upgrade_schema()
+    upgrade_schema()
+
+    columns = {column['name'] for column in inspect(db.engine).get_columns('back_up_tag')}
+    assert {'count', 'antenna', 'protocol'} <= columns
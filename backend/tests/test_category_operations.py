@@ -0,0 +1,103 @@
+import json
+from sqlalchemy import text
+from datetime import date, time
+from extensions import db
+from database.race import Race
+from database.user import Users
+from database.category import Category
+from database.registration import Registration
+from database.category_operations import assign_categories, assign_missing_categories
+from database.schema_upgrades import upgrade_schema
+
+def _add_registration(year, number, gender='M'):
+    user = Users(firstname=f'Runner{number}', surname='Test', year=year, club='Test Club',
+                 email=f'runner{number}@example.com', gender=gender)
+    db.session.add(user)
+    db.session.flush()
+    registration = Registration(user_id=user.id, track_id=24040101, race_id=240401,
+                                registration_time=time(9, 0), number=number)
+    db.session.add(registration)
+    db.session.flush()
+    return registration
+
+def _category_name(registration):
+    category = db.session.get(Category, registration.category_id) if registration.category_id else None
+    return category.category_name if category else None
+
+def test_registration_stores_category(client):
+    """Test uložení kategorie při registraci."""
+    response = client.post('/api/registration', json={
+        'firstname': 'Alice', 'surname': 'Smith', 'year': 1995, 'club': 'Running Club',
+        'email': 'alice@example.com', 'gender': 'F', 'race_id': 240401, 'track_id': 24040101
+    })
+
+    registration = db.session.get(Registration, json.loads(response.data)['registration_id'])
+    assert _category_name(registration) == 'F18-45'
+
+def test_category_pinned_to_race_year(app):
+    """Test určení kategorie podle věku v roce závodu."""
+    race = db.session.get(Race, 240401)
+    registration = _add_registration(race.date.year - 44, 2)
+
+    assign_categories(240401)
+    assert _category_name(registration) == 'M18-45'
+
+    # Two years later the runner is 46 and out of M18-45
+    race.date = date(race.date.year + 2, 1, 1)
+    assert assign_categories(240401) == 1
+    assert registration.category_id is None
+
+def test_missing_categories_assigned(app):
+    """Test doplnění kategorií u dříve uložených registrací."""
+    registration = _add_registration(1990, 3)
+    db.session.commit()
+
+    assert registration.category_id is None
+    assert assign_missing_categories() == 1
+    assert _category_name(registration) == 'M18-45'
+
+def test_upgrade_schema_assigns_categories_once(app):
+    """Test doplnění kategorií jen při přidání jejich sloupce."""
+    registration_id = _add_registration(1990, 3).id
+    db.session.commit()
+
+    upgrade_schema()
+    assert db.session.get(Registration, registration_id).category_id is None
+
+    # Registrations of a release before categories
+    db.session.execute(text('ALTER TABLE registration RENAME TO registration_current'))
+    db.session.execute(text('''
+        CREATE TABLE registration (
+            id INTEGER PRIMARY KEY,
+            track_id INTEGER NOT NULL REFERENCES track(id),
+            user_id INTEGER NOT NULL REFERENCES users(id),
+            race_id INTEGER NOT NULL REFERENCES race(id),
+            registration_time TIME NOT NULL,
+            user_start_time TIME,
+            number INTEGER,
+            start_timestamp DATETIME
+        )
+    '''))
+    db.session.execute(text('''
+        INSERT INTO registration
+        SELECT id, track_id, user_id, race_id, registration_time, user_start_time, number, start_timestamp
+        FROM registration_current
+    '''))
+    db.session.execute(text('DROP TABLE registration_current'))
+    db.session.commit()
+    db.session.expunge_all()
+
+    upgrade_schema()
+    assert _category_name(db.session.get(Registration, registration_id)) == 'M18-45'
+
+def test_confirm_lineup_resolves_categories(client, auth_headers):
+    """Test určení kategorií při potvrzení startovního pořadí."""
+    registration = _add_registration(1990, None, gender='F')
+    db.session.commit()
+
+    response = client.post('/api/confirm_lineup', json={'race_id': 240401}, headers=auth_headers)
+
+    assert response.status_code == 200
+    registration = db.session.get(Registration, registration.id)
+    assert _category_name(registration) == 'F18-45'
+    assert registration.number == 51
@@ -0,0 +1,95 @@
+import json
+from datetime import datetime, timedelta
+from extensions import db
+from database.track import Track
+from timing.dedup import ReadDeduplicator
+from reader.fake_reader import format_tag_line
+
+def test_filter_drops_repeated_reads():
+    """Test zahození opakovaně hlášeného čtení."""
+    dedup = ReadDeduplicator()
+    seen = datetime(2024, 4, 1, 10, 30)
+    lines = [format_tag_line(1, seen), format_tag_line(2, seen)]
+
+    assert dedup.filter(1, 10, lines) == (lines, 0)
+    dedup.record(1, 10, lines)
+    assert dedup.filter(1, 10, lines) == ([], 2)
+    assert dedup.get_stats(1) == {'processed': 2, 'dropped': 2}
+
+def test_filter_keeps_unrecorded_reads():
+    """Test opětovného propuštění čtení, jejichž uložení selhalo."""
+    dedup = ReadDeduplicator()
+    seen = datetime(2024, 4, 1, 10, 30)
+    lines = [format_tag_line(1, seen), format_tag_line(1, seen)]
+
+    assert dedup.filter(1, 10, lines) == (lines[:1], 1)
+    assert dedup.filter(1, 10, lines) == (lines[:1], 1)
+    assert dedup.get_stats(1) == {'processed': 0, 'dropped': 2}
+
+def test_filter_keeps_newer_reads():
+    """Test propuštění čtení s novějším časem."""
+    dedup = ReadDeduplicator()
+    seen = datetime(2024, 4, 1, 10, 30)
+    dedup.record(1, 10, [format_tag_line(1, seen)])
+
+    newer = format_tag_line(1, seen + timedelta(seconds=1))
+    assert dedup.filter(1, 10, [newer]) == ([newer], 0)
+
+def test_filter_scopes_are_separate():
+    """Test oddělení tratí a závodů."""
+    dedup = ReadDeduplicator()
+    lines = [format_tag_line(1, datetime(2024, 4, 1, 10, 30))]
+    dedup.record(1, 10, lines)
+
+    assert dedup.filter(1, 11, lines) == (lines, 0)
+    assert dedup.filter(2, 10, lines) == (lines, 0)
+    dedup.record(2, 10, lines)
+
+    dedup.clear(1)
+    assert dedup.filter(1, 10, lines) == (lines, 0)
+    assert dedup.get_stats(2) == {'processed': 1, 'dropped': 0}
+
+def test_store_results_reports_dropped_reads(client, auth_headers):
+    """Test hlášení zahozených čtení endpointem store_results."""
+    payload = {
+        'tags': [format_tag_line(1), format_tag_line(2)],
+        'race_id': 240401,
+        'track_id': 24040101
+    }
+
+    first = client.post('/api/store_results', json=payload, headers=auth_headers)
+    second = client.post('/api/store_results', json=payload, headers=auth_headers)
+
+    assert first.status_code == 200
+    assert json.loads(first.data)['reads_processed'] == 2
+    data = json.loads(second.data)
+    assert data['reads_processed'] == 0
+    assert data['reads_dropped'] == 2
+
+    response = client.get('/api/race/240401/ingestion_stats')
+    stats = json.loads(response.data)
+    assert stats['reads_processed'] == 2
+    assert stats['reads_dropped'] == 2
+    assert stats['drop_ratio'] == 0.5
+
+def test_store_results_retries_failed_reads(client, auth_headers):
+    """Test zpracování čtení, jejichž uložení selhalo, v další dávce."""
+    payload = {
+        'tags': [format_tag_line(1), format_tag_line(2)],
+        'race_id': 240401,
+        'track_id': 24040101
+    }
+    track = db.session.get(Track, 24040101)
+    start_time, track.actual_start_time = track.actual_start_time, None
+    db.session.commit()
+
+    failed = client.post('/api/store_results', json=payload, headers=auth_headers)
+    assert failed.status_code == 400
+
+    track = db.session.get(Track, 24040101)
+    track.actual_start_time = start_time
+    db.session.commit()
+
+    response = client.post('/api/store_results', json=payload, headers=auth_headers)
+    assert response.status_code == 200
+    assert json.loads(response.data)['reads_processed'] == 2
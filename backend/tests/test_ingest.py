@@ -0,0 +1,165 @@
+import asyncio
+import configparser
+import socket
+from unittest.mock import patch
+from ingest import TaglistIngestor
+from reader.registry import ReaderRegistry, ReaderConfig
+from reader.fake_reader import format_tag_line
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _registry(*readers):
+    return ReaderRegistry(list(readers), timeout=1.0)
+
+def test_registry_from_config():
+    """Test načtení více čteček z konfigurace."""
+    config = configparser.ConfigParser()
+    config.read_dict({
+        'alien_rfid': {'hostname': '10.0.0.1', 'port': '23'},
+        'ingestion': {'race_id': '240401', 'mode': 'poll'},
+        'reader finish': {'hostname': '10.0.0.2', 'antennas': '0:finish, 2:checkpoint'},
+        'reader split': {'hostname': '10.0.0.3', 'track_ids': '24040101', 'default_checkpoint': 'split'}
+    })
+
+    registry = ReaderRegistry.from_config(config)
+
+    assert len(registry) == 2
+    finish = registry.get('finish')
+    assert finish.race_id == 240401
+    assert finish.checkpoint(2) == 'checkpoint'
+    assert finish.checkpoint(1) == 'finish'
+    assert registry.get('split').track_ids == [24040101]
+
+def test_registry_falls_back_to_single_reader():
+    """Test použití čtečky [alien_rfid] bez dalších čteček."""
+    config = configparser.ConfigParser()
+    config.read_dict({'alien_rfid': {'hostname': '10.0.0.1', 'port': '23'}})
+
+    registry = ReaderRegistry.from_config(config)
+
+    assert [reader.name for reader in registry] == ['default']
+
+def test_route_tags_reads_with_antenna():
+    """Test přiřazení čtení k čtečce, anténě a kontrolnímu bodu."""
+    registry = _registry(ReaderConfig('mat', 'localhost', 23, antennas={2: 'checkpoint'}))
+
+    reads = registry.route('mat', [format_tag_line(1, antenna=0), format_tag_line(2, antenna=2)])
+
+    assert [(read.reader, read.antenna, read.checkpoint) for read in reads] == [
+        ('mat', 0, 'finish'),
+        ('mat', 2, 'checkpoint')
+    ]
+
+def test_poll_once_connects_and_queues(app, fake_reader):
+    """Test načtení taglistu ze čtečky do fronty."""
+    line = format_tag_line(1)
+    fake_reader.taglist = [line]
+    reader = ReaderConfig('finish', *fake_reader.address)
+    ingestor = TaglistIngestor(app, _registry(reader))
+
+    async def poll():
+        ingestor.prepare()
+        await ingestor.poll_once(reader)
+        await ingestor.registry.disconnect_all()
+        return ingestor.taglists.get_nowait()
+
+    reads = asyncio.run(poll())
+
+    assert 'get Taglist' in fake_reader.commands
+    assert [read.line for read in reads] == [line]
+    assert reads[0].reader == 'finish'
+
+def test_full_queue_skips_poll(app):
+    """Test vynechání čtení při plné frontě."""
+    ingestor = TaglistIngestor(app, _registry(), queue_size=1)
+
+    async def enqueue():
+        ingestor.prepare()
+        ingestor._enqueue(['first'])
+        ingestor._enqueue(['second'])
+        return ingestor.taglists.get_nowait()
+
+    assert asyncio.run(enqueue()) == ['first']
+    assert ingestor.skipped_polls == 1
+
+def test_process_stores_only_finish_reads(app):
+    """Test zpracování pouze čtení z cílové antény."""
+    registry = _registry(ReaderConfig('mat', 'localhost', 23, race_id=240401, antennas={2: 'checkpoint'}))
+    ingestor = TaglistIngestor(app, registry)
+    reads = registry.route('mat', [format_tag_line(1, antenna=0), format_tag_line(2, antenna=2)])
+
+    with patch('ingest.tag_archive') as mock_archive, \
+         patch('ingest.store_tag_results', return_value=(1, ['EPC 0000 1'])) as mock_store:
+        stored = ingestor.process(reads)
+
+    assert len(list(mock_archive.submit.call_args[0][0])) == 2
+    assert stored == 1
+    race_id, track, lines = mock_store.call_args[0]
+    assert race_id == 240401
+    assert track.id == 24040101
+    assert lines == [reads[0].line]
+
+def test_slow_reader_does_not_delay_others(app, fake_reader):
+    """Test nezávislosti čteček - pomalá čtečka nezdrží ostatní."""
+    fake_reader.taglist = [format_tag_line(5)]
+    processed = []
+
+    async def run():
+        silent = await asyncio.start_server(lambda reader, writer: None, '127.0.0.1', 0)
+        host, port = silent.sockets[0].getsockname()[:2]
+        registry = _registry(
+            ReaderConfig('slow', host, port),
+            ReaderConfig('finish', *fake_reader.address)
+        )
+        ingestor = TaglistIngestor(app, registry, reconnect_delay=0.1)
+
+        def process(reads):
+            processed.extend(reads)
+            ingestor.stop()
+            return 0
+
+        with patch.object(ingestor, 'process', side_effect=process):
+            await asyncio.wait_for(ingestor.serve(), timeout=2)
+        silent.close()
+
+    asyncio.run(run())
+
+    assert processed and all(read.reader == 'finish' for read in processed)
+
+def test_notify_mode_processes_pushed_reads(app, fake_reader):
+    """Test zpracování tagů odeslaných čtečkou v notify režimu."""
+    port = _free_port()
+    reader = ReaderConfig(
+        'finish',
+        *fake_reader.address,
+        mode='notify',
+        notify_address=f'127.0.0.1:{port}',
+        listen_port=port
+    )
+    ingestor = TaglistIngestor(app, _registry(reader), listen_host='127.0.0.1', reconnect_delay=0.1)
+    processed = []
+
+    def process(reads):
+        processed.extend(reads)
+        ingestor.stop()
+        return len(reads)
+
+    async def run():
+        task = asyncio.create_task(ingestor.serve())
+        for _ in range(50):
+            if fake_reader.settings.get('NotifyMode') == 'On':
+                break
+            await asyncio.sleep(0.05)
+        await asyncio.get_running_loop().run_in_executor(None, fake_reader.see, [format_tag_line(3)])
+        await asyncio.wait_for(task, timeout=5)
+
+    with patch.object(ingestor, 'process', side_effect=process):
+        asyncio.run(run())
+
+    assert fake_reader.settings['NotifyAddress'] == f'127.0.0.1:{port}'
+    assert len(processed) == 1
+    assert processed[0].line.startswith('Tag:EPC 0000 3,')
+    assert processed[0].reader == 'finish'
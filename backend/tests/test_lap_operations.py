@@ -0,0 +1,150 @@
+import json
+import pytest
+from datetime import time
+from sqlalchemy import text
+from extensions import db
+from database.track import Track
+from database.lap_operations import get_lap_splits, format_lap, update_lap_times
+from database.results_queries import bump_results_generation
+from database.standings_operations import refresh_standings
+from database.race_standing import RaceStanding
+
+@pytest.fixture
+def lap_race(add_runner, add_lap):
+    """Three-lap race: runner 1 with three laps, 2 with two and 3 with one."""
+    track = db.session.get(Track, 24040101)
+    track.number_of_laps = 3
+    track.actual_start_time = time(10, 0, 0)
+    add_runner(2)
+    add_runner(3, 'F')
+    for lap_number, minutes in enumerate((15, 31, 46), start=1):
+        add_lap(1, minutes, lap_number)
+    for lap_number, minutes in enumerate((14, 30), start=1):
+        add_lap(2, minutes, lap_number)
+    add_lap(3, 17, 1)
+    update_lap_times(240401)
+    bump_results_generation(240401)
+    db.session.commit()
+
+def test_get_lap_splits(lap_race, statements):
+    """Test výpočtu časů kol všech běžců jedním dotazem."""
+    statements.clear()
+    splits = get_lap_splits(240401)
+
+    assert len(statements) == 1
+    assert sorted(splits) == [1, 2, 3]
+    assert [format_lap(lap) for lap in splits[1]] == [
+        {'lap_number': 1, 'timestamp': '10:15:00', 'lap_time': '00:15:00.000', 'total_time': '00:15:00.000'},
+        {'lap_number': 2, 'timestamp': '10:31:00', 'lap_time': '00:16:00.000', 'total_time': '00:31:00.000'},
+        {'lap_number': 3, 'timestamp': '10:46:00', 'lap_time': '00:15:00.000', 'total_time': '00:46:00.000'}
+    ]
+    assert [lap['lap_time'] for lap in splits[2]] == [14 * 60000, 16 * 60000]
+
+def test_get_lap_splits_filters(lap_race):
+    """Test omezení časů kol na trať, kategorii a běžce."""
+    assert sorted(get_lap_splits(240401, track_id=24040101)) == [1, 2, 3]
+    assert get_lap_splits(240401, track_id=24040102) == {}
+    assert sorted(get_lap_splits(240401, category='F18-45')) == [3]
+    assert sorted(get_lap_splits(240401, number=2)) == [2]
+
+def test_race_laps_endpoint(client, lap_race):
+    """Test hromadného endpointu časů kol závodu."""
+    response = client.get('/api/race/240401/laps')
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['columns'] == ['lap_number', 'timestamp', 'lap_time', 'total_time']
+    assert data['laps']['2'] == [[1, '10:14:00', '00:14:00.000', '00:14:00.000'],
+                                 [2, '10:30:00', '00:16:00.000', '00:30:00.000']]
+
+    by_category = json.loads(client.get('/api/race/240401/category/F18-45/laps').data)
+    assert list(by_category['laps']) == ['3']
+
+    by_track = json.loads(client.get('/api/race/240401/track/24040101/laps').data)
+    assert by_track['laps'] == data['laps']
+
+    assert client.get('/api/race/777777/laps').status_code == 404
+
+def test_runner_laps_match_race_laps(client, lap_race):
+    """Test shody časů kol jednoho běžce s hromadným endpointem."""
+    race_laps = json.loads(client.get('/api/race/240401/laps').data)
+    runner_laps = json.loads(client.get('/api/race/240401/racer/1/laps').data)['laps']
+
+    assert [[lap[column] for column in race_laps['columns']] for lap in runner_laps] == race_laps['laps']['1']
+    assert client.get('/api/race/240401/racer/99/laps').status_code == 404
+
+def _runner_laps(number):
+    rows = db.session.execute(text('''
+        SELECT lap_number, timestamp, last_seen_time FROM race_results
+        WHERE race_id = 240401 AND number = :number ORDER BY lap_number
+    '''), {'number': number}).fetchall()
+    return [(row.lap_number, str(row.timestamp)[11:19], str(row.last_seen_time)[11:19]) for row in rows]
+
+def test_delete_lap_renumbers_following_laps(client, auth_headers, lap_race):
+    """Test přečíslování následujících kol po smazání kola."""
+    response = client.post('/api/race/240401/lap/delete', json={'number': 1, 'lap_number': 2}, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert _runner_laps(1) == [(1, '10:15:00', '10:15:00'), (2, '10:46:00', '10:46:00')]
+    laps = get_lap_splits(240401, number=1)[1]
+    assert [lap['lap_time'] for lap in laps] == [15 * 60000, 31 * 60000]
+
+def test_update_lap_time_keeps_other_laps(client, auth_headers, lap_race):
+    """Test změny času kola bez posunu ostatních průchodů."""
+    response = client.post('/api/race/240401/lap/update', json={
+        'number': 1, 'lap_number': 2, 'lap_time': '00:20:00'
+    }, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert json.loads(response.data)['new_timestamp'] == '10:35:00.000'
+    assert [lap[:2] for lap in _runner_laps(1)] == [(1, '10:15:00'), (2, '10:35:00'), (3, '10:46:00')]
+
+def test_update_lap_time_past_next_lap_renumbers(client, auth_headers, lap_race):
+    """Test přečíslování kol, když opravený průchod předběhne další."""
+    response = client.post('/api/race/240401/lap/update', json={
+        'number': 1, 'lap_number': 1, 'timestamp': '10:40:00'
+    }, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert [lap[:2] for lap in _runner_laps(1)] == [(1, '10:31:00'), (2, '10:40:00'), (3, '10:46:00')]
+
+def test_add_manual_lap_between_laps(client, auth_headers, lap_race):
+    """Test vložení chybějícího kola mezi zaznamenaná kola."""
+    response = client.post('/api/race/240401/lap/add', json={
+        'number': 2, 'track_id': 24040101, 'lap_number': 2, 'time': '00:08:00'
+    }, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert [lap[:2] for lap in _runner_laps(2)] == [(1, '10:14:00'), (2, '10:22:00'), (3, '10:30:00')]
+
+def test_lap_edits_constant_statements(client, auth_headers, lap_race, add_runner, add_lap, statements):
+    """Test konstantního počtu dotazů úprav kol nezávisle na počtu kol."""
+    add_runner(4)
+    add_lap(4, 20, 1)
+    for lap_number in range(2, 21):
+        add_lap(3, 17 + lap_number, lap_number)
+    db.session.commit()
+
+    def count(number, lap_number):
+        statements.clear()
+        response = client.post('/api/race/240401/lap/delete', json={'number': number, 'lap_number': lap_number},
+                               headers=auth_headers)
+        assert response.status_code == 200
+        return len([statement for statement in statements if 'race_results' in statement])
+
+    assert count(3, 2) == count(4, 1)
+
+def test_track_start_change_updates_lap_times(client, auth_headers, lap_race):
+    """Test přepočtu uložených časů po změně startu trati."""
+    refresh_standings(240401)
+    db.session.commit()
+
+    response = client.post('/api/set_track_start_time', json={
+        'race_id': 240401, 'track_id': 24040101, 'start_time': '10:05'
+    }, headers=auth_headers)
+    assert response.status_code == 200
+
+    laps = get_lap_splits(240401, number=1)[1]
+    assert [lap['lap_time'] for lap in laps] == [10 * 60000, 16 * 60000, 15 * 60000]
+    assert laps[-1]['total_time'] == 41 * 60000
+    assert db.session.get(RaceStanding, (240401, 1)).race_time_ms == 41 * 60000
@@ -0,0 +1,137 @@
+import json
+from datetime import timedelta
+from sqlalchemy import text
+from extensions import db
+from database.track import Track
+from database.lap_operations import update_lap_times
+from database.standings_operations import refresh_standings
+from database.results_queries import bump_results_generation
+from timing.live import live_results, Subscriber
+
+def _watch(race_id):
+    # Registered without starting the worker threads, changes are dispatched by the test
+    subscriber = Subscriber(race_id)
+    live_results.subscribers[race_id].add(subscriber)
+    return subscriber
+
+def _pending_changes():
+    changes = []
+    while not live_results.changes.empty():
+        changes.append(live_results.changes.get_nowait())
+    return changes
+
+def test_change_published_after_commit(app, add_lap):
+    """Test předání změny pořadí až po potvrzení transakce."""
+    _watch(240401)
+    add_lap(1, 50)
+    update_lap_times(240401)
+    refresh_standings(240401, [1])
+
+    assert _pending_changes() == []
+
+    db.session.commit()
+
+    assert _pending_changes() == [(240401, {1})]
+
+def test_change_dropped_on_rollback(app, add_lap):
+    """Test zahození změny pořadí při odvolání transakce."""
+    _watch(240401)
+    add_lap(1, 50)
+    update_lap_times(240401)
+    refresh_standings(240401, [1])
+    db.session.rollback()
+    db.session.commit()
+
+    assert _pending_changes() == []
+
+def test_unwatched_race_not_ranked(app, add_lap):
+    """Test, že se změny nesledovaného závodu nezpracovávají."""
+    add_lap(1, 50)
+    update_lap_times(240401)
+    refresh_standings(240401, [1])
+    db.session.commit()
+
+    assert _pending_changes() == []
+
+def test_deltas_of_changed_and_moved_runners(app, add_runner, add_lap, race_start):
+    """Test rozdílů pro změněné závodníky a závodníky s novou pozicí."""
+    track = db.session.get(Track, 24040101)
+    track.number_of_laps = 1
+    add_runner(2)
+    add_runner(3)
+    add_lap(1, 50)
+    add_lap(2, 55)
+    add_lap(3, 60)
+    update_lap_times(240401)
+    refresh_standings(240401)
+    db.session.commit()
+
+    subscriber = _watch(240401)
+    live_results.dispatch(240401, {None})
+    first = subscriber.events.get_nowait()
+    assert first[0] == 'standings'
+    assert len(first[1]['deltas']) == 3
+
+    # Runner 3 re-timed ahead of everybody: 3 changed, 1 and 2 moved
+    db.session.execute(text('UPDATE race_results SET timestamp = :timestamp WHERE race_id = 240401 AND number = 3'),
+                       {'timestamp': race_start + timedelta(minutes=40)})
+    update_lap_times(240401)
+    refresh_standings(240401, [3])
+    bump_results_generation(240401)
+    db.session.commit()
+    live_results.dispatch(240401, {3})
+
+    name, data = subscriber.events.get_nowait()
+    deltas = {delta['number']: delta for delta in data['deltas']}
+    assert set(deltas) == {1, 2, 3}
+    assert deltas[3]['position_track'] == '1'
+    assert deltas[3]['race_time'] == '00:40:00.000'
+    assert deltas[3]['lap'] == 1
+
+    # Nothing moved apart from the written runner
+    add_lap(2, 70, lap_number=2)
+    update_lap_times(240401)
+    refresh_standings(240401, [2])
+    bump_results_generation(240401)
+    db.session.commit()
+    live_results.dispatch(240401, {2})
+
+    name, data = subscriber.events.get_nowait()
+    assert [delta['number'] for delta in data['deltas']] == [2]
+
+def test_lagging_subscriber_resyncs(app):
+    """Test požadavku na znovunačtení u pomalého odběratele."""
+    subscriber = Subscriber(240401, max_events=2)
+    for _ in range(3):
+        subscriber.send('standings', {'race_id': 240401, 'deltas': []})
+
+    assert subscriber.events.get_nowait()[0] == 'resync'
+    assert subscriber.events.empty()
+
+def test_live_stream_endpoint(client):
+    """Test otevření proudu živých výsledků."""
+    response = client.get('/api/race/240401/live')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    first = next(response.response).decode()
+    assert first.startswith('event: ready')
+    assert json.loads(first.split('data: ')[1]) == {'race_id': 240401}
+    response.close()
+
+def test_positions_dropped_after_viewers_left(app, add_lap):
+    """Test nezapamatování pořadí závodu, který už nikdo nesleduje."""
+    add_lap(1, 50)
+    update_lap_times(240401)
+    refresh_standings(240401)
+    db.session.commit()
+    # Watched after the commit, nothing is queued for a dispatcher of an earlier test
+    subscriber = _watch(240401)
+
+    live_results.deltas(240401, {None})
+    assert 1 in live_results.positions[240401]
+
+    live_results.unsubscribe(subscriber)
+    live_results.deltas(240401, {None})
+    assert 240401 not in live_results.positions
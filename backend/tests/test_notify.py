@@ -0,0 +1,55 @@
+import asyncio
+from reader.aio_client import AsyncAlienClient, serve_notifications
+from reader.notify import NotificationBuffer
+from reader.fake_reader import format_tag_line
+
+def test_notification_buffer_split_message():
+    """Test složení notifikace přijaté po částech."""
+    message = (
+        "#Alien RFID Reader Auto Notification Message\r\n"
+        "#Reason: TAGS ADDED\r\n"
+        f"{format_tag_line(1)}\r\n"
+        f"{format_tag_line(2)}\r\n"
+        "#End of Notification Message\r\n\0"
+    ).encode('ascii')
+
+    buffer = NotificationBuffer()
+    assert buffer.feed(message[:40]) == []
+    lines = buffer.feed(message[40:])
+
+    assert len(lines) == 2
+    assert lines[0].startswith('Tag:EPC 0000 1,')
+
+def test_enable_notify_configures_reader(fake_reader):
+    """Test nastavení notify režimu čtečky."""
+    async def run():
+        client = AsyncAlienClient(*fake_reader.address)
+        await client.connect()
+        await client.enable_notify('127.0.0.1:4000', persist_time=5)
+        await client.disconnect()
+
+    asyncio.run(run())
+
+    assert fake_reader.settings['NotifyAddress'] == '127.0.0.1:4000'
+    assert fake_reader.settings['NotifyMode'] == 'On'
+    assert fake_reader.settings['PersistTime'] == '5'
+
+def test_server_receives_pushed_tags(fake_reader):
+    """Test příjmu tagů odeslaných čtečkou v notify režimu."""
+    async def run():
+        received = asyncio.Queue()
+        server = await serve_notifications('127.0.0.1', 0, received.put)
+        try:
+            host, port = server.sockets[0].getsockname()[:2]
+            fake_reader.settings['NotifyAddress'] = f'{host}:{port}'
+            fake_reader.settings['NotifyMode'] = 'On'
+            await asyncio.to_thread(fake_reader.see, [format_tag_line(7)])
+            return await asyncio.wait_for(received.get(), timeout=5)
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    received = asyncio.run(run())
+
+    assert len(received) == 1
+    assert received[0].startswith('Tag:EPC 0000 7,')
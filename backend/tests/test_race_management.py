@@ -1,9 +1,14 @@
 import pytest
 import json
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time
+from sqlalchemy import event
+from extensions import db
 from database.race import Race
 from database.track import Track
 from database.category import Category
+from database.user import Users
+from database.registration import Registration
+from database.category_operations import assign_categories
 
 def test_get_races(client):
     """Test získání seznamu závodů."""
@@ -239,3 +244,94 @@ def test_get_categories(client):
     assert 'min_age' in category
     assert 'max_age' in category
     assert 'track_id' in category
+
+def _add_participants(count, first_number):
+    for number in range(first_number, first_number + count):
+        user = Users(firstname=f'Runner{number}', surname='Test', year=1990, club='Test Club',
+                     email=f'runner{number}@example.com', gender='MF'[number % 2])
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Registration(user_id=user.id, track_id=24040101, race_id=240401,
+                                    registration_time=time(9, 0)))
+    db.session.flush()
+    assign_categories(240401)
+    db.session.commit()
+
+def _count_detail_statements(client):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get('/api/race/240401')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    assert response.status_code == 200
+    return len(statements), json.loads(response.data)['race']['participants']
+
+def test_get_race_detail_constant_queries(client):
+    """Test konstantního počtu dotazů detailu závodu nezávisle na počtu účastníků."""
+    _add_participants(3, 100)
+    few, participants = _count_detail_statements(client)
+    assert len(participants) == 4
+
+    _add_participants(30, 200)
+    many, participants = _count_detail_statements(client)
+    assert len(participants) == 34
+
+    assert many == few
+    assert [p['number'] for p in participants if p['category'] == 'F18-45'][:3] == [51, 52, 53]
+
+def test_confirm_lineup_bulk_assignment(client, auth_headers):
+    """Test hromadného přidělení čísel a startovních časů."""
+    race = db.session.get(Race, 240401)
+    race.start = 'I'
+    race.interval_time = time(0, 0, 30)
+    db.session.commit()
+    _add_participants(3, 100)
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.post('/api/confirm_lineup', json={'race_id': 240401}, headers=auth_headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['participants'] == 4
+    assert set(data['timing']) == {'load_ms', 'plan_ms', 'write_ms', 'total_ms'}
+    assert len([statement for statement in statements if statement.lstrip().upper().startswith('UPDATE REGISTRATION')]) == 1
+
+    registrations = Registration.query.filter_by(race_id=240401).order_by(Registration.user_start_time).all()
+    assert [(registration.number, registration.user_start_time) for registration in registrations] == [
+        (1, time(0, 0, 30)), (2, time(0, 1, 0)), (3, time(0, 1, 30)), (51, time(0, 2, 0))
+    ]
+
+def test_delete_race_removes_results_generation(client, auth_headers):
+    """Test odstranění generace výsledků a lokálních cache se smazaným závodem."""
+    from database.results_version import ResultsVersion
+    from timing.race_state import race_state
+    from timing.ranking import rankings
+
+    assert client.get('/api/race/240401/results').status_code == 200
+    race_state.hydrate(240401)
+    race_state.touch(240401)
+    db.session.commit()
+    assert db.session.get(ResultsVersion, 240401) is not None
+
+    response = client.delete('/api/race/240401/delete', headers=auth_headers)
+
+    assert response.status_code == 200
+    db.session.expire_all()
+    assert db.session.get(ResultsVersion, 240401) is None
+    assert 240401 not in race_state.races
+    assert 240401 not in rankings.rankings
+    assert client.get('/api/race/240401/results').status_code == 404
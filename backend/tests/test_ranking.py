@@ -0,0 +1,68 @@
+import json
+import pytest
+from datetime import time, timedelta
+from sqlalchemy import text
+from extensions import db
+from database.track import Track
+from database.lap_operations import update_lap_times
+from database.standings_operations import refresh_standings
+from database.results_queries import bump_results_generation
+from timing.ranking import rankings
+
+@pytest.fixture
+def ranked_race(add_runner, add_lap):
+    """One-lap race of four runners, one of them DNF."""
+    track = db.session.get(Track, 24040101)
+    track.number_of_laps = 1
+    track.actual_start_time = time(10, 0, 0)
+    for number, gender in ((2, 'M'), (3, 'F'), (4, 'M')):
+        add_runner(number, gender)
+    add_lap(1, 50)
+    add_lap(2, 45)
+    add_lap(3, 55)
+    add_lap(4, 30, status='DNF')
+    update_lap_times(240401)
+    refresh_standings(240401)
+    db.session.commit()
+
+def test_views_share_one_ranking(client, ranked_race):
+    """Test, že všechna zobrazení výsledků vycházejí z jednoho pořadí."""
+
+    overall = json.loads(client.get('/api/race/240401/results').data)['results']
+    by_track = json.loads(client.get('/api/race/240401/results/by-track').data)['results']
+    by_category = json.loads(client.get('/api/race/240401/results/by-category').data)['results']
+    mine = json.loads(client.get('/api/race/240401/results/by-email/runner2@example.com').data)['results']
+
+    assert rankings.computed == 1
+    assert [result['number'] for result in overall] == [2, 1, 3, 4]
+    assert [result['number'] for result in by_track] == [2, 1, 3, 4]
+    assert [result['position_track'] for result in by_track] == ['1', '2', '3', 'DNF']
+    assert [(result['category'], result['number'], result['position_category']) for result in by_category] == [
+        ('F18-45', 3, '1'), ('M18-45', 2, '1'), ('M18-45', 1, '2'), ('M18-45', 4, 'DNF')
+    ]
+    assert by_category[2]['behind_time_category'] == '00:05:00.000'
+    assert mine == [{
+        'number': 2, 'firstname': 'Runner2', 'surname': 'Test', 'track': by_track[0]['track'],
+        'category': 'M18-45', 'lap_number': 1, 'total_laps': 1, 'race_time': '00:45:00.000',
+        'last_seen': '10:45:00', 'position_track': '1', 'behind_time_track': '00:00:00.000',
+        'position_category': '1', 'behind_time_category': '00:00:00.000', 'status': None
+    }]
+
+def test_ranking_follows_generation(ranked_race, race_start):
+    """Test přepočtu pořadí po změně výsledků."""
+    first = rankings.ranking(240401)
+
+    assert rankings.ranking(240401) is first
+
+    db.session.execute(text('UPDATE race_results SET timestamp = :timestamp WHERE race_id = 240401 AND number = 1'),
+                       {'timestamp': race_start + timedelta(minutes=40)})
+    update_lap_times(240401)
+    refresh_standings(240401, [1])
+    bump_results_generation(240401)
+    db.session.commit()
+
+    second = rankings.ranking(240401)
+    assert second is not first
+    assert [entry['number'] for entry in second.by_track()] == [1, 2, 3, 4]
+    assert [entry['number'] for entry in second.for_numbers([3, 1, 99])] == [3, 1]
+    assert rankings.computed == 2
@@ -129,3 +129,41 @@ def test_registration_invalid_gender_category(client):
     assert response.status_code == 400
     data = json.loads(response.data)
     assert 'No suitable category found' in data['error']
+
+def test_registration_after_start_is_timed(client, auth_headers):
+    """Test měření běžce, který se zaregistroval až po startu trati."""
+    from datetime import datetime, time
+    from extensions import db
+    from database.race import Race
+    from database.track import Track
+    from reader.fake_reader import format_tag_line
+
+    track = db.session.get(Track, 24040101)
+    track.actual_start_time = time(0, 0, 0)
+    track.fastest_possible_time = time(0, 0, 0)
+    db.session.commit()
+
+    response = client.post('/api/registration', json={
+        'firstname': 'Late', 'surname': 'Runner', 'year': 1990, 'club': 'Running Club',
+        'email': 'late@example.com', 'gender': 'M', 'race_id': 240401, 'track_id': 24040101
+    })
+    assert response.status_code == 201
+    registration_id = json.loads(response.data)['registration_id']
+
+    registration = db.session.get(Registration, registration_id)
+    race_date = db.session.get(Race, 240401).date
+    assert registration.start_timestamp == datetime.combine(race_date, time(0, 0, 0))
+
+    response = client.post('/api/race/240401/startlist/update/registration', json={
+        'registration_id': registration_id, 'number': 77
+    }, headers=auth_headers)
+    assert response.status_code == 200
+
+    response = client.post('/api/store_results', json={
+        'tags': [format_tag_line(77)], 'race_id': 240401, 'track_id': 24040101
+    }, headers=auth_headers)
+    assert response.status_code == 200
+    assert len(json.loads(response.data)['tags_found']) == 1
+
+    results = json.loads(client.get('/api/race/240401/results').data)['results']
+    assert [result['race_time'] != '--:--:--' for result in results if result['number'] == 77] == [True]
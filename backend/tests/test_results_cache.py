@@ -0,0 +1,60 @@
+import json
+from datetime import time
+from extensions import db
+from database.track import Track
+from database.lineup_operations import update_start_timestamps
+from timing.results_cache import results_cache
+
+def _results(client, headers=None):
+    return client.get('/api/race/240401/results', headers=headers or {})
+
+def test_results_cache_hit_and_miss(client):
+    """Test obsloužení opakovaného dotazu z cache."""
+    first = _results(client)
+    second = _results(client)
+
+    assert first.status_code == 200
+    assert second.data == first.data
+    assert second.headers['ETag'] == first.headers['ETag']
+
+    response = client.get('/api/results_cache/stats')
+    stats = json.loads(response.data)
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+
+def test_results_not_modified(client):
+    """Test odpovědi 304 pro nezměněné výsledky."""
+    etag = _results(client).headers['ETag']
+
+    response = _results(client, {'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert results_cache.stats()['not_modified'] == 1
+
+def test_results_cache_invalidated_by_write(client, auth_headers):
+    """Test zneplatnění cache zápisem výsledku."""
+    track = db.session.get(Track, 24040101)
+    track.fastest_possible_time = time(0, 0, 0)
+    track.actual_start_time = time(0, 0, 0)
+    update_start_timestamps(240401)
+    db.session.commit()
+
+    before = _results(client)
+    assert json.loads(before.data)['results'] == []
+
+    response = client.post('/api/manual_result_store', json={
+        'number': 1, 'race_id': 240401, 'track_id': 24040101
+    }, headers=auth_headers)
+    assert response.status_code == 200
+
+    after = _results(client, {'If-None-Match': before.headers['ETag']})
+    assert after.status_code == 200
+    assert after.headers['ETag'] != before.headers['ETag']
+    assert [result['number'] for result in json.loads(after.data)['results']] == [1]
+
+def test_results_cache_skips_errors(client):
+    """Test neukládání chybových odpovědí."""
+    response = client.get('/api/race/999/results')
+
+    assert response.status_code == 404
+    assert results_cache.stats()['entries'] == 0
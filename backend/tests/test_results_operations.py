@@ -0,0 +1,185 @@
+import pytest
+from datetime import datetime, time, timedelta
+from sqlalchemy import text
+from extensions import db
+from database.track import Track
+from database.lineup_operations import update_start_timestamps
+from database.user import Users
+from database.registration import Registration
+from database.results_operations import store_tag_results, insert_laps, MissingStartTimeError
+from database.results_queries import bump_results_generation
+from database.lap_operations import update_lap_times
+from timing.times import truncate_ms
+from reader.fake_reader import format_tag_line
+from timing.race_state import race_state
+
+@pytest.fixture
+def track(app):
+    """Odstartovaná trať se třemi koly a 20 registrovanými běžci."""
+    track = db.session.get(Track, 24040101)
+    track.actual_start_time = time(0, 0, 0)
+    track.fastest_possible_time = time(0, 0, 0)
+    track.number_of_laps = 3
+
+    for number in range(2, 21):
+        user = Users(firstname=f'Runner{number}', surname='Test', year=1990, club='Test Club',
+                     email=f'runner{number}@example.com', gender='M')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Registration(
+            user_id=user.id,
+            track_id=track.id,
+            race_id=240401,
+            registration_time=datetime.now().time(),
+            user_start_time=time(0, 0, 0),
+            number=number
+        ))
+
+    update_start_timestamps(240401)
+    db.session.commit()
+    return track
+
+def test_store_tag_results_batch(app, track):
+    """Test uložení dávky čtení všech běžců."""
+    lines = [format_tag_line(number) for number in range(1, 21)]
+
+    stored, tags_found = store_tag_results(240401, track, lines)
+
+    assert stored == 20
+    assert len(tags_found) == 20
+    laps = db.session.execute(text('SELECT number, lap_number FROM race_results WHERE race_id = 240401')).fetchall()
+    assert sorted(laps) == [(number, 1) for number in range(1, 21)]
+
+def test_store_tag_results_constant_queries(app, track, statements):
+    """Test konstantního počtu dotazů nezávisle na velikosti dávky."""
+    race_state.hydrate(240401)
+    statements.clear()
+    store_tag_results(240401, track, [format_tag_line(1)])
+    single = len(statements)
+    statements.clear()
+    store_tag_results(240401, track, [format_tag_line(number) for number in range(2, 21)])
+    batch = len(statements)
+
+    assert batch == single
+
+def test_store_tag_results_repeated_number(app, track):
+    """Test opakovaného čtení stejného čísla v jedné dávce."""
+    stored, _ = store_tag_results(240401, track, [format_tag_line(5)] * 3)
+
+    assert stored == 1
+
+def test_store_tag_results_next_lap(app, track):
+    """Test navázání na poslední uložené kolo."""
+    earlier = datetime.now() - timedelta(minutes=5)
+    db.session.execute(text('''
+        INSERT INTO race_results (race_id, number, tag_id, track_id, timestamp, last_seen_time, lap_number)
+        VALUES (240401, 3, 'EPC 0000 3', 24040101, :earlier, :earlier, 2)
+    '''), {'earlier': earlier})
+    db.session.commit()
+
+    stored, _ = store_tag_results(240401, track, [format_tag_line(3), format_tag_line(4)])
+
+    assert stored == 2
+    lap = db.session.execute(text('SELECT MAX(lap_number) FROM race_results WHERE race_id = 240401 AND number = 3')).scalar()
+    assert lap == 3
+
+def test_store_tag_results_lap_times(app, track):
+    """Test uložení časů kola a závodu v milisekundách při zápisu."""
+    earlier = truncate_ms(datetime.now() - timedelta(minutes=5))
+    db.session.execute(text('''
+        INSERT INTO race_results (race_id, number, tag_id, track_id, timestamp, last_seen_time, lap_number)
+        VALUES (240401, 3, 'EPC 0000 3', 24040101, :earlier, :earlier, 1)
+    '''), {'earlier': earlier})
+    update_lap_times(240401)
+    db.session.commit()
+
+    store_tag_results(240401, track, [format_tag_line(3), format_tag_line(4)])
+
+    rows = db.session.execute(text('''
+        SELECT number, lap_number, timestamp, lap_time_ms, race_time_ms FROM race_results
+        WHERE race_id = 240401 ORDER BY number, lap_number
+    ''')).fetchall()
+    start = db.session.get(Registration, 1).start_timestamp
+    (_, _, first, _, first_race_time), (_, _, second, lap_time, race_time), runner_4 = rows
+    second = datetime.fromisoformat(second)
+    assert lap_time == race_time - first_race_time
+    assert race_time == (second - start) // timedelta(milliseconds=1)
+    assert runner_4.lap_time_ms == runner_4.race_time_ms
+    # Times computed on ingestion match those recomputed from the timestamps
+    assert update_lap_times(240401) == 0
+
+def test_store_tag_results_lap_stored_by_other_writer(app, track):
+    """Test opakovaného rozhodnutí, když stejné kolo mezitím uložil jiný zapisovatel."""
+    race_state.hydrate(240401)
+    earlier = truncate_ms(datetime.now() - timedelta(minutes=5))
+    db.session.execute(text('''
+        INSERT INTO race_results (race_id, number, tag_id, track_id, timestamp, last_seen_time, lap_number)
+        VALUES (240401, 5, 'EPC 0000 5', 24040101, :earlier, :earlier, 1)
+    '''), {'earlier': earlier})
+    db.session.commit()
+
+    stored, _ = store_tag_results(240401, track, [format_tag_line(5), format_tag_line(6)])
+
+    assert stored == 2
+    laps = db.session.execute(text('''
+        SELECT number, lap_number FROM race_results WHERE race_id = 240401 ORDER BY number, lap_number
+    ''')).fetchall()
+    assert [tuple(lap) for lap in laps] == [(5, 1), (5, 2), (6, 1)]
+
+def test_insert_laps_skips_stored_laps(app, track):
+    """Test idempotentního zápisu již uloženého kola."""
+    seen = truncate_ms(datetime.now())
+    lap = {'number': 7, 'tag_id': 'EPC 0000 7', 'track_id': 24040101, 'timestamp': seen,
+           'last_seen_time': seen, 'lap_number': 1, 'lap_time_ms': None, 'race_time_ms': None}
+
+    assert insert_laps(240401, [lap]) == 1
+    assert insert_laps(240401, [lap, dict(lap, lap_number=2)]) == 1
+    count = db.session.execute(text('SELECT COUNT(*) FROM race_results WHERE race_id = 240401 AND number = 7')).scalar()
+    assert count == 2
+
+def test_store_tag_results_missing_start_time(app, track):
+    """Test chyby při nenastaveném startu trati."""
+    track.actual_start_time = None
+
+    with pytest.raises(MissingStartTimeError):
+        store_tag_results(240401, track, [format_tag_line(1)])
+
+def test_race_state_detects_foreign_write(app, track):
+    """Test přestavby stavu po zápisu jiným procesem."""
+    store_tag_results(240401, track, [format_tag_line(6)])
+    assert race_state.races[240401].runners[6].lap_number == 1
+
+    earlier = datetime.now() - timedelta(hours=1)
+    db.session.execute(text('''
+        INSERT INTO race_results (race_id, number, tag_id, track_id, timestamp, last_seen_time, lap_number)
+        VALUES (240401, 8, 'EPC 0000 8', 24040101, :earlier, :earlier, 2)
+    '''), {'earlier': earlier})
+    bump_results_generation(240401)
+    db.session.commit()
+
+    stored, _ = store_tag_results(240401, track, [format_tag_line(8)])
+
+    assert stored == 1
+    assert race_state.races[240401].runners[8].lap_number == 3
+
+def test_race_state_conflict_rolls_back(app, track):
+    """Test odmítnutí zápisu rozhodnutého nad zastaralým stavem."""
+    state = race_state.current(240401)
+    bump_results_generation(240401)
+    db.session.commit()
+
+    assert race_state.advance(state) is False
+    assert 240401 not in race_state.races
+
+def test_manual_result_uses_race_state(client, auth_headers, track):
+    """Test ručního zápisu kola a kontroly maximálního počtu kol."""
+    track.number_of_laps = 1
+    db.session.commit()
+
+    payload = {'number': 9, 'race_id': 240401, 'track_id': 24040101}
+    first = client.post('/api/manual_result_store', json=payload, headers=auth_headers)
+    second = client.post('/api/manual_result_store', json=payload, headers=auth_headers)
+
+    assert first.status_code == 200
+    assert second.status_code == 400
+    assert second.json['message'] == 'Maximum number of laps already recorded'
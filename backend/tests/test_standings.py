@@ -0,0 +1,126 @@
+import json
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from sqlalchemy import text
+from extensions import db
+from database.race import Race
+from database.track import Track
+from database.registration import Registration
+from database.lineup_operations import update_start_timestamps
+from database.race_standing import RaceStanding
+from database.lap_operations import update_lap_times
+from database.standings_operations import aggregate_standings, refresh_standings
+from database.schema_upgrades import upgrade_schema
+
+Lap = namedtuple('Lap', ['number', 'timestamp', 'lap_number', 'status', 'last_seen_time', 'race_time_ms'])
+
+def test_aggregate_standings_status_freezes_lap(race_start):
+    """Test zafixování pořadí na kole se statusem."""
+    laps = [
+        Lap(1, race_start + timedelta(minutes=20), 1, None, race_start + timedelta(minutes=20), 1200000),
+        Lap(1, race_start + timedelta(minutes=40), 2, 'DNF', race_start + timedelta(minutes=40), 2400000),
+        Lap(1, race_start + timedelta(minutes=60), 3, None, race_start + timedelta(minutes=60), 3600000),
+        Lap(2, race_start + timedelta(minutes=25), 1, None, None, 1500000)
+    ]
+
+    standings = aggregate_standings(laps)
+
+    assert standings[1]['lap_number'] == 2
+    assert standings[1]['status'] == 'DNF'
+    assert standings[1]['race_time_ms'] == 2400000
+    assert standings[1]['last_seen_time'] == race_start + timedelta(minutes=60)
+    assert standings[2]['lap_number'] == 1
+
+def test_race_results_from_standings(client, app, add_runner, add_lap):
+    """Test pořadí závodu z průběžně udržovaných výsledků."""
+    for number in (2, 3, 4):
+        add_runner(number)
+    add_lap(1, 50)
+    add_lap(2, 45)
+    add_lap(3, 30, status='DNF')
+    update_lap_times(240401)
+    refresh_standings(240401)
+    db.session.commit()
+
+    response = client.get('/api/race/240401/results')
+    results = json.loads(response.data)['results']
+
+    assert response.status_code == 200
+    assert [result['number'] for result in results] == [2, 1, 3]
+    assert results[0]['position_track'] == '1'
+    assert results[0]['race_time'] == '00:45:00.000'
+    assert results[1]['behind_time_track'] == '00:05:00.000'
+    assert results[1]['category'] == 'M18-45'
+    assert results[2]['position_track'] == 'DNF'
+
+def test_standings_follow_writes(client, auth_headers, app):
+    """Test aktualizace pořadí při zápisu a smazání kola."""
+    track = db.session.get(Track, 24040101)
+    track.fastest_possible_time = time(0, 0, 0)
+    track.actual_start_time = time(0, 0, 0)
+    update_start_timestamps(240401)
+    db.session.commit()
+
+    response = client.post('/api/manual_result_store', json={
+        'number': 1, 'race_id': 240401, 'track_id': 24040101
+    }, headers=auth_headers)
+    assert response.status_code == 200
+    assert db.session.get(RaceStanding, (240401, 1)).lap_number == 1
+
+    response = client.post('/api/race/240401/lap/delete', json={
+        'number': 1, 'lap_number': 1, 'track_id': 24040101
+    }, headers=auth_headers)
+    assert response.status_code == 200
+    db.session.expire_all()
+    assert db.session.get(RaceStanding, (240401, 1)) is None
+
+def test_rebuild_standings_command(app, add_lap):
+    """Test příkazu pro obnovu průběžného pořadí."""
+    add_lap(1, 50)
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['rebuild-standings', '240401'])
+
+    assert 'rebuilt 1 standings' in result.output
+    assert db.session.get(RaceStanding, (240401, 1)).lap_number == 1
+
+def test_race_time_across_midnight(client, auth_headers, app):
+    """Test času závodu, který startuje před půlnocí a končí po ní."""
+    response = client.post('/api/set_track_start_time', json={
+        'race_id': 240401, 'track_id': 24040101, 'start_time': '23:50'
+    }, headers=auth_headers)
+    assert response.status_code == 200
+
+    db.session.expire_all()
+    registration = db.session.get(Registration, 1)
+    race_date = db.session.get(Race, 240401).date
+    assert registration.start_timestamp == datetime.combine(race_date, time(23, 50))
+
+    finish = datetime.combine(race_date + timedelta(days=1), time(0, 35))
+    db.session.execute(text('''
+        INSERT INTO race_results (race_id, number, tag_id, track_id, timestamp, last_seen_time, lap_number)
+        VALUES (240401, 1, 'tag', 24040101, :timestamp, :timestamp, 1)
+    '''), {'timestamp': finish})
+    update_lap_times(240401)
+    refresh_standings(240401)
+    db.session.commit()
+
+    results = json.loads(client.get('/api/race/240401/results').data)['results']
+    assert results[0]['race_time'] == '00:45:00.000'
+
+def test_upgrade_schema_assigns_start_instants_once(app):
+    """Test doplnění startovních okamžiků jen při přidání jejich sloupce."""
+    start = db.session.get(Registration, 1).start_timestamp
+    db.session.execute(text('UPDATE registration SET start_timestamp = NULL'))
+    db.session.commit()
+
+    upgrade_schema()
+    db.session.expire_all()
+    assert db.session.get(Registration, 1).start_timestamp is None
+
+    db.session.execute(text('ALTER TABLE registration DROP COLUMN start_timestamp'))
+    db.session.commit()
+
+    upgrade_schema()
+    db.session.expire_all()
+    assert db.session.get(Registration, 1).start_timestamp == start
@@ -93,6 +93,23 @@ def test_update_startlist_registration(client, auth_headers):
         assert registration.number == 42
         assert registration.user_start_time.strftime('%H:%M:%S') == '00:05:00'
 
+def test_update_startlist_number_fills_start_instant(client, auth_headers):
+    """Test doplnění chybějícího startovního okamžiku při přidělení čísla."""
+    from extensions import db
+
+    registration = db.session.get(Registration, 1)
+    start = registration.start_timestamp
+    registration.start_timestamp = None
+    db.session.commit()
+
+    response = client.post('/api/race/240401/startlist/update/registration', json={
+        'registration_id': 1, 'number': 43
+    }, headers=auth_headers)
+
+    assert response.status_code == 200
+    db.session.expire_all()
+    assert db.session.get(Registration, 1).start_timestamp == start
+
 def test_delete_registration(client, auth_headers):
     """Test smazání registrace ze startovní listiny."""
     with client.application.app_context():
@@ -0,0 +1,40 @@
+from datetime import datetime
+from reader.taglist import parse_line, parse_taglist, parse_timestamp, format_timestamp
+from reader.fake_reader import format_tag_line
+
+def test_parse_timestamp():
+    """Test rychlého parsování času čtečky."""
+    value = '2024/03/25 10:15:35.456'
+
+    assert parse_timestamp(value) == datetime.strptime(value, '%Y/%m/%d %H:%M:%S.%f')
+    assert format_timestamp(parse_timestamp(value)) == value
+
+def test_parse_line():
+    """Test parsování jednoho řádku taglistu."""
+    record = parse_line('Tag:EPC 0000 42, Disc:2024/03/25 10:15:30.123, Last:2024/03/25 10:15:35.456, Count:5, Ant:1, Proto:2')
+
+    assert record.tag_id == 'EPC 0000 42'
+    assert record.number == 42
+    assert record.last_seen == datetime(2024, 3, 25, 10, 15, 35, 456000)
+    assert (record.count, record.antenna, record.protocol) == (5, 1, 2)
+
+def test_parse_line_invalid():
+    """Test odmítnutí neplatných řádků."""
+    assert parse_line('(No Tags)') is None
+    assert parse_line('Tag:EPC 1, Disc:2024/13/25 10:15:30.123, Last:2024/13/25 10:15:35.456, Count:5, Ant:1, Proto:2') is None
+    assert parse_line('Tag:EPC ABC, Disc:2024/03/25 10:15:30.123, Last:2024/03/25 10:15:35.456, Count:5, Ant:1, Proto:2').number is None
+
+def test_parse_taglist_buffer():
+    """Test parsování celého bufferu včetně hlaviček."""
+    seen = datetime(2024, 4, 1, 10, 30)
+    data = '\r\n'.join([
+        'get Taglist',
+        f'  {format_tag_line(1, seen)}',
+        format_tag_line(2, seen, antenna=3),
+        'Alien>'
+    ])
+
+    records = list(parse_taglist(data))
+
+    assert [record.number for record in records] == [1, 2]
+    assert records[1].antenna == 3
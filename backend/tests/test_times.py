@@ -0,0 +1,32 @@
+import pytest
+from datetime import datetime, time
+from timing.times import (
+    truncate_ms, as_duration, elapsed_ms, format_duration, format_clock, parse_clock, parse_timestamp
+)
+
+def test_format_duration():
+    """Test formátování času závodu."""
+    assert format_duration(45 * 60000 + 12345) == '00:45:12.345'
+    assert format_duration(-1500) == '-00:00:01.500'
+
+def test_elapsed_ms():
+    """Test výpočtu milisekund mezi průchody."""
+    start = datetime(2025, 4, 1, 23, 50)
+
+    assert elapsed_ms(start, datetime(2025, 4, 2, 0, 35, 0, 1000)) == 45 * 60000 + 1
+    assert elapsed_ms(None, start) is None
+    assert truncate_ms(datetime(2025, 4, 1, 10, 0, 0, 123456)) == datetime(2025, 4, 1, 10, 0, 0, 123000)
+
+def test_parse_and_format_clock():
+    """Test čtení a formátování času dne."""
+    assert parse_clock('00:15:00') == time(0, 15)
+    assert parse_clock('00:15:00.5') == time(0, 15, 0, 500000)
+    assert as_duration(parse_clock('01:02:03.004')).total_seconds() == 3723.004
+    assert format_clock(datetime(2025, 4, 1, 10, 5, 7, 89000)) == '10:05:07'
+    assert format_clock(datetime(2025, 4, 1, 10, 5, 7, 89000), milliseconds=True) == '10:05:07.089'
+    assert parse_timestamp('2025-04-01 10:05:07.0891') == datetime(2025, 4, 1, 10, 5, 7, 89000)
+
+    with pytest.raises(ValueError):
+        parse_clock('10:5')
+    with pytest.raises(ValueError):
+        parse_timestamp('10:05:07')
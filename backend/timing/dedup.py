@@ -0,0 +1,115 @@
+# timing/dedup.py
+import threading
+
+from reader.taglist import parse_line
+
+class ReadDeduplicator:
+    """
+    In-memory filter of tag reads that were already processed.
+    The reader keeps a tag in its taglist for the persist time and the frontend
+    posts the whole taglist every 500 ms for every started track, so most lines
+    arrive many times with the same last-seen timestamp. Each scope (race and
+    track, or a reader) remembers the newest last-seen time per tag and drops
+    every read that is not newer, before any database work is done. Reads
+    are remembered only after they are stored, see record().
+    State is per process; reads repeated across workers are still rejected
+    by the lap validation in the results pipeline.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seen = {}
+        self.stats = {}
+
+    def filter(self, race_id, scope, lines):
+        """
+        Drop reads already processed in a scope.
+        The remaining reads are not remembered until record() is called for
+        them, so reads whose processing fails arrive again with the next taglist.
+
+        Args:
+            race_id (int): ID of the race the reads are counted for
+            scope (hashable): Key of the stream the lines come from, e.g. track ID
+            lines (list): Raw taglist lines
+
+        Returns:
+            tuple: List of new lines and number of dropped lines
+        """
+
+        fresh = []
+        dropped = 0
+        batch = {}
+
+        with self.lock:
+            seen = self.seen.get((race_id, scope), {})
+            for line in lines:
+                record = parse_line(line)
+                if not record:
+                    continue
+
+                newest = batch.get(record.tag_id, seen.get(record.tag_id))
+                if newest is not None and record.last_seen <= newest:
+                    dropped += 1
+                    continue
+
+                batch[record.tag_id] = record.last_seen
+                fresh.append(line)
+
+            stats = self.stats.setdefault(race_id, {'processed': 0, 'dropped': 0})
+            stats['dropped'] += dropped
+
+        return fresh, dropped
+
+    def record(self, race_id, scope, lines):
+        """
+        Remember reads of a scope as processed, once their results are stored.
+
+        Args:
+            race_id (int): ID of the race the reads are counted for
+            scope (hashable): Key of the stream the lines come from, e.g. track ID
+            lines (list): Raw taglist lines returned by filter()
+        """
+
+        with self.lock:
+            seen = self.seen.setdefault((race_id, scope), {})
+            for line in lines:
+                record = parse_line(line)
+                if record and (record.tag_id not in seen or record.last_seen > seen[record.tag_id]):
+                    seen[record.tag_id] = record.last_seen
+
+            stats = self.stats.setdefault(race_id, {'processed': 0, 'dropped': 0})
+            stats['processed'] += len(lines)
+
+    def get_stats(self, race_id):
+        """
+        Get read counters of a race.
+
+        Args:
+            race_id (int): ID of the race
+
+        Returns:
+            dict: Numbers of processed and dropped reads
+        """
+
+        with self.lock:
+            return dict(self.stats.get(race_id, {'processed': 0, 'dropped': 0}))
+
+    def clear(self, race_id=None):
+        """
+        Forget processed reads of one race, or of all races.
+
+        Args:
+            race_id (int): ID of the race, None for all
+        """
+
+        with self.lock:
+            if race_id is None:
+                self.seen.clear()
+                self.stats.clear()
+                return
+
+            for key in [key for key in self.seen if key[0] == race_id]:
+                del self.seen[key]
+            self.stats.pop(race_id, None)
+
+read_deduplicator = ReadDeduplicator()
@@ -0,0 +1,285 @@
+# timing/live.py
+import json
+import queue
+import select
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from database import db
+from database.standings_operations import format_result
+from timing.ranking import rankings
+
+CHANNEL = 'race_results'
+
+# Numbers per NOTIFY payload, keeps payloads far below the 8000 byte limit
+NOTIFY_CHUNK_SIZE = 500
+
+class Subscriber:
+    """
+    One connected viewer of a race. Events wait in a bounded queue; a viewer
+    that stops reading is told to reload instead of holding events forever.
+    """
+
+    def __init__(self, race_id, max_events=256):
+        self.race_id = race_id
+        self.events = queue.Queue(maxsize=max_events)
+
+    def send(self, name, data):
+        try:
+            self.events.put_nowait((name, data))
+        except queue.Full:
+            self._drain()
+            self.events.put_nowait(('resync', {'race_id': self.race_id}))
+
+    def _drain(self):
+        try:
+            while True:
+                self.events.get_nowait()
+        except queue.Empty:
+            pass
+
+class LiveResults:
+    """
+    Push of committed standings changes to viewers over Server-Sent Events.
+
+    refresh_standings() records which runners changed in the session; on commit
+    the change is published: on PostgreSQL with NOTIFY inside the committing
+    transaction, so writes from any process (web workers, ingestion service)
+    reach every web process listening on the channel, elsewhere directly to this
+    process. Each process ranks a race once per change (timing/ranking.py),
+    only while somebody watches it, and fans the deltas out to all of its
+    viewers, so the database load does not grow with the number of viewers.
+    """
+
+    def __init__(self, heartbeat=15.0):
+        self.app = None
+        self.heartbeat = heartbeat
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+        self.positions = {}
+        self.changes = queue.Queue()
+        self.dispatcher = None
+        self.listener = None
+
+    def init_app(self, app):
+        self.app = app
+        if not event.contains(Session, 'before_commit', self._before_commit):
+            event.listen(Session, 'before_commit', self._before_commit)
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_rollback', self._after_rollback)
+
+    def _uses_notify(self, session):
+        return session.get_bind().dialect.name == 'postgresql'
+
+    def _before_commit(self, session):
+        changed = session.info.get('changed_standings')
+        if not changed or not self._uses_notify(session):
+            return
+
+        for race_id, numbers in changed.items():
+            numbers = sorted(numbers, key=lambda number: -1 if number is None else number)
+            for start in range(0, len(numbers), NOTIFY_CHUNK_SIZE):
+                payload = json.dumps({'race_id': race_id, 'numbers': numbers[start:start + NOTIFY_CHUNK_SIZE]})
+                session.execute(text('SELECT pg_notify(:channel, :payload)'), {'channel': CHANNEL, 'payload': payload})
+
+    def _after_commit(self, session):
+        changed = session.info.pop('changed_standings', None)
+        if changed and not self._uses_notify(session):
+            for race_id, numbers in changed.items():
+                self.publish(race_id, numbers)
+
+    def _after_rollback(self, session):
+        session.info.pop('changed_standings', None)
+
+    def publish(self, race_id, numbers):
+        """
+        Hand a committed change to the dispatcher.
+
+        Args:
+            race_id (int): ID of the race
+            numbers (iterable): Changed bib numbers, None for the whole race
+        """
+
+        if self.subscribers.get(race_id):
+            self.changes.put((race_id, set(numbers)))
+
+    def subscribe(self, race_id):
+        """
+        Register a viewer of a race.
+
+        Args:
+            race_id (int): ID of the race
+
+        Returns:
+            Subscriber: Registered viewer
+        """
+
+        subscriber = Subscriber(race_id)
+        with self.lock:
+            self.subscribers[race_id].add(subscriber)
+        self._ensure_workers()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            viewers = self.subscribers.get(subscriber.race_id)
+            if viewers:
+                viewers.discard(subscriber)
+                if not viewers:
+                    del self.subscribers[subscriber.race_id]
+                    self.positions.pop(subscriber.race_id, None)
+
+    def reset(self):
+        """
+        Disconnect all viewers and drop pending changes.
+        """
+
+        with self.lock:
+            self.subscribers.clear()
+            self.positions.clear()
+        try:
+            while True:
+                self.changes.get_nowait()
+        except queue.Empty:
+            pass
+
+    def stream(self, subscriber):
+        """
+        Render a viewer's events as a Server-Sent Events stream.
+
+        Args:
+            subscriber (Subscriber): Registered viewer
+
+        Yields:
+            str: SSE frames
+        """
+
+        try:
+            yield f"event: ready\ndata: {json.dumps({'race_id': subscriber.race_id})}\n\n"
+            while True:
+                try:
+                    name, data = subscriber.events.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ': heartbeat\n\n'
+                    continue
+                yield f"event: {name}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    def deltas(self, race_id, numbers):
+        """
+        Rank a race and build deltas for changed runners and for runners whose position moved.
+
+        Args:
+            race_id (int): ID of the race
+            numbers (set): Changed bib numbers, None in the set for the whole race
+
+        Returns:
+            list: Delta dicts with number, lap, positions and race time
+        """
+
+        with self.lock:
+            previous = self.positions.get(race_id, {})
+        current = {}
+        deltas = []
+
+        for result in map(format_result, rankings.ranking(race_id).by_track()):
+            number = result['number']
+            position = (result['position_track'], result['position_category'])
+            current[number] = position
+            if None in numbers or number in numbers or previous.get(number) != position:
+                deltas.append({
+                    'number': number,
+                    'track_id': result['track_id'],
+                    'lap': result['lap_number'],
+                    'position_track': result['position_track'],
+                    'position_category': result['position_category'],
+                    'race_time': result['race_time'],
+                    'status': result['status']
+                })
+
+        for number in numbers:
+            if number is not None and number not in current:
+                deltas.append({'number': number, 'removed': True})
+
+        with self.lock:
+            # Viewers may have left meanwhile, unsubscribe() dropped their positions
+            if race_id in self.subscribers:
+                self.positions[race_id] = current
+        return deltas
+
+    def dispatch(self, race_id, numbers):
+        """
+        Send deltas of one committed change to the race's viewers.
+        """
+
+        with self.lock:
+            viewers = list(self.subscribers.get(race_id, ()))
+        if not viewers:
+            return
+
+        with self.app.app_context():
+            try:
+                deltas = self.deltas(race_id, numbers)
+            finally:
+                db.session.remove()
+
+        if deltas:
+            for subscriber in viewers:
+                subscriber.send('standings', {'race_id': race_id, 'deltas': deltas})
+
+    def _dispatch_loop(self):
+        while True:
+            race_id, numbers = self.changes.get()
+            # Merge changes that queued up meanwhile, ranking once per race
+            pending = defaultdict(set)
+            pending[race_id].update(numbers)
+            while True:
+                try:
+                    race_id, numbers = self.changes.get_nowait()
+                except queue.Empty:
+                    break
+                pending[race_id].update(numbers)
+
+            for race_id, numbers in pending.items():
+                try:
+                    self.dispatch(race_id, numbers)
+                except Exception as e:
+                    self.app.logger.error(f"Error pushing live results of race {race_id}: {str(e)}")
+
+    def _listen_loop(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    connection = db.engine.raw_connection()
+                try:
+                    connection.set_session(autocommit=True)
+                    cursor = connection.cursor()
+                    cursor.execute(f'LISTEN {CHANNEL}')
+                    while True:
+                        if select.select([connection], [], [], self.heartbeat) == ([], [], []):
+                            continue
+                        connection.poll()
+                        while connection.notifies:
+                            message = json.loads(connection.notifies.pop(0).payload)
+                            self.publish(message['race_id'], message['numbers'])
+                finally:
+                    connection.close()
+            except Exception as e:
+                self.app.logger.error(f"Live results listener failed: {str(e)}")
+                time.sleep(5)
+
+    def _ensure_workers(self):
+        with self.lock:
+            if self.dispatcher is None:
+                self.dispatcher = threading.Thread(target=self._dispatch_loop, name='live-dispatch', daemon=True)
+                self.dispatcher.start()
+            if self.listener is None and self.app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql'):
+                self.listener = threading.Thread(target=self._listen_loop, name='live-listen', daemon=True)
+                self.listener.start()
+
+live_results = LiveResults()
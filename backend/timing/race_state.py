@@ -0,0 +1,269 @@
+# timing/race_state.py
+import threading
+
+from database.results_queries import (
+    get_last_laps,
+    get_registered_runners,
+    get_results_generation,
+    bump_results_generation
+)
+from database.standings_operations import mark_standings_changed
+from timing.times import as_duration, elapsed_ms
+
+ACCEPTED = None
+NOT_REGISTERED = 'not_registered'
+MAX_LAPS = 'max_laps'
+TOO_SOON_AFTER_LAP = 'too_soon_after_lap'
+TOO_SOON_AFTER_START = 'too_soon_after_start'
+
+class RunnerState:
+    """
+    What lap decisions need to know about one runner.
+    """
+
+    __slots__ = ('number', 'track_id', 'start', 'lap_number', 'timestamp', 'last_seen')
+
+    def __init__(self, number, track_id, start, lap_number=0, timestamp=None, last_seen=None):
+        self.number = number
+        self.track_id = track_id
+        self.start = start
+        self.lap_number = lap_number
+        self.timestamp = timestamp
+        self.last_seen = last_seen
+
+class RaceState:
+    """
+    Live state of one race: bib number -> RunnerState.
+    Valid for the results generation it was built from.
+    """
+
+    def __init__(self, race_id, generation, runners):
+        self.race_id = race_id
+        self.generation = generation
+        self.runners = runners
+
+    def decide(self, number, seen, track, check_min_lap=True):
+        """
+        Decide whether a passing counts as the runner's next lap.
+        Track parameters come from the current Track row, so start time and
+        lap rules set after the state was built apply immediately.
+
+        Args:
+            number (int): Runner's bib number
+            seen (datetime): Time of the passing
+            track (Track): Track the passing is evaluated for
+            check_min_lap (bool): Enforce the minimum lap duration after a previous lap
+
+        Returns:
+            tuple: Lap number (None if rejected) and rejection reason (None if accepted)
+        """
+
+        runner = self.runners.get(number)
+        if not runner or runner.track_id != track.id:
+            return None, NOT_REGISTERED
+
+        min_lap_duration = as_duration(track.fastest_possible_time)
+
+        if runner.lap_number:
+            if runner.lap_number >= track.number_of_laps:
+                return None, MAX_LAPS
+            if check_min_lap and seen <= runner.last_seen + min_lap_duration:
+                return None, TOO_SOON_AFTER_LAP
+            return runner.lap_number + 1, ACCEPTED
+
+        # No start instant means the track has not started
+        if runner.start is None or seen <= runner.start + min_lap_duration:
+            return None, TOO_SOON_AFTER_START
+        return 1, ACCEPTED
+
+    def lap_times(self, number, timestamp):
+        """
+        Compute the times stored with a new lap of a runner, decided by decide().
+
+        Args:
+            number (int): Runner's bib number
+            timestamp (datetime): Time of the passing
+
+        Returns:
+            tuple: Milliseconds since the previous lap (the start for lap 1) and
+            since the start, None where the start is unknown
+        """
+
+        runner = self.runners[number]
+        previous = runner.timestamp if runner.lap_number else runner.start
+        return elapsed_ms(previous, timestamp), elapsed_ms(runner.start, timestamp)
+
+    def record(self, number, lap_number, timestamp, last_seen):
+        runner = self.runners[number]
+        runner.lap_number = lap_number
+        runner.timestamp = timestamp
+        runner.last_seen = last_seen
+
+    def add_runners(self, rows):
+        for row in rows:
+            if row.number not in self.runners:
+                self.runners[row.number] = RunnerState(row.number, row.track_id, row.start_timestamp)
+
+class RaceStateEngine:
+    """
+    In-memory live state of running races, so lap acceptance is a dictionary
+    lookup instead of a query per passing.
+
+    Each race's state is built from its registrations and results table and
+    tagged with the race's results generation (ResultsVersion). Every write
+    to results or registrations bumps the generation in the same transaction:
+    - writes decided on this state bump it only if it still equals the
+      generation the state was built from; if another process wrote in the
+      meantime the transaction is rolled back, the state rebuilt and the
+      decisions repeated,
+    - other writes (manual edits, start list changes) bump it unconditionally
+      and drop the local state via touch().
+    Before deciding, the state's generation is compared with the database, one
+    primary-key lookup per batch, so several gunicorn workers and the ingestion
+    service can write to the same race. A single writer process never rebuilds.
+    Must be used inside an application context.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.races = {}
+        self.race_locks = {}
+
+    def race_lock(self, race_id):
+        """
+        Get the lock serializing decisions and writes of one race within this process.
+
+        Args:
+            race_id (int): ID of the race
+
+        Returns:
+            threading.RLock: Race lock
+        """
+
+        with self.lock:
+            return self.race_locks.setdefault(race_id, threading.RLock())
+
+    def current(self, race_id):
+        """
+        Get the up-to-date state of a race, rebuilding it when stale.
+        Call with the race lock held.
+
+        Args:
+            race_id (int): ID of the race
+
+        Returns:
+            RaceState: Current race state
+        """
+
+        generation = get_results_generation(race_id)
+        state = self.races.get(race_id)
+        if state is None or state.generation != generation:
+            state = self.hydrate(race_id, generation)
+        return state
+
+    def hydrate(self, race_id, generation=None):
+        """
+        Build the state of a race from the database.
+
+        Args:
+            race_id (int): ID of the race
+            generation (int): Results generation, read from the database if None
+
+        Returns:
+            RaceState: Fresh race state
+        """
+
+        if generation is None:
+            generation = get_results_generation(race_id)
+
+        state = RaceState(race_id, generation, {})
+        state.add_runners(get_registered_runners(race_id))
+
+        for number, (lap_number, timestamp, last_seen) in get_last_laps(race_id).items():
+            if number in state.runners:
+                state.record(number, lap_number, timestamp, last_seen)
+
+        with self.lock:
+            self.races[race_id] = state
+        return state
+
+    def load_runners(self, state, numbers):
+        """
+        Add runners registered since the state was built.
+
+        Args:
+            state (RaceState): Race state
+            numbers (iterable): Bib numbers missing in the state
+        """
+
+        numbers = [number for number in numbers if number not in state.runners]
+        if numbers:
+            state.add_runners(get_registered_runners(state.race_id, numbers))
+
+    def advance(self, state):
+        """
+        Bump the race generation for writes decided on a state.
+        On success the state moves to the new generation, on conflict the
+        transaction is rolled back and the state dropped.
+
+        Args:
+            state (RaceState): State the writes were decided on
+
+        Returns:
+            bool: True if the writes may be committed
+        """
+
+        generation = bump_results_generation(state.race_id, expected=state.generation)
+        if generation is None:
+            self.invalidate(state.race_id)
+            return False
+
+        state.generation = generation
+        return True
+
+    def touch(self, race_id):
+        """
+        Mark a race's results or registrations as changed by a write that did
+        not go through the state. Call before committing the write.
+        Live viewers of the race get the whole race re-ranked after the commit,
+        as e.g. a changed start time moves every race time.
+
+        Args:
+            race_id (int): ID of the race
+
+        Raises:
+            RuntimeError: If the generation could not be advanced
+        """
+
+        self.invalidate(race_id)
+        if bump_results_generation(race_id) is None:
+            raise RuntimeError(f"Results of race {race_id} changed concurrently, try again")
+        mark_standings_changed(race_id)
+
+    def invalidate(self, race_id=None):
+        """
+        Drop the local state of one race, or of all races.
+
+        Args:
+            race_id (int): ID of the race, None for all
+        """
+
+        with self.lock:
+            if race_id is None:
+                self.races.clear()
+            else:
+                self.races.pop(race_id, None)
+
+    def warm_up(self, race_ids):
+        """
+        Build the state of races expected to receive reads.
+
+        Args:
+            race_ids (iterable): IDs of the races
+        """
+
+        for race_id in race_ids:
+            with self.race_lock(race_id):
+                self.hydrate(race_id)
+
+race_state = RaceStateEngine()
@@ -0,0 +1,144 @@
+# timing/ranking.py
+import threading
+
+from database.results_queries import get_results_generation
+from database.standings_operations import rank_standings
+
+def _category_order(entry):
+    # Runners without a category come last, as NULLs do in PostgreSQL
+    return entry['category'] is None, entry['category'] or '', entry['track'], entry['rank']
+
+class RaceRanking:
+    """
+    Ranked standings of one race, valid for the results generation they were
+    computed from. Views are slices of the one ranking, none of them ranks again.
+    """
+
+    def __init__(self, race_id, generation, entries):
+        self.race_id = race_id
+        self.generation = generation
+        self.entries = entries
+        self.by_number = {}
+        for entry in entries:
+            self.by_number.setdefault(entry['number'], entry)
+
+    def by_track(self, track_id=None):
+        """
+        Get entries ordered by track and position on the track.
+
+        Args:
+            track_id (int): Only entries of this track, all tracks if None
+
+        Returns:
+            list: Ranked entries
+        """
+
+        if track_id is None:
+            return list(self.entries)
+        return [entry for entry in self.entries if entry['track_id'] == track_id]
+
+    def by_category(self, category=None):
+        """
+        Get entries ordered by category, track and position in the category.
+
+        Args:
+            category (str): Only entries of this category, all categories if None
+
+        Returns:
+            list: Ranked entries
+        """
+
+        entries = self.entries
+        if category is not None:
+            entries = [entry for entry in entries if entry['category'] == category]
+        return sorted(entries, key=_category_order)
+
+    def for_numbers(self, numbers):
+        """
+        Get entries of given runners.
+
+        Args:
+            numbers (iterable): Bib numbers
+
+        Returns:
+            list: Ranked entries of the runners that have any
+        """
+
+        return [self.by_number[number] for number in numbers if number in self.by_number]
+
+    def for_email(self, email):
+        """
+        Get entries of a participant, ordered by track and bib number.
+
+        Args:
+            email (str): Participant's email
+
+        Returns:
+            list: Ranked entries
+        """
+
+        return sorted(
+            (entry for entry in self.entries if entry['email'] == email),
+            key=lambda entry: (entry['track'], entry['number'])
+        )
+
+class RankingEngine:
+    """
+    Process cache of race rankings. A race is ranked once per results
+    generation (ResultsVersion) and every results view - full results, by
+    track, by category, a single participant, live deltas - is sliced from
+    that ranking. Must be used inside an application context.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rankings = {}
+        self.computed = 0
+
+    def ranking(self, race_id):
+        """
+        Get the up-to-date ranking of a race, computing it when stale.
+
+        Args:
+            race_id (int): ID of the race
+
+        Returns:
+            RaceRanking: Current ranking
+        """
+
+        generation = get_results_generation(race_id)
+        with self.lock:
+            ranking = self.rankings.get(race_id)
+        if ranking is not None and ranking.generation == generation:
+            return ranking
+
+        ranking = RaceRanking(race_id, generation, rank_standings(race_id))
+        with self.lock:
+            self.rankings[race_id] = ranking
+            self.computed += 1
+        return ranking
+
+    def invalidate(self, race_id=None):
+        """
+        Drop the ranking of one race, or of all races.
+
+        Args:
+            race_id (int): ID of the race, None for all
+        """
+
+        with self.lock:
+            if race_id is None:
+                self.rankings.clear()
+            else:
+                self.rankings.pop(race_id, None)
+
+    def reset(self):
+        """
+        Drop all rankings and zero the counter.
+        """
+
+        with self.lock:
+            self.rankings.clear()
+            self.computed = 0
+
+rankings = RankingEngine()
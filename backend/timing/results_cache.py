@@ -0,0 +1,131 @@
+# timing/results_cache.py
+import threading
+import zlib
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, make_response
+
+from database.results_queries import get_results_generation
+
+class ResultsCache:
+    """
+    Cache of rendered results responses, keyed by race and view.
+    Entries are tagged with the race's results generation (ResultsVersion),
+    which every write to the race's results or registrations advances in the
+    same transaction, so an entry is served only while nothing has changed -
+    in this process or any other. The generation also forms the ETag, letting
+    polling clients revalidate with If-None-Match and get 304 without the
+    results being rendered at all.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key, generation):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != generation:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1:]
+
+    def put(self, key, generation, body, status, mimetype):
+        with self.lock:
+            self.entries[key] = (generation, body, status, mimetype)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, race_id=None):
+        """
+        Drop cached responses of one race, or of all races.
+
+        Args:
+            race_id (int): ID of the race, None for all
+        """
+
+        with self.lock:
+            if race_id is None:
+                self.entries.clear()
+                return
+            for key in [key for key in self.entries if key[0] == race_id]:
+                del self.entries[key]
+
+    def reset(self):
+        """
+        Drop all cached responses and zero the counters.
+        """
+
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.not_modified = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'entries': len(self.entries)
+            }
+
+    def cached(self, view):
+        """
+        Decorate a results view taking race_id as its first URL parameter.
+        Further URL parameters (e.g. email) become part of the cache key.
+        Only successful responses are cached.
+
+        Args:
+            view (str): Name of the view used in cache keys and ETags
+
+        Returns:
+            callable: Decorator
+        """
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(race_id, **kwargs):
+                try:
+                    race_key = int(race_id)
+                except (TypeError, ValueError):
+                    return func(race_id, **kwargs)
+
+                key = (race_key, view) + tuple(str(kwargs[name]) for name in sorted(kwargs))
+                generation = get_results_generation(race_key)
+                etag = f'{race_key}-{generation}-{zlib.crc32(repr(key[1:]).encode()):x}'
+
+                if etag in request.if_none_match:
+                    with self.lock:
+                        self.not_modified += 1
+                    response = make_response('', 304)
+                else:
+                    entry = self.get(key, generation)
+                    if entry:
+                        body, status, mimetype = entry
+                        response = make_response(body, status)
+                        response.mimetype = mimetype
+                    else:
+                        response = make_response(func(race_id, **kwargs))
+                        if response.status_code != 200:
+                            return response
+                        self.put(key, generation, response.get_data(), response.status_code, response.mimetype)
+
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'no-cache'
+                return response
+
+            return wrapper
+
+        return decorator
+
+results_cache = ResultsCache()
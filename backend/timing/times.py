@@ -0,0 +1,139 @@
+# timing/times.py
+from datetime import datetime, time, timedelta
+
+# Passings are kept to the millisecond, durations are stored as integer milliseconds
+MILLISECOND = timedelta(milliseconds=1)
+
+def as_datetime(value):
+    """
+    Convert a TIMESTAMP column value to datetime.
+    PostgreSQL returns datetime objects, SQLite returns ISO strings.
+    """
+
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+def truncate_ms(value):
+    """
+    Drop the sub-millisecond part of a passing, so durations between
+    stored passings are whole milliseconds.
+
+    Args:
+        value (datetime): Time of a passing
+
+    Returns:
+        datetime: Time truncated to milliseconds
+    """
+
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+def as_duration(value):
+    """
+    Convert a time of day used as a duration (start offsets, minimum lap
+    times, lap times entered by hand) to a timedelta.
+
+    Args:
+        value (time): Duration as a time of day
+
+    Returns:
+        timedelta: Duration
+    """
+
+    return timedelta(hours=value.hour, minutes=value.minute, seconds=value.second, microseconds=value.microsecond)
+
+def elapsed_ms(since, until):
+    """
+    Milliseconds between two instants.
+
+    Args:
+        since (datetime): Earlier instant, None if unknown
+        until (datetime): Later instant
+
+    Returns:
+        int: Duration in milliseconds, None if since is None
+    """
+
+    if since is None:
+        return None
+    return (until - since) // MILLISECOND
+
+def format_duration(milliseconds):
+    """
+    Format a duration as HH:MM:SS.mmm.
+
+    Args:
+        milliseconds (int): Duration in milliseconds
+
+    Returns:
+        str: Formatted duration, negative durations get a leading minus
+    """
+
+    sign = '-' if milliseconds < 0 else ''
+    seconds, milliseconds = divmod(abs(milliseconds), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{sign}{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}'
+
+def format_clock(value, milliseconds=False):
+    """
+    Format the time of day of an instant.
+
+    Args:
+        value (datetime): Instant
+        milliseconds (bool): Append milliseconds
+
+    Returns:
+        str: HH:MM:SS, or HH:MM:SS.mmm with milliseconds
+    """
+
+    formatted = f'{value.hour:02d}:{value.minute:02d}:{value.second:02d}'
+    if milliseconds:
+        formatted += f'.{value.microsecond // 1000:03d}'
+    return formatted
+
+def parse_clock(value):
+    """
+    Parse a time of day or duration with optional milliseconds.
+
+    Args:
+        value (str): Time string in format HH:MM:SS or HH:MM:SS.ms
+
+    Returns:
+        time: Parsed time
+
+    Raises:
+        ValueError: If time format is invalid
+    """
+
+    time_part, ms_part = value, '0'
+    if '.' in value:
+        time_part, ms_part = value.split('.')
+        ms_part = ms_part.ljust(3, '0')[:3]
+
+    try:
+        base_time = datetime.strptime(time_part, '%H:%M:%S').time()
+        return time(base_time.hour, base_time.minute, base_time.second, int(ms_part) * 1000)
+    except ValueError as e:
+        raise ValueError(f"Invalid time format: {str(e)}")
+
+def parse_timestamp(value):
+    """
+    Parse a date and time with optional milliseconds.
+
+    Args:
+        value (str): Timestamp in format YYYY-MM-DD HH:MM:SS or YYYY-MM-DD HH:MM:SS.fff
+
+    Returns:
+        datetime: Parsed timestamp truncated to milliseconds
+
+    Raises:
+        ValueError: If the timestamp format is invalid
+    """
+
+    for pattern in ('%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S'):
+        try:
+            return truncate_ms(datetime.strptime(value, pattern))
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid timestamp format: {value}")
@@ -11,28 +11,7 @@ const formatRaceTime = (raceTime, status) => {
   return raceTime;
 };
 
-const ResultRow = ({ result, raceId, isExpanded, onToggle }) => {
-  const [lapTimes, setLapTimes] = useState([]);
-  const [loading, setLoading] = useState(false);
-
-  useEffect(() => {
-    const fetchLapTimes = async () => {
-      if (isExpanded && !lapTimes.length) {
-        setLoading(true);
-        try {
-          const response = await axios.get(`/api/race/${raceId}/racer/${result.number}/laps`);
-          setLapTimes(response.data.laps);
-        } catch (err) {
-          console.error('Failed to fetch lap times:', err);
-        } finally {
-          setLoading(false);
-        }
-      }
-    };
-
-    fetchLapTimes();
-  }, [isExpanded, result.number, raceId]);
-
+const ResultRow = ({ result, lapTimes, lapsLoading, isExpanded, onToggle }) => {
   return (
     <>
       <tr className="results-row">
@@ -58,7 +37,7 @@ const ResultRow = ({ result, raceId, isExpanded, onToggle }) => {
           <td colSpan="8" className="expanded-content">
             <LapTimes 
               lapTimes={lapTimes} 
-              loading={loading} 
+              loading={lapsLoading} 
             />
           </td>
         </tr>
@@ -83,6 +62,8 @@ const ResultList = ({ raceId }) => {
   const [searchQuery, setSearchQuery] = useState('');
   const [groupBy, setGroupBy] = useState('category');
   const [expandedRunner, setExpandedRunner] = useState(null);
+  const [lapsByNumber, setLapsByNumber] = useState(null);
+  const [lapsLoading, setLapsLoading] = useState(false);
 
   useEffect(() => {
     const handleBeforePrint = () => {
@@ -121,8 +102,35 @@ const ResultList = ({ raceId }) => {
 
   useEffect(() => {
     fetchResults();
+    setLapsByNumber(null);
   }, [raceId, groupBy, t]);
 
+  // Lap times of the whole race in one request, fetched when a row is first expanded
+  const fetchLaps = async () => {
+    setLapsLoading(true);
+    try {
+      const response = await axios.get(`/api/race/${raceId}/laps`);
+      const { columns, laps } = response.data;
+      const byNumber = {};
+      Object.entries(laps).forEach(([number, rows]) => {
+        byNumber[number] = rows.map(row =>
+          Object.fromEntries(columns.map((column, index) => [column, row[index]]))
+        );
+      });
+      setLapsByNumber(byNumber);
+    } catch (err) {
+      console.error('Failed to fetch lap times:', err);
+    } finally {
+      setLapsLoading(false);
+    }
+  };
+
+  useEffect(() => {
+    if (expandedRunner !== null && lapsByNumber === null && !lapsLoading) {
+      fetchLaps();
+    }
+  }, [expandedRunner, lapsByNumber]);
+
   const handleSearch = (e) => {
     const query = e.target.value.toLowerCase();
     setSearchQuery(query);
@@ -281,7 +289,8 @@ const ResultList = ({ raceId }) => {
                         <ResultRow
                           key={result.number}
                           result={result}
-                          raceId={raceId}
+                          lapTimes={lapsByNumber?.[result.number] || []}
+                          lapsLoading={lapsLoading}
                           isExpanded={expandedRunner === result.number}
                           onToggle={() => handleRowToggle(result.number)}
                         />
@@ -319,7 +328,8 @@ const ResultList = ({ raceId }) => {
                             <ResultRow
                               key={result.number}
                               result={result}
-                              raceId={raceId}
+                              lapTimes={lapsByNumber?.[result.number] || []}
+                              lapsLoading={lapsLoading}
                               isExpanded={expandedRunner === result.number}
                               onToggle={() => handleRowToggle(result.number)}
                             />